@@ -0,0 +1,174 @@
+"""
+Synthetic upstream/downstream data for the fake services in bench.fakes
+
+generate() returns a dataset dict:
+    users:  login -> full name
+    github: 'org/repo' -> list of upstream issues
+    pagure: 'repo' -> list of upstream issues
+    jira:   list of downstream issues, each linked to one upstream issue
+The same seed always gives the same dataset.
+"""
+# Built In Modules
+import random
+
+# Global Variables
+WORDS = ('sync', 'crash', 'login', 'timeout', 'cache', 'build', 'docs', 'release',
+         'memory', 'network', 'config', 'parser', 'upgrade', 'token', 'report',
+         'ui', 'api', 'queue', 'index', 'search', 'migration', 'flaky', 'test')
+LABELS = ('bug', 'enhancement', 'question', 'docs', 'security', 'performance')
+MILESTONES = (None, 'v1.0', 'v1.1', 'v2.0')
+STATUSES = ('To Do', 'In Progress', 'Review')
+CLOSED_STATUS = 'Done'
+PROJECT = 'BENCH'
+REMOTE_LINK_TITLE = 'Upstream issue'
+
+
+def generate(issues=1000, repos=None, pagure_share=0.2, missing=0.1,
+             out_of_sync=0.3, closed=0.05, comments=2, users=50,
+             pagure_url='https://pagure.io', seed=0):
+    """
+    Generates a dataset of upstream issues and their JIRA counterparts
+    Args:
+        issues (int): Total number of upstream issues
+        repos (int): Number of upstream repos, one per 500 issues (at
+                     least 2) by default
+        pagure_share (float): Fraction of the repos hosted on Pagure
+        missing (float): Fraction of upstream issues without a JIRA issue
+        out_of_sync (float): Fraction of linked issues that differ from upstream
+        closed (float): Fraction of closed upstream issues
+        comments (int): Average number of comments per upstream issue
+        users (int): Number of distinct users
+        pagure_url (str): Base URL Pagure issues are linked with
+        seed (int): Random seed
+    Returns:
+        dataset (dict): See the module docstring
+    """
+    rand = random.Random(seed)
+    repos = repos or max(2, issues // 500)
+    logins = ['user%i' % index for index in range(users)]
+    data = {
+        'users': dict((login, 'User %s' % login[4:]) for login in logins),
+        'github': {},
+        'pagure': {},
+        'jira': [],
+    }
+    pagure_repos = max(1, int(round(repos * pagure_share))) if pagure_share else 0
+    names = []
+    for index in range(repos):
+        if index < pagure_repos:
+            names.append(('pagure', 'bench-pagure-%i' % index))
+        else:
+            names.append(('github', 'bench/repo-%i' % index))
+        data[names[-1][0]][names[-1][1]] = []
+
+    for index in range(issues):
+        source, repo = names[index % repos]
+        number = len(data[source][repo]) + 1
+        title = '%s %s %s' % tuple(rand.choice(WORDS) for _ in range(3))
+        issue = {
+            'id': 1000000 + index,
+            'number': number,
+            'title': '%s (#%i)' % (title.capitalize(), index),
+            'body': 'Steps to reproduce %i: %s' % (index, ' '.join(rand.choice(WORDS) for _ in range(20))),
+            'state': 'closed' if rand.random() < closed else 'open',
+            'labels': sorted(rand.sample(LABELS, rand.randint(0, 2))),
+            'milestone': rand.choice(MILESTONES),
+            'user': rand.choice(logins),
+            'assignees': [rand.choice(logins)] if rand.random() < 0.7 else [],
+            'comments': [{'id': index * 100 + c, 'user': rand.choice(logins),
+                          'body': 'Comment %i on issue %i: %s' % (c, index, rand.choice(WORDS))}
+                         for c in range(rand.randint(0, 2 * comments))],
+            'updated': '2019-01-01T00:00:00Z',
+        }
+        if source == 'github':
+            issue['html_url'] = 'https://github.com/%s/issues/%i' % (repo, number)
+        else:
+            issue['html_url'] = '%s/%s/issue/%i' % (pagure_url, repo, number)
+        data[source][repo].append(issue)
+
+        if rand.random() < missing:
+            continue
+        data['jira'].append(_jira_issue(rand, data, source, repo, issue, len(data['jira']) + 1,
+                                        rand.random() < out_of_sync))
+    return data
+
+
+def _jira_issue(rand, data, source, repo, issue, key, differ):
+    """ Returns the JIRA issue of an upstream issue, changed a little if 'differ' """
+    assignee = data['users'][issue['assignees'][0]] if issue['assignees'] else None
+    jira = {
+        'id': str(10000 + key),
+        'key': '%s-%i' % (PROJECT, key),
+        'summary': '[%s] %s' % (repo, issue['title']),
+        'description': 'Upstream issue %s (id %s)' % (issue['html_url'], issue['id']),
+        'labels': list(issue['labels']),
+        'fixVersions': [issue['milestone']],
+        'assignee': assignee,
+        'status': CLOSED_STATUS if issue['state'] == 'closed' else rand.choice(STATUSES),
+        'priority': 'Major',
+        'comments': ['%s\n\n%s' % (comment['user'], comment['body']) for comment in issue['comments']],
+        'links': [REMOTE_LINK_TITLE, issue['html_url']],
+        'updated': '2019-01-01T00:00:00.000+0000',
+    }
+    if differ:
+        change = rand.choice(('summary', 'labels', 'assignee', 'comments', 'status'))
+        if change == 'summary':
+            jira['summary'] += ' (edited)'
+        elif change == 'labels':
+            jira['labels'].append('downstream-only')
+        elif change == 'assignee':
+            jira['assignee'] = None if assignee else 'User 0'
+        elif change == 'comments':
+            jira['comments'] = jira['comments'][:-1] if jira['comments'] else []
+            if not issue['comments']:
+                jira['labels'].append('downstream-only')
+        else:
+            jira['status'] = CLOSED_STATUS if issue['state'] == 'open' else STATUSES[0]
+    return jira
+
+
+def config(data, github_url, pagure_url, jira_url, email_to=('bench@example.com',),
+           groups=1, github_throttle=None):
+    """
+    Returns a Jibe config dict pointing at the fake services
+    Args:
+        data (dict): Dataset from generate()
+        github_url (str): URL of the fake GitHub API
+        pagure_url (str): URL of the fake Pagure
+        jira_url (str): URL of the fake JIRA
+        email_to (tuple): Report recipients
+        groups (int): Number of groups the repos are spread over
+        github_throttle (float): Seconds PyGithub waits between requests,
+                                 None to not wait
+    Returns:
+        config (dict): Jibe config
+    """
+    check = ['comments', 'tags', 'fixVersion', 'assignee', 'title',
+             {'transition': CLOSED_STATUS}]
+    downstream = {'project': PROJECT, 'check': check}
+    send_to = {}
+    for index in range(groups):
+        send_to['bench-%i' % index] = {
+            'upstream': {'github': {}, 'pagure': {}},
+            'email-to': list(email_to),
+        }
+    for source in ('github', 'pagure'):
+        for index, repo in enumerate(sorted(data[source])):
+            group = send_to['bench-%i' % (index % groups)]
+            group['upstream'][source][repo] = dict(downstream)
+    return {
+        'jibe': {
+            'github_token': 'bench-token',
+            'github_url': github_url,
+            'github_options': {'seconds_between_requests': github_throttle},
+            'pagure_url': pagure_url,
+            'default_jira_instance': 'bench',
+            'jira': {
+                'bench': {
+                    'options': {'server': jira_url, 'verify': False},
+                    'basic_auth': ('jibe', 'bench'),
+                },
+            },
+            'send-to': send_to,
+        },
+    }
@@ -0,0 +1,180 @@
+"""
+End-to-end benchmark: runs jibe.main.main() against the fake services of
+bench.fakes and reports wall time, request counts and peak memory per scale.
+
+    python -m bench.e2e --scales 1000,10000 --latency 0.005 --jobs 4
+
+Every scale runs in its own process so the peak memory of one scale does
+not hide the next one.
+"""
+# Built In Modules
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Local Modules
+from bench import data as bench_data
+from bench import fakes
+
+# Global Variables
+log = logging.getLogger(__name__)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def peak_rss_mib():
+    """ Peak resident set size of this process in MiB """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KiB on Linux, bytes on macOS
+    return peak / (1048576.0 if sys.platform == 'darwin' else 1024.0)
+
+
+def run_scale(issues, latency=0.0, rate_limit=0, error_rate=0.0, jobs=1,
+              groups=1, seed=0, github_throttle=None, args=()):
+    """
+    Runs main() once against freshly started fake services
+    Args:
+        issues (int): Number of upstream issues
+        latency (float): Latency of every fake HTTP request in seconds
+        rate_limit (int): Requests per second per service, 0 for no limit
+        error_rate (float): Fraction of HTTP requests failing with a 503
+        jobs (int): Passed to --jobs
+        groups (int): Number of groups the repos are spread over
+        seed (int): Random seed of the dataset
+        github_throttle (float): PyGithub's seconds_between_requests
+        args (tuple): Extra command line arguments for main()
+    Returns:
+        result (dict): Wall time, request counts and peak memory
+    """
+    options = dict(latency=latency, rate_limit=rate_limit, error_rate=error_rate, seed=seed)
+    pagure = fakes.FakePagure(None, **options)
+    start = time.time()
+    dataset = bench_data.generate(issues, pagure_url=pagure.url, seed=seed)
+    generate_seconds = time.time() - start
+    pagure.data = dataset
+    github = fakes.FakeGithub(dataset, **options)
+    jira = fakes.FakeJira(dataset, **options)
+    smtp = fakes.FakeSMTP(latency=latency)
+    services = [github.start(), pagure.start(), jira.start(), smtp.start()]
+
+    os.environ['DEFAULT_FROM'] = 'jibe-bench@example.com'
+    os.environ['DEFAULT_SERVER'] = smtp.address
+    import config as jibe_config
+    import jibe.main
+    import jibe.metrics
+    jibe_config.config = bench_data.config(dataset, github.url, pagure.url, jira.url,
+                                           groups=groups, github_throttle=github_throttle)
+    rss_before = peak_rss_mib()
+    argv = sys.argv
+    sys.argv = ['jibe', '--jobs', str(jobs)] + list(args)
+    try:
+        start = time.time()
+        jibe.main.main()
+        wall = time.time() - start
+    finally:
+        sys.argv = argv
+        for service in services:
+            service.stop()
+
+    requests = {}
+    for service in (github, pagure, jira):
+        requests.update(service.counts)
+    run_metrics = jibe.metrics.to_dict()
+    return {
+        'issues': issues,
+        'jira_issues': len(dataset['jira']),
+        'groups': groups,
+        'jobs': jobs,
+        'latency': latency,
+        'generate_seconds': round(generate_seconds, 3),
+        'wall_seconds': round(wall, 3),
+        'issues_per_second': round(issues / wall, 1) if wall else None,
+        'requests': requests,
+        'requests_total': sum(requests.values()),
+        'requests_per_issue': round(sum(requests.values()) / float(issues), 2),
+        'mails_sent': smtp.messages,
+        'mail_bytes': smtp.bytes,
+        'groups_failed': run_metrics['counters'].get('groups_failed', 0),
+        'rss_before_run_mib': rss_before and round(rss_before, 1),
+        'peak_rss_mib': peak_rss_mib() and round(peak_rss_mib(), 1),
+    }
+
+
+def format_result(result):
+    lines = ['%(issues)7i issues: %(wall_seconds)8.2fs wall, %(issues_per_second)8.1f issues/s, '
+             '%(requests_total)7i requests (%(requests_per_issue).2f/issue), '
+             'peak RSS %(peak_rss_mib)s MiB, %(mails_sent)i mail(s), '
+             '%(groups_failed)i failed group(s)' % result]
+    for family, count in sorted(result['requests'].items()):
+        lines.append('          %-20s %8i' % (family, count))
+    return '\n'.join(lines)
+
+
+def parse_args(args):
+    argparser = argparse.ArgumentParser(description='Jibe end-to-end benchmark')
+    argparser.add_argument('--scales', default='1000',
+                           help='Comma separated issue counts (default: 1000)')
+    argparser.add_argument('--latency', type=float, default=0.0,
+                           help='Seconds added to every fake request')
+    argparser.add_argument('--rate-limit', type=int, default=0,
+                           help='Requests per second per service (default: no limit)')
+    argparser.add_argument('--error-rate', type=float, default=0.0,
+                           help='Fraction of fake requests failing with a 503')
+    argparser.add_argument('--jobs', type=int, default=1)
+    argparser.add_argument('--groups', type=int, default=1)
+    argparser.add_argument('--seed', type=int, default=0)
+    argparser.add_argument('--github-throttle', type=float, metavar='SECONDS',
+                           help="PyGithub's pause between requests (its default "
+                                "is 0.25, the benchmark does not pause)")
+    argparser.add_argument('--output', metavar='FILE',
+                           help='Also write the results as JSON to FILE')
+    argparser.add_argument('--single', action='store_true',
+                           help=argparse.SUPPRESS)
+    argparser.add_argument('jibe_args', nargs='*',
+                           help='Extra arguments for jibe (after --)')
+    return argparser.parse_args(args)
+
+
+def main(args=None):
+    arguments = parse_args(sys.argv[1:] if args is None else args)
+    os.chdir(ROOT)
+    if arguments.single:
+        logging.basicConfig(level=logging.WARNING)
+        result = run_scale(int(arguments.scales), arguments.latency, arguments.rate_limit,
+                           arguments.error_rate, arguments.jobs, arguments.groups,
+                           arguments.seed, arguments.github_throttle, arguments.jibe_args)
+        sys.stdout.write(json.dumps(result) + '\n')
+        return
+
+    results = []
+    for scale in arguments.scales.split(','):
+        command = [sys.executable, '-m', 'bench.e2e', '--single', '--scales', scale,
+                   '--latency', str(arguments.latency),
+                   '--rate-limit', str(arguments.rate_limit),
+                   '--error-rate', str(arguments.error_rate),
+                   '--jobs', str(arguments.jobs), '--groups', str(arguments.groups),
+                   '--seed', str(arguments.seed)]
+        if arguments.github_throttle is not None:
+            command += ['--github-throttle', str(arguments.github_throttle)]
+        if arguments.jibe_args:
+            command += ['--'] + arguments.jibe_args
+        output = subprocess.check_output(command, cwd=ROOT)
+        result = json.loads(output.decode('utf-8').strip().splitlines()[-1])
+        results.append(result)
+        print(format_result(result))
+    if arguments.output:
+        with open(arguments.output, 'w') as fp:
+            json.dump(results, fp, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
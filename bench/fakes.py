@@ -0,0 +1,454 @@
+"""
+In-process stand-ins for the services Jibe talks to (GitHub, Pagure,
+JIRA and an SMTP server), serving a dataset from bench.data.
+
+Every service can be slowed down (latency), rate limited and made to fail
+(error injection) and counts the requests it served per endpoint.
+"""
+# Built In Modules
+import json
+import random
+import re
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+try:
+    from urllib.parse import urlparse, parse_qs, unquote
+except ImportError:
+    from urlparse import urlparse, parse_qs
+    from urllib import unquote
+
+
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class FakeService(object):
+    """
+    Base class of the fake HTTP services
+    Args:
+        latency (float): Seconds added to every request
+        rate_limit (int): Requests allowed per second, 0 for no limit
+        error_rate (float): Fraction of requests that fail with a 503
+    """
+    # (method, regex, handler name, endpoint family) set by subclasses
+    routes = []
+
+    def __init__(self, data, latency=0.0, rate_limit=0, error_rate=0.0, seed=0):
+        self.data = data
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.error_rate = error_rate
+        self.counts = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window = (0, 0)
+        self._compiled = [(method, re.compile(pattern + '$'), handler, family)
+                          for method, pattern, handler, family in self.routes]
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:%i' % self.server.server_address[1]
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _count(self, family):
+        with self._lock:
+            self.counts[family] = self.counts.get(family, 0) + 1
+
+    def _limited(self):
+        """ Returns True if the request is over the rate limit """
+        if not self.rate_limit:
+            return False
+        with self._lock:
+            second = int(time.time())
+            start, count = self._window
+            if start != second:
+                start, count = second, 0
+            count += 1
+            self._window = (start, count)
+            return count > self.rate_limit
+
+    def _failed(self):
+        if not self.error_rate:
+            return False
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def _handler_class(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body are written separately, don't let Nagle
+            # and delayed ACKs add 40ms to every request
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _dispatch(self, method):
+                parsed = urlparse(self.path)
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                for route_method, pattern, handler, family in service._compiled:
+                    match = pattern.match(parsed.path)
+                    if route_method != method or not match:
+                        continue
+                    service._count(family)
+                    if service.latency:
+                        time.sleep(service.latency)
+                    if service._limited():
+                        return self._send(429, {'message': 'rate limited'},
+                                          {'Retry-After': '1'})
+                    if service._failed():
+                        return self._send(503, {'message': 'injected error'})
+                    query = dict((key, values[-1]) for key, values in
+                                 parse_qs(parsed.query).items())
+                    payload = json.loads(body.decode('utf-8')) if body else None
+                    result = getattr(service, handler)(query, payload, *match.groups())
+                    return self._send(*result)
+                service._count('unknown')
+                return self._send(404, {'message': 'not found: %s %s' % (method, self.path)})
+
+            def _send(self, status, payload, headers=None):
+                data = json.dumps(payload).encode('utf-8') if payload is not None else b''
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._dispatch('GET')
+
+            def do_POST(self):
+                self._dispatch('POST')
+
+            def do_PUT(self):
+                self._dispatch('PUT')
+
+        return Handler
+
+
+def _page(items, query, per_page=30):
+    page = int(query.get('page', 1))
+    per_page = int(query.get('per_page', per_page))
+    last = max((len(items) + per_page - 1) // per_page, 1)
+    return items[(page - 1) * per_page:page * per_page], page, last
+
+
+class FakeGithub(FakeService):
+    """ GitHub REST API: issues, comments and users with Link pagination """
+    routes = [
+        ('GET', r'/repos/([^/]+/[^/]+)/issues', 'issues', 'github.issues'),
+        ('GET', r'/repos/([^/]+/[^/]+)/issues/(\d+)', 'issue', 'github.issues'),
+        ('GET', r'/repos/([^/]+/[^/]+)/issues/(\d+)/comments', 'comments', 'github.comments'),
+        ('GET', r'/repos/([^/]+/[^/]+)', 'repo', 'github.repos'),
+        ('GET', r'/users/([^/]+)', 'user', 'github.users'),
+    ]
+
+    def _link(self, path, query, page, last):
+        links = []
+        for rel, number in (('next', page + 1), ('last', last)):
+            if rel == 'next' and page >= last:
+                continue
+            params = dict(query, page=number)
+            links.append('<%s%s?%s>; rel="%s"' % (
+                self.url, path, '&'.join('%s=%s' % item for item in sorted(params.items())), rel))
+        return {'Link': ', '.join(links)} if links else {}
+
+    def issues(self, query, payload, repo):
+        issues = self.data['github'].get(repo)
+        if issues is None:
+            return 404, {'message': 'Not Found'}
+        items, page, last = _page([self._issue(repo, issue) for issue in issues], query)
+        return 200, items, self._link('/repos/%s/issues' % repo, query, page, last)
+
+    def issue(self, query, payload, repo, number):
+        for issue in self.data['github'].get(repo, []):
+            if issue['number'] == int(number):
+                return 200, self._issue(repo, issue)
+        return 404, {'message': 'Not Found'}
+
+    def comments(self, query, payload, repo, number):
+        for issue in self.data['github'].get(repo, []):
+            if issue['number'] == int(number):
+                comments = [dict(comment, url='%s/repos/%s/issues/comments/%s' % (self.url, repo, comment['id']),
+                                 user=self._user_stub(comment['user']),
+                                 created_at='2019-01-01T00:00:00Z', updated_at='2019-01-01T00:00:00Z')
+                            for comment in issue['comments']]
+                items, page, last = _page(comments, query)
+                return 200, items, self._link('/repos/%s/issues/%s/comments' % (repo, number),
+                                              query, page, last)
+        return 404, {'message': 'Not Found'}
+
+    def repo(self, query, payload, repo):
+        if repo not in self.data['github']:
+            return 404, {'message': 'Not Found'}
+        owner, name = repo.split('/')
+        return 200, {'id': abs(hash(repo)) % 100000, 'name': name, 'full_name': repo,
+                     'owner': self._user_stub(owner),
+                     'url': '%s/repos/%s' % (self.url, repo)}
+
+    def user(self, query, payload, login):
+        return 200, dict(self._user_stub(login), name=self.data['users'].get(login, login))
+
+    def _user_stub(self, login):
+        return {'login': login, 'id': abs(hash(login)) % 100000, 'type': 'User',
+                'url': '%s/users/%s' % (self.url, login)}
+
+    def _issue(self, repo, issue):
+        return {
+            'id': issue['id'],
+            'number': issue['number'],
+            'title': issue['title'],
+            'body': issue['body'],
+            'state': issue['state'],
+            'labels': [{'name': label} for label in issue['labels']],
+            'milestone': {'title': issue['milestone']} if issue['milestone'] else None,
+            'user': self._user_stub(issue['user']),
+            'assignees': [self._user_stub(login) for login in issue['assignees']],
+            'comments': len(issue['comments']),
+            'comments_url': '%s/repos/%s/issues/%i/comments' % (self.url, repo, issue['number']),
+            'html_url': issue['html_url'],
+            'url': '%s/repos/%s/issues/%i' % (self.url, repo, issue['number']),
+            'updated_at': issue['updated'],
+            'created_at': issue['updated'],
+        }
+
+
+class FakePagure(FakeService):
+    """ Pagure API: /api/0/<repo>/issues """
+    routes = [
+        ('GET', r'/api/0/(.+)/issues', 'issues', 'pagure.issues'),
+    ]
+
+    def issues(self, query, payload, repo):
+        issues = self.data['pagure'].get(repo)
+        if issues is None:
+            return 404, {'error': 'Project not found'}
+        return 200, {'issues': [self._issue(issue) for issue in issues],
+                     'total_issues': len(issues)}
+
+    def _issue(self, issue):
+        return {
+            'id': issue['number'],
+            'title': issue['title'],
+            'content': issue['body'],
+            'status': 'Open' if issue['state'] == 'open' else 'Closed',
+            'tags': issue['labels'],
+            'milestone': issue['milestone'],
+            'priority': None,
+            'user': {'name': issue['user'], 'fullname': self.data['users'].get(issue['user'])},
+            'assignee': {'name': issue['assignees'][0],
+                         'fullname': self.data['users'].get(issue['assignees'][0])}
+            if issue['assignees'] else None,
+            'date_created': str(issue['id']),
+            'last_updated': issue['updated'],
+            'comments': [{'id': comment['id'], 'comment': comment['body'],
+                          'user': {'name': comment['user']},
+                          'date_created': '1546300800'}
+                         for comment in issue['comments']],
+        }
+
+
+class FakeJira(FakeService):
+    """ JIRA REST API: search, issue, comments and remote links """
+    routes = [
+        ('GET', r'/rest/api/2/serverInfo', 'server_info', 'jira.server_info'),
+        ('GET', r'/rest/api/2/field', 'fields', 'jira.fields'),
+        ('GET', r'/rest/api/2/search', 'search', 'jira.search'),
+        ('POST', r'/rest/api/2/search', 'search', 'jira.search'),
+        ('GET', r'/rest/api/2/issue/([^/]+)', 'issue', 'jira.issue'),
+        ('PUT', r'/rest/api/2/issue/([^/]+)', 'update', 'jira.update'),
+        ('GET', r'/rest/api/2/issue/([^/]+)/comment', 'comments', 'jira.comments'),
+        ('GET', r'/rest/api/2/issue/([^/]+)/remotelink', 'remote_links', 'jira.remote_link'),
+        ('POST', r'/rest/api/2/issue/([^/]+)/remotelink', 'add_remote_link', 'jira.remote_link'),
+    ]
+    remote_link_query = re.compile(r'linkedIssuesOfRemote\("([^"]*)"\)')
+    project_query = re.compile(r'project\s*=\s*"?([A-Za-z0-9_]+)"?')
+
+    def __init__(self, data, **kwargs):
+        super(FakeJira, self).__init__(data, **kwargs)
+        self._by_key = dict((issue['key'], issue) for issue in data['jira'])
+        self._by_url = {}
+        for issue in data['jira']:
+            for url in issue['links']:
+                self._by_url.setdefault(url, []).append(issue)
+
+    def server_info(self, query, payload):
+        return 200, {'baseUrl': self.url, 'version': '8.20.0',
+                     'versionNumbers': [8, 20, 0], 'deploymentType': 'Server',
+                     'serverTitle': 'Fake JIRA'}
+
+    def fields(self, query, payload):
+        return 200, [{'id': name, 'key': name, 'name': name.capitalize(), 'custom': False,
+                      'navigable': True, 'searchable': True, 'clauseNames': [name]}
+                     for name in ('summary', 'description', 'labels', 'fixVersions',
+                                  'assignee', 'status', 'priority', 'updated')]
+
+    def search(self, query, payload):
+        params = payload or query
+        jql = unquote(params.get('jql', ''))
+        urls = self.remote_link_query.findall(jql)
+        project = self.project_query.search(jql)
+        if len(urls) > 1:
+            issues = self._by_url.get(urls[-1], [])
+        elif project:
+            issues = [issue for issue in self.data['jira']
+                      if issue['key'].split('-')[0] == project.group(1)]
+        else:
+            issues = []
+        start = int(params.get('startAt', 0))
+        count = int(params.get('maxResults', 50))
+        return 200, {'startAt': start, 'maxResults': count, 'total': len(issues),
+                     'issues': [self._issue(issue) for issue in issues[start:start + count]]}
+
+    def issue(self, query, payload, key):
+        issue = self._by_key.get(key)
+        if not issue:
+            return 404, {'errorMessages': ['Issue does not exist']}
+        return 200, self._issue(issue)
+
+    def update(self, query, payload, key):
+        issue = self._by_key.get(key)
+        if not issue:
+            return 404, {'errorMessages': ['Issue does not exist']}
+        issue.update((payload or {}).get('fields', {}))
+        return 204, None
+
+    def comments(self, query, payload, key):
+        issue = self._by_key.get(key)
+        if not issue:
+            return 404, {'errorMessages': ['Issue does not exist']}
+        comments = [{'id': str(index), 'body': body,
+                     'author': {'name': 'jibe', 'displayName': 'Jibe'},
+                     'self': '%s/rest/api/2/issue/%s/comment/%i' % (self.url, key, index)}
+                    for index, body in enumerate(issue['comments'])]
+        return 200, {'startAt': 0, 'maxResults': len(comments),
+                     'total': len(comments), 'comments': comments}
+
+    def remote_links(self, query, payload, key):
+        issue = self._by_key.get(key)
+        if not issue:
+            return 404, {'errorMessages': ['Issue does not exist']}
+        return 200, [{'id': index, 'object': {'url': url, 'title': 'Upstream issue'}}
+                     for index, url in enumerate(issue['links'])]
+
+    def add_remote_link(self, query, payload, key):
+        issue = self._by_key.get(key) or self._by_id(key)
+        if not issue:
+            return 404, {'errorMessages': ['Issue does not exist']}
+        url = payload['object']['url']
+        issue['links'].append(url)
+        self._by_url.setdefault(url, []).append(issue)
+        return 201, {'id': len(issue['links']),
+                     'self': '%s/rest/api/2/issue/%s/remotelink/%i' % (self.url, key, len(issue['links']))}
+
+    def _by_id(self, issue_id):
+        for issue in self.data['jira']:
+            if issue['id'] == issue_id:
+                return issue
+        return None
+
+    def _issue(self, issue):
+        return {
+            'id': issue['id'],
+            'key': issue['key'],
+            'self': '%s/rest/api/2/issue/%s' % (self.url, issue['id']),
+            'fields': {
+                'summary': issue['summary'],
+                'description': issue['description'],
+                'labels': issue['labels'],
+                'fixVersions': [{'name': name} for name in issue['fixVersions']],
+                'assignee': {'name': issue['assignee'], 'displayName': issue['assignee']}
+                if issue['assignee'] else None,
+                'status': {'name': issue['status']},
+                'priority': {'name': issue['priority'],
+                             'iconUrl': '%s/images/%s.svg' % (self.url, issue['priority'].lower())},
+                'updated': issue['updated'],
+            },
+        }
+
+
+class FakeSMTP(object):
+    """
+    SMTP sink accepting every message. Keeps the count and size of the
+    messages it received (not the messages themselves)
+    """
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.messages = 0
+        self.bytes = 0
+        self.connections = 0
+        sink = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            disable_nagle_algorithm = True
+
+            def _reply(self, line):
+                self.wfile.write((line + '\r\n').encode('ascii'))
+
+            def handle(self):
+                sink.connections += 1
+                self._reply('220 fake smtp ready')
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    command = line.decode('utf-8', 'replace').strip().upper()
+                    if command.startswith('EHLO'):
+                        self._reply('250-fake smtp')
+                        self._reply('250 8BITMIME')
+                    elif command.startswith('DATA'):
+                        self._reply('354 end data with <CR><LF>.<CR><LF>')
+                        size = 0
+                        for data in iter(self.rfile.readline, b''):
+                            if data in (b'.\r\n', b'.\n'):
+                                break
+                            size += len(data)
+                        if sink.latency:
+                            time.sleep(sink.latency)
+                        sink.messages += 1
+                        sink.bytes += size
+                        self._reply('250 OK queued')
+                    elif command.startswith('QUIT'):
+                        self._reply('221 bye')
+                        return
+                    else:
+                        # HELO, MAIL, RCPT, RSET, NOOP
+                        self._reply('250 OK')
+
+        class Server(socketserver.ThreadingMixIn, socketserver.TCPServer):
+            daemon_threads = True
+            allow_reuse_address = True
+
+        self.server = Server(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+
+    @property
+    def address(self):
+        return '127.0.0.1:%i' % self.server.server_address[1]
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
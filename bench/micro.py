@@ -0,0 +1,423 @@
+"""
+Micro-benchmarks of the CPU-bound parts of a run, compared against stored
+baselines (bench/baselines.json).
+
+    python -m bench.micro                      # compare with the baselines
+    python -m bench.micro --save               # record new baselines
+    python -m bench.micro --only check_ --scales 1000 --threshold 10
+
+Every benchmark is timed (best of --repeat runs) and run once more under
+tracemalloc for its peak and net allocations. A benchmark that got slower
+or allocates more than --threshold percent over its baseline is flagged
+and the exit status is 1. Times depend on the machine and on how busy it
+is, record the baselines on the (quiet) machine that runs the comparison.
+"""
+# Built In Modules
+import argparse
+import copy
+import gc
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from collections import OrderedDict
+from datetime import datetime
+
+# Local Modules
+from bench import data as bench_data
+
+# Global Variables
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINES = os.path.join(ROOT, 'bench', 'baselines.json')
+SCALES = (10, 1000, 50000)
+JIRA_URL = 'https://jira.example.com'
+# name -> setup(n); setup returns a list of callables (one per repeat)
+# whose inputs are already built, so only the call itself is measured
+BENCHMARKS = OrderedDict()
+
+
+def benchmark(name):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+class Resource(object):
+    """ Stand-in for jira.resources objects (attribute access only) """
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class Sink(object):
+    """ Output for create_html that keeps nothing """
+    def write(self, chunk):
+        pass
+
+
+class Client(object):
+    """ JIRA client stand-in answering comments() from memory """
+    def __init__(self, comments):
+        self._comments = comments
+
+    def comments(self, existing):
+        return self._comments[existing.key]
+
+
+def _downstream():
+    return {'project': bench_data.PROJECT,
+            'check': ['comments', 'tags', 'fixVersion', 'assignee', 'title',
+                      {'transition': bench_data.CLOSED_STATUS}]}
+
+
+def _config(data):
+    """ Config with every repo of the dataset mapped to one shared project """
+    downstream = _downstream()
+    return {'jibe': {
+        'default_jira_instance': 'bench',
+        'jira': {'bench': {'options': {'server': JIRA_URL}}},
+        'send-to': {'bench': {'upstream': {
+            'github': dict((repo, downstream) for repo in data['github']),
+            'pagure': dict((repo, downstream) for repo in data['pagure']),
+        }}},
+    }}
+
+
+def _github_raw(data, repo, issue):
+    """ Github issue as github_issues() hands it to Issue.from_github """
+    return {
+        'id': issue['id'],
+        'title': issue['title'],
+        'html_url': issue['html_url'],
+        'body': issue['body'],
+        'state': issue['state'],
+        'labels': list(issue['labels']),
+        'milestone': issue['milestone'],
+        'user': {'login': issue['user'], 'fullname': data['users'][issue['user']]},
+        'assignees': [{'fullname': data['users'][login]} for login in issue['assignees']],
+        'comments': [{'author': data['users'][comment['user']], 'name': comment['user'],
+                      'body': comment['body'], 'id': comment['id'],
+                      'date_created': datetime(2019, 1, 1), 'changed': None}
+                     for comment in issue['comments']],
+    }
+
+
+def _pagure_raw(data, issue):
+    """ Pagure issue as pagure_issues() hands it to Issue.from_pagure """
+    return {
+        'id': issue['number'],
+        'title': issue['title'],
+        'content': issue['body'],
+        'status': 'Open' if issue['state'] == 'open' else 'Closed',
+        'tags': list(issue['labels']),
+        'milestone': issue['milestone'],
+        'priority': None,
+        'user': {'name': issue['user'], 'fullname': data['users'][issue['user']]},
+        'assignee': [{'fullname': data['users'][issue['assignees'][0]]}
+                     if issue['assignees'] else None],
+        'date_created': str(issue['id']),
+        'comments': [{'id': comment['id'], 'comment': comment['body'],
+                      'user': {'name': comment['user']}, 'date_created': '1546300800'}
+                     for comment in issue['comments']],
+    }
+
+
+def _existing(jira):
+    """ jira.resources.Issue stand-in of a dataset JIRA issue """
+    return Resource(key=jira['key'], fields=Resource(
+        summary=jira['summary'],
+        description=jira['description'],
+        labels=jira['labels'],
+        fixVersions=[Resource(name=name) for name in jira['fixVersions']],
+        assignee=Resource(displayName=jira['assignee']) if jira['assignee'] else None,
+        status=Resource(name=jira['status']),
+        priority=Resource(name=jira['priority'], iconUrl=JIRA_URL + '/major.svg'),
+        updated=jira['updated']))
+
+
+def build(n, seed=0):
+    """
+    Builds n intermediary issues with their matching JIRA issue stand-ins
+    Args:
+        n (int): Number of issues
+        seed (int): Random seed
+    Returns:
+        pairs ([(existing, issue)]): Linked issues
+        client (Client): JIRA client stand-in
+        config (dict): Config dict
+    """
+    from jibe.intermediary import Issue
+    data = bench_data.generate(n, missing=0, seed=seed)
+    config = _config(data)
+    by_url = dict((jira['links'][-1], jira) for jira in data['jira'])
+    pairs = []
+    comments = {}
+    for repo, issues in data['github'].items():
+        for raw in issues:
+            issue = Issue.from_github(repo, _github_raw(data, repo, raw), config, 'bench')
+            pairs.append((by_url[raw['html_url']], issue))
+    for repo, issues in data['pagure'].items():
+        for raw in issues:
+            issue = Issue.from_pagure(repo, _pagure_raw(data, raw), config, 'bench')
+            pairs.append((by_url[raw['html_url']], issue))
+    for jira, issue in pairs:
+        comments[jira['key']] = [Resource(body=body, author=Resource(name='jibe'))
+                                 for body in jira['comments']]
+    return [(_existing(jira), issue) for jira, issue in pairs], Client(comments), config
+
+
+@benchmark('comment_matching')
+def setup_comment_matching(n, repeat):
+    import jibe.downstream as d
+    pairs, client, _ = build(n)
+    inputs = [(issue.comments, client.comments(existing)) for existing, issue in pairs]
+
+    def run():
+        for issue_comments, comments in inputs:
+            d.comment_matching(issue_comments, comments)
+    return [run] * repeat
+
+
+def _check_setup(check):
+    def setup(n, repeat):
+        import jibe.downstream as d
+        pairs, _, _ = build(n)
+        func = getattr(d, check)
+        runs = []
+        for _ in range(repeat):
+            copies = [(existing, copy.copy(issue)) for existing, issue in pairs]
+
+            def run(copies=copies):
+                for existing, issue in copies:
+                    func(existing, issue)
+            runs.append(run)
+        return runs
+    return setup
+
+
+for _check in ('check_tags', 'check_fixVersion', 'check_transition'):
+    benchmark(_check)(_check_setup(_check))
+
+
+@benchmark('update_out_of_sync')
+def setup_update_out_of_sync(n, repeat):
+    import jibe.downstream as d
+    pairs, client, config = build(n)
+    runs = []
+    for _ in range(repeat):
+        copies = [(existing, copy.copy(issue)) for existing, issue in pairs]
+
+        def run(copies=copies):
+            for existing, issue in copies:
+                d.update_out_of_sync(existing, issue, client, config)
+        runs.append(run)
+    return runs
+
+
+def _checked(n):
+    """ Issues as they come out of sync_with_downstream """
+    import jibe.downstream as d
+    pairs, client, config = build(n)
+    issues = []
+    for existing, issue in pairs:
+        issues.append(d.update_out_of_sync(existing, issue, client, config))
+        issue.compact()
+    return issues
+
+
+@benchmark('format_check')
+def setup_format_check(n, repeat):
+    import jibe.main as m
+    issues = _checked(n)
+    return [lambda: m.format_check(issues)] * repeat
+
+
+@benchmark('_github_link_field_to_dict')
+def setup_link_field(n, repeat):
+    import jibe.upstream as u
+    fields = ['<https://api.github.com/repositories/1/issues?page=%i>; rel="next", '
+              '<https://api.github.com/repositories/1/issues?page=%i>; rel="last"' % (page + 1, n)
+              for page in range(n)]
+
+    def run():
+        for field in fields:
+            u._github_link_field_to_dict(field)
+    return [run] * repeat
+
+
+@benchmark('Issue.from_github')
+def setup_from_github(n, repeat):
+    from jibe.intermediary import Issue
+    data = bench_data.generate(n, pagure_share=0, missing=0)
+    config = _config(data)
+    runs = []
+    for _ in range(repeat):
+        raws = [(repo, _github_raw(data, repo, issue))
+                for repo, issues in data['github'].items() for issue in issues]
+
+        def run(raws=raws):
+            for repo, raw in raws:
+                Issue.from_github(repo, raw, config, 'bench')
+        runs.append(run)
+    return runs
+
+
+@benchmark('Issue.from_pagure')
+def setup_from_pagure(n, repeat):
+    from jibe.intermediary import Issue
+    data = bench_data.generate(n, pagure_share=1, missing=0)
+    config = _config(data)
+    runs = []
+    for _ in range(repeat):
+        raws = [(repo, _pagure_raw(data, issue))
+                for repo, issues in data['pagure'].items() for issue in issues]
+
+        def run(raws=raws):
+            for repo, raw in raws:
+                Issue.from_pagure(repo, raw, config, 'bench')
+        runs.append(run)
+    return runs
+
+
+@benchmark('create_html')
+def setup_create_html(n, repeat):
+    import jibe.main as m
+    issues = _checked(n)
+    m.format_check(issues)
+    # Roughly one in ten issues has no downstream issue
+    missing, out_of_sync = issues[::10], [issue for index, issue in enumerate(issues) if index % 10]
+    # Compile the template before timing
+    m.create_html([], [], '')
+
+    def run():
+        m.create_html(out_of_sync, missing, '', output=Sink())
+    return [run] * repeat
+
+
+@benchmark('TitleIndex.candidates')
+def setup_title_candidates(n, repeat):
+    from jibe.similarity import TitleIndex
+    data = bench_data.generate(n, missing=0)
+    index = TitleIndex((jira['key'], jira['summary']) for jira in data['jira'])
+    # At most 1000 lookups, so the time per lookup is comparable across
+    # scales
+    titles = [issue['title'] for issues in data['github'].values()
+              for issue in issues][:1000]
+
+    def run():
+        for title in titles:
+            index.candidates(title)
+    return [run] * repeat
+
+
+def measure(name, n, repeat):
+    """
+    Runs one benchmark at one scale
+    Args:
+        name (str): Benchmark name
+        n (int): Number of issues
+        repeat (int): Number of timed runs
+    Returns:
+        result (dict): Best time, peak and net allocated bytes
+    """
+    runs = BENCHMARKS[name](n, repeat + 1)
+    times = []
+    gc.collect()
+    # Like timeit, keep the garbage collector out of the timings
+    gc.disable()
+    try:
+        for run in runs[:-1]:
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+    finally:
+        gc.enable()
+    # One more run under tracemalloc, it slows things down too much
+    # to be timed
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    runs[-1]()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'seconds': min(times), 'peak_bytes': peak - before, 'net_bytes': current - before}
+
+
+def compare(result, baseline, threshold):
+    """ Returns the metrics of result that are over threshold percent worse than baseline """
+    regressions = []
+    for key in ('seconds', 'peak_bytes'):
+        old, new = baseline.get(key), result[key]
+        if not old:
+            continue
+        change = 100.0 * (new - old) / old
+        # Ignore noise on tiny values (less than 1ms or 64KiB)
+        floor = 0.001 if key == 'seconds' else 65536
+        if change > threshold and new - old > floor:
+            regressions.append((key, old, new, change))
+    return regressions
+
+
+def parse_args(args):
+    argparser = argparse.ArgumentParser(description='Jibe micro-benchmarks')
+    argparser.add_argument('--scales', default=','.join(str(n) for n in SCALES),
+                           help='Comma separated issue counts (default: 10,1000,50000)')
+    argparser.add_argument('--only', metavar='TEXT',
+                           help='Only run benchmarks whose name contains TEXT')
+    argparser.add_argument('--repeat', type=int, default=5,
+                           help='Timed runs per benchmark, the best one counts '
+                                '(at most 3 above 10k issues)')
+    argparser.add_argument('--threshold', type=float, default=20.0, metavar='PERCENT',
+                           help='Flag changes of more than PERCENT (default: 20)')
+    argparser.add_argument('--baselines', default=BASELINES, metavar='FILE')
+    argparser.add_argument('--save', action='store_true',
+                           help='Store the results as the new baselines')
+    return argparser.parse_args(args)
+
+
+def main(args=None):
+    arguments = parse_args(sys.argv[1:] if args is None else args)
+    # The template is loaded relative to the repo root
+    os.chdir(ROOT)
+    # Keep the per check log lines out of the measurements
+    logging.disable(logging.INFO)
+    baselines = {}
+    if os.path.exists(arguments.baselines):
+        with open(arguments.baselines) as fp:
+            baselines = json.load(fp)
+
+    results = {}
+    regressions = 0
+    for name in BENCHMARKS:
+        if arguments.only and arguments.only not in name:
+            continue
+        for n in [int(scale) for scale in arguments.scales.split(',')]:
+            repeat = arguments.repeat if n <= 10000 else min(arguments.repeat, 3)
+            result = measure(name, n, repeat)
+            key = '%s@%i' % (name, n)
+            results[key] = result
+            line = '%-30s %7i issues %10.3f ms %10.1f KiB peak %10.1f KiB net' % (
+                name, n, result['seconds'] * 1000, result['peak_bytes'] / 1024.0,
+                result['net_bytes'] / 1024.0)
+            worse = compare(result, baselines.get(key, {}), arguments.threshold)
+            for metric, old, new, change in worse:
+                line += '\n    REGRESSION %s: %.6g -> %.6g (%+.1f%%)' % (metric, old, new, change)
+            regressions += len(worse)
+            print(line)
+            sys.stdout.flush()
+
+    if arguments.save:
+        baselines.update(results)
+        with open(arguments.baselines, 'w') as fp:
+            json.dump(baselines, fp, indent=2, sort_keys=True)
+            fp.write('\n')
+        print('Saved %i baseline(s) to %s' % (len(results), arguments.baselines))
+    elif regressions:
+        print('%i regression(s) over %.0f%%' % (regressions, arguments.threshold))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
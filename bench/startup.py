@@ -0,0 +1,108 @@
+"""
+Startup benchmark: times fresh `jibe` processes that exit before doing any
+work, so only interpreter start and imports are measured.
+
+    python -m bench.startup                    # jibe --help, 100ms budget
+    python -m bench.startup --repeat 20 --budget 0.15 --imports
+
+The bare interpreter (`python -c pass`) is timed too, it is what no change
+to Jibe can get below. The mail settings are removed from the environment
+so a startup that needs them fails. Exits with 1 if the best `jibe --help`
+takes longer than --budget seconds.
+"""
+# Built In Modules
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+# Global Variables
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# name -> python arguments
+COMMANDS = [
+    ('python', ['-c', 'pass']),
+    ('import jibe.main', ['-c', 'import jibe.main']),
+    ('jibe --help', ['-c', 'import sys; from jibe.main import main; '
+                           'sys.argv = ["jibe", "--help"]; main()']),
+]
+# Modules `jibe --help` must not import
+HEAVY = ('jira', 'github', 'requests', 'jinja2', 'msgpack', 'smtplib')
+
+
+def environment():
+    env = dict(os.environ)
+    for name in ('DEFAULT_FROM', 'DEFAULT_SERVER'):
+        env.pop(name, None)
+    env['PYTHONPATH'] = os.pathsep.join([ROOT] + [path for path in [env.get('PYTHONPATH')] if path])
+    return env
+
+
+def measure(args, repeat):
+    """ Returns the wall time (seconds) of repeat fresh processes """
+    times = []
+    for _ in range(repeat):
+        start = time.time()
+        process = subprocess.run([sys.executable] + args, cwd=ROOT, env=environment(),
+                                 stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        times.append(time.time() - start)
+        if process.returncode:
+            sys.exit('%s failed:\n%s' % (' '.join(args), process.stderr.decode('utf-8', 'replace')))
+    return sorted(times)
+
+
+def imports(args):
+    """ Returns the cumulative import time (microseconds) of the top level modules """
+    process = subprocess.run([sys.executable, '-X', 'importtime'] + args, cwd=ROOT,
+                             env=environment(), stdout=subprocess.DEVNULL,
+                             stderr=subprocess.PIPE)
+    modules = {}
+    for line in process.stderr.decode('utf-8', 'replace').splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, _, cumulative, name = [part.strip() for part in line.replace('import time:', '|').split('|')]
+        # Nested imports are indented
+        if not line.split('|')[-1].startswith('  '):
+            modules[name] = int(cumulative)
+    return modules
+
+
+def parse_args(args):
+    argparser = argparse.ArgumentParser(description='Jibe startup benchmark')
+    argparser.add_argument('--repeat', type=int, default=10,
+                           help='Processes started per command (default: 10)')
+    argparser.add_argument('--budget', type=float, default=0.1, metavar='SECONDS',
+                           help='Best time `jibe --help` may take (default: 0.1)')
+    argparser.add_argument('--imports', action='store_true',
+                           help='Also list the slowest top level imports of `jibe --help`')
+    return argparser.parse_args(args)
+
+
+def main(args=None):
+    arguments = parse_args(sys.argv[1:] if args is None else args)
+    results = {}
+    for name, command in COMMANDS:
+        times = measure(command, arguments.repeat)
+        results[name] = times[0]
+        print('%-20s best %7.1f ms  median %7.1f ms' % (
+            name, times[0] * 1000, times[len(times) // 2] * 1000))
+
+    loaded = imports(COMMANDS[-1][1])
+    heavy = sorted(name for name in loaded if name.split('.')[0] in HEAVY)
+    if arguments.imports:
+        for name, cumulative in sorted(loaded.items(), key=lambda item: -item[1])[:15]:
+            print('    %-30s %7.1f ms' % (name, cumulative / 1000.0))
+    failed = False
+    if heavy:
+        print('jibe --help imports %s' % ', '.join(heavy))
+        failed = True
+    if results['jibe --help'] > arguments.budget:
+        print('jibe --help took %.1f ms, over the %.0f ms budget' % (
+            results['jibe --help'] * 1000, arguments.budget * 1000))
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
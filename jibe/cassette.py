@@ -0,0 +1,183 @@
+# Built In Modules
+import base64
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+from datetime import timedelta
+try:
+    from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode  # py3
+except ImportError:
+    from urlparse import urlsplit, urlunsplit, parse_qsl  # py2
+    from urllib import urlencode
+
+# 3rd Party Modules
+import requests
+import requests.adapters
+from requests.structures import CaseInsensitiveDict
+
+# Global Variables
+log = logging.getLogger(__name__)
+# Response headers that are never written to a cassette
+SKIPPED_HEADERS = ('set-cookie', 'date', 'connection', 'keep-alive',
+                   'transfer-encoding', 'content-encoding', 'content-length')
+# Set up by record() / replay()
+_mode = None
+_cassette_dir = None
+_original_send = None
+# Recorded exchanges per host, and per request key the responses left
+# to replay
+_exchanges = {}
+_replay = {}
+_lock = threading.Lock()
+
+
+def request_key(method, url, body=None):
+    """
+    Key a request is recorded and replayed under: the method, the URL
+    with sorted query parameters and a hash of the body
+    Args:
+        method (str): HTTP method
+        url (str): Full URL
+        body (bytes|str): Request body
+    Returns:
+        key (str): Request key
+    """
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    url = urlunsplit((parts.scheme, parts.netloc, parts.path, query, ''))
+    key = '%s %s' % (method.upper(), url)
+    if body:
+        if not isinstance(body, bytes):
+            body = body.encode('utf-8')
+        key += ' ' + hashlib.sha1(body).hexdigest()[:16]
+    return key
+
+
+def _cassette_path(host):
+    return os.path.join(_cassette_dir, host.replace(':', '_') + '.jsonl.gz')
+
+
+def record(cassette_dir):
+    """
+    Records every HTTP exchange made through requests (and so PyGithub
+    and the jira client) until stop() writes them to cassette_dir
+    Args:
+        cassette_dir (str): Directory for the cassettes, one per host
+    Returns:
+        Nothing
+    """
+    _install('record', cassette_dir)
+
+
+def replay(cassette_dir):
+    """
+    Serves every HTTP request from the cassettes in cassette_dir instead
+    of the network. Identical requests get the recorded responses in
+    the order they were recorded (the last one once they run out).
+    Args:
+        cassette_dir (str): Directory written by record()
+    Returns:
+        Nothing
+    """
+    _install('replay', cassette_dir)
+    for name in sorted(os.listdir(cassette_dir)):
+        if not name.endswith('.jsonl.gz'):
+            continue
+        with gzip.open(os.path.join(cassette_dir, name), 'rt') as fp:
+            for line in fp:
+                exchange = json.loads(line)
+                _replay.setdefault(exchange['key'], []).append(exchange)
+    log.info('   Replaying %i request(s) from %s',
+             sum(len(responses) for responses in _replay.values()), cassette_dir)
+
+
+def _install(mode, cassette_dir):
+    global _mode, _cassette_dir, _original_send
+    if _mode:
+        raise RuntimeError('Already %sing HTTP requests' % _mode)
+    _mode = mode
+    _cassette_dir = cassette_dir
+    _exchanges.clear()
+    _replay.clear()
+    _original_send = requests.adapters.HTTPAdapter.send
+    requests.adapters.HTTPAdapter.send = _send
+
+
+def stop():
+    """
+    Stops recording/replaying. When recording, writes the cassettes
+    Args:
+    Returns:
+        Nothing
+    """
+    global _mode
+    if not _mode:
+        return
+    requests.adapters.HTTPAdapter.send = _original_send
+    if _mode == 'record':
+        if not os.path.isdir(_cassette_dir):
+            os.makedirs(_cassette_dir)
+        for host, exchanges in _exchanges.items():
+            path = _cassette_path(host)
+            # Write to a temporary file first so a crash never leaves
+            # half a cassette
+            with gzip.open(path + '.tmp', 'wt') as fp:
+                for exchange in exchanges:
+                    fp.write(json.dumps(exchange, sort_keys=True) + '\n')
+            os.rename(path + '.tmp', path)
+        log.info('   Recorded %i request(s) to %s',
+                 sum(len(exchanges) for exchanges in _exchanges.values()), _cassette_dir)
+    _mode = None
+    _exchanges.clear()
+    _replay.clear()
+
+
+def _send(adapter, request, **kwargs):
+    key = request_key(request.method, request.url, request.body)
+    if _mode == 'replay':
+        with _lock:
+            responses = _replay.get(key)
+            if not responses:
+                raise requests.exceptions.ConnectionError(
+                    'No recorded response for %s' % key, request=request)
+            exchange = responses.pop(0) if len(responses) > 1 else responses[0]
+        return _build_response(adapter, request, exchange)
+
+    response = _original_send(adapter, request, **kwargs)
+    exchange = {
+        'key': key,
+        'status': response.status_code,
+        'reason': response.reason,
+        'headers': dict((name, value) for name, value in response.headers.items()
+                        if name.lower() not in SKIPPED_HEADERS),
+    }
+    try:
+        # Text compresses a lot better than base64
+        exchange['text'] = response.content.decode('utf-8')
+    except UnicodeDecodeError:
+        exchange['body'] = base64.b64encode(response.content).decode('ascii')
+    with _lock:
+        _exchanges.setdefault(urlsplit(request.url).netloc, []).append(exchange)
+    return response
+
+
+def _build_response(adapter, request, exchange):
+    response = requests.Response()
+    response.status_code = exchange['status']
+    response.reason = exchange['reason']
+    response.headers = CaseInsensitiveDict(exchange['headers'])
+    if 'text' in exchange:
+        response._content = exchange['text'].encode('utf-8')
+    else:
+        response._content = base64.b64decode(exchange['body'])
+    response.raw = io.BytesIO(response._content)
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    response.url = request.url
+    response.request = request
+    response.connection = adapter
+    response.elapsed = timedelta(0)
+    return response
@@ -0,0 +1,225 @@
+"""
+Checkpoints of a run (--state-dir), so --resume skips what it finished.
+
+Reports are sent at most once, like the reports of jibe.spool: a report is
+marked as sending before it is handed to the mail server. If sending fails
+the mark is removed, if the run dies while sending it the report is never
+sent again on its own (remove the mark to send it). Spooled reports are
+marked as sent once the spool delivered them.
+"""
+# Built In Modules
+import io
+import logging
+import os
+import re
+from contextlib import contextmanager
+
+# Local Modules
+from jibe.lazy import LazyModule
+
+# Global Variables
+# Only imported once a checkpoint is read or written
+snapshot = LazyModule('jibe.snapshot')
+log = logging.getLogger(__name__)
+# Set up by enable()
+_state_dir = None
+# Files of a state directory, see clear()
+SUFFIXES = ('.upstream.msgpack', '.downstream.msgpack', '.msgpack.tmp', '.sending',
+            '.spooled', '.sent')
+
+
+def _safe(name):
+    return re.sub(r'[^\w.-]', '_', name)
+
+
+def enable(state_dir, resume=False):
+    """
+    Turns checkpointing on: every repo fetched and every report sent is
+    recorded in state_dir as the run goes
+    Args:
+        state_dir (str): State directory
+        resume (bool): Continue the run recorded in state_dir, a new run
+                       starts from an empty state
+    Returns:
+        Nothing
+    """
+    global _state_dir
+    _state_dir = state_dir
+    if not os.path.isdir(state_dir):
+        os.makedirs(state_dir)
+    elif not resume:
+        clear()
+
+
+def disable():
+    global _state_dir
+    _state_dir = None
+
+
+def enabled():
+    return _state_dir is not None
+
+
+def clear():
+    """
+    Removes the checkpoints of the last run (and only them) from the
+    state directory
+    Args:
+    Returns:
+        Nothing
+    """
+    for root, _, files in os.walk(_state_dir, topdown=False):
+        for name in files:
+            if name.endswith(SUFFIXES):
+                os.remove(os.path.join(root, name))
+        if root != _state_dir and not os.listdir(root):
+            os.rmdir(root)
+
+
+def unit_path(group, source, repo, stage):
+    """
+    Path of the checkpoint of one repo of a group
+    Args:
+        group (str): Group in config file
+        source (str): 'github' or 'pagure'
+        repo (str): Repo in the config
+        stage (str): 'upstream' (its issues) or 'downstream' (its
+                     issues and their JIRA issues)
+    Returns:
+        path (str): Checkpoint file
+    """
+    return os.path.join(_state_dir, _safe(group),
+                        '%s-%s.%s.msgpack' % (source, _safe(repo), stage))
+
+
+def load(group, source, repo, stage):
+    """
+    Reads the checkpoint of a repo
+    Args:
+        group (str): Group in config file
+        source (str): 'github' or 'pagure'
+        repo (str): Repo in the config
+        stage (str): 'upstream' or 'downstream'
+    Returns:
+        records ([dict]): Snapshot records, None without checkpoint
+    """
+    path = unit_path(group, source, repo, stage)
+    if not os.path.exists(path):
+        return None
+    _, records = snapshot.read_snapshot(path)
+    return list(records)
+
+
+def save(group, source, repo, stage, records):
+    """
+    Writes the checkpoint of a repo, atomically so an interrupted run
+    never leaves half of one
+    Args:
+        group (str): Group in config file
+        source (str): 'github' or 'pagure'
+        repo (str): Repo in the config
+        stage (str): 'upstream' or 'downstream'
+        records ([dict]): Snapshot records
+    Returns:
+        Nothing
+    """
+    snapshot.write_records(unit_path(group, source, repo, stage), group, records)
+
+
+def _report_path(group, state):
+    return os.path.join(_state_dir, '%s.%s' % (_safe(group), state))
+
+
+def sent(group):
+    """
+    Whether the report of a group was sent (or is being sent) in this run
+    Args:
+        group (str): Group in config file
+    Returns:
+        sent (bool): True if it must not be sent again
+    """
+    if not enabled():
+        return False
+    if os.path.exists(_report_path(group, 'sent')):
+        return True
+    if os.path.exists(_report_path(group, 'sending')):
+        # The run died while sending it, it may or may not have gone out
+        log.error('   The report of %s may not have been sent, not sending it '
+                  'again (remove %s to send it)', group, _report_path(group, 'sending'))
+        return True
+    return False
+
+
+@contextmanager
+def sending(group):
+    """
+    Records the report of a group as sent around the block that sends
+    it. It is marked before it is sent, so a report is sent at most once
+    even if the run dies halfway; if sending fails the mark is removed
+    """
+    if not enabled():
+        yield
+        return
+    path = _report_path(group, 'sending')
+    with io.open(path, 'w') as fp:
+        fp.write(u'')
+    try:
+        yield
+    except Exception:
+        os.remove(path)
+        raise
+    os.rename(path, _report_path(group, 'sent'))
+
+
+def spooled(group, key):
+    """
+    Records the report of a group as handed to the spool. It is only
+    marked as sent once the delivery worker delivered it (see delivered)
+    Args:
+        group (str): Group in config file
+        key (str): Idempotency key of the spooled report
+    Returns:
+        Nothing
+    """
+    if not enabled():
+        return
+    with io.open(_report_path(group, 'spooled'), 'w', encoding='utf-8') as fp:
+        fp.write(key)
+
+
+def spooled_key(group):
+    """
+    Args:
+        group (str): Group in config file
+    Returns:
+        key (str): Idempotency key of the report of the group if it was
+                   spooled in this run but not delivered yet, else None
+    """
+    if not enabled():
+        return None
+    path = _report_path(group, 'spooled')
+    if not os.path.exists(path):
+        return None
+    with io.open(path, encoding='utf-8') as fp:
+        return fp.read()
+
+
+def delivered(key):
+    """
+    Marks the report spooled under key as sent, called by the delivery
+    worker once the mail server took it
+    Args:
+        key (str): Idempotency key of the delivered report
+    Returns:
+        Nothing
+    """
+    if not enabled():
+        return
+    for name in os.listdir(_state_dir):
+        if not name.endswith('.spooled'):
+            continue
+        path = os.path.join(_state_dir, name)
+        with io.open(path, encoding='utf-8') as fp:
+            if fp.read() != key:
+                continue
+        os.rename(path, path[:-len('.spooled')] + '.sent')
@@ -0,0 +1,284 @@
+# Built In Modules
+import logging
+import os
+import queue
+import socketserver
+import threading
+import time
+from datetime import datetime
+from html import escape
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import urlparse, parse_qs, unquote, quote
+
+# Local Modules
+import jibe.metrics as metrics
+import jibe.webhooks as webhooks
+
+# Global Variables
+log = logging.getLogger(__name__)
+# Seconds an on-demand refresh may take before the request gives up
+REFRESH_TIMEOUT = 3600
+# Largest webhook body accepted (GitHub caps its payloads at 25MB)
+MAX_WEBHOOK_BYTES = 25 * 1024 * 1024
+
+
+class ReportDaemon(threading.Thread):
+    """
+    Long running worker for `jibe serve`. Refreshes the report of every
+    group on a schedule and on demand and keeps the latest one in memory.
+    The reports are rendered (not mailed) at start, the first scheduled
+    run that mails them is one interval later, so restarting the daemon
+    does not mail every group again.
+
+    All refreshes run on this one thread, so the JIRA clients and HTTP
+    sessions (kept per thread) and the compiled template stay warm from
+    one refresh to the next.
+    """
+    def __init__(self, config, refresh, reload_config=None, config_paths=(),
+                 interval=86400, on_event=None):
+        """
+        Args:
+            config (dict): Config dict
+            refresh (function): refresh(group, config, send) runs the
+                                pipeline of a group and returns the HTML
+            reload_config (function): Returns a freshly loaded config
+            config_paths ([str]): Files that trigger reload_config when
+                                  they change
+            interval (float): Seconds between scheduled runs
+            on_event (function): on_event(event, config) applies a
+                                 webhook event and returns the groups it
+                                 changed, None if webhooks are disabled
+        """
+        super(ReportDaemon, self).__init__(name='jibe-daemon')
+        self.daemon = True
+        self.config = config
+        self.refresh = refresh
+        self.reload_config = reload_config
+        self.config_paths = list(config_paths)
+        self.interval = interval
+        self.on_event = on_event
+        # group -> {'html', 'generated', 'status', 'seconds'}
+        self.reports = {}
+        self._mtimes = self._config_mtimes()
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._next_run = time.time() + interval
+
+    @property
+    def groups(self):
+        return list(self.config['jibe']['send-to'])
+
+    def _config_mtimes(self):
+        mtimes = []
+        for path in self.config_paths:
+            try:
+                mtimes.append(os.path.getmtime(path))
+            except OSError:
+                mtimes.append(None)
+        return mtimes
+
+    def check_config(self):
+        """
+        Reloads the config if one of its files changed. Warm clients,
+        sessions and the template are kept.
+        Returns:
+            reloaded (bool): True if the config was reloaded
+        """
+        mtimes = self._config_mtimes()
+        if mtimes == self._mtimes or not self.reload_config:
+            return False
+        self._mtimes = mtimes
+        try:
+            config = self.reload_config()
+        except Exception:
+            # Keep serving with the old config until the file is fixed
+            log.exception('   Could not reload the config, keeping the old one')
+            return False
+        with self._lock:
+            self.config = config
+            for group in list(self.reports):
+                if group not in config['jibe']['send-to']:
+                    del self.reports[group]
+        metrics.increment('config_reloads')
+        log.info('   Reloaded the config (%i group(s))', len(self.groups))
+        return True
+
+    def request_refresh(self, group):
+        """
+        Queues an on-demand refresh of a group (no email is sent)
+        Args:
+            group (str): Group in config file
+        Returns:
+            done (threading.Event): Set once the refresh finished
+        """
+        done = threading.Event()
+        self._queue.put(('refresh', group, done))
+        return done
+
+    def request_event(self, event):
+        """
+        Queues a webhook event, the reports of the groups it changes are
+        re-rendered (not mailed) once it is applied
+        Args:
+            event (dict): Event from jibe.webhooks.parse_event
+        Returns:
+            Nothing
+        """
+        self._queue.put(('event', event, None))
+
+    def stop(self):
+        self._queue.put(None)
+        self.join()
+
+    def run(self):
+        for group in self.groups:
+            self._refresh(group, False)
+        while True:
+            timeout = max(self._next_run - time.time(), 0)
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                # A scheduled run is due, it mails the reports like
+                # a cron run would
+                self.check_config()
+                self._next_run = time.time() + self.interval
+                for group in self.groups:
+                    self._refresh(group, True)
+                continue
+            if item is None:
+                return
+            kind, value, done = item
+            self.check_config()
+            if kind == 'event':
+                self._apply(value)
+            elif value in self.config['jibe']['send-to']:
+                self._refresh(value, False)
+            if done:
+                done.set()
+
+    def _apply(self, event):
+        try:
+            groups = self.on_event(event, self.config)
+        except Exception:
+            # The next full fetch catches up on what was missed
+            log.exception('   Failed to apply %s webhook' % event['source'])
+            metrics.increment('webhooks_failed')
+            return
+        for group in groups:
+            self._refresh(group, False)
+
+    def _refresh(self, group, send):
+        start = time.time()
+        try:
+            with metrics.timer('group', group):
+                html = self.refresh(group, self.config, send)
+            status = 'ok'
+        except Exception:
+            log.exception('   Failed to refresh the report for %s' % group)
+            html, status = None, 'failed'
+        with self._lock:
+            report = self.reports.setdefault(group, {'html': None, 'generated': None})
+            if html is not None:
+                report['html'] = html
+                report['generated'] = time.time()
+            report['status'] = status
+            report['seconds'] = time.time() - start
+        metrics.increment('refreshes_' + status)
+
+
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def make_server(daemon, host='127.0.0.1', port=8787):
+    """
+    Creates the HTTP server of `jibe serve`:
+        GET /                       index of the groups and their reports
+        GET /report/<group>         latest report of a group
+        GET /report/<group>?refresh=1
+                                    refreshes the report first
+        GET /metrics                metrics in the Prometheus format
+        POST /webhook/github        GitHub issue and comment webhooks
+        POST /webhook/pagure        Pagure issue webhooks
+        POST /webhook/jira[/<instance>]
+                                    JIRA webhooks
+    Args:
+        daemon (ReportDaemon): Daemon owning the reports
+        host (str): Address to listen on
+        port (int): Port to listen on
+    Returns:
+        server (ThreadingHTTPServer): Call serve_forever() on it
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            log.debug('   %s - %s', self.address_string(), format % args)
+
+        def _send(self, status, body, content_type='text/html; charset=utf-8'):
+            data = body.encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            if parsed.path == '/':
+                return self._send(200, _index(daemon))
+            if parsed.path == '/metrics':
+                return self._send(200, metrics.to_prometheus(), 'text/plain; version=0.0.4')
+            if not parsed.path.startswith('/report/'):
+                return self._send(404, 'Not found\n', 'text/plain')
+            group = unquote(parsed.path[len('/report/'):])
+            if group not in daemon.groups:
+                return self._send(404, 'Unknown group %s\n' % group, 'text/plain')
+            if parse_qs(parsed.query).get('refresh', ['0'])[-1] not in ('', '0'):
+                if not daemon.request_refresh(group).wait(REFRESH_TIMEOUT):
+                    return self._send(504, 'Refresh of %s timed out\n' % group, 'text/plain')
+            report = daemon.reports.get(group)
+            if not report or report['html'] is None:
+                return self._send(503, 'No report for %s yet\n' % group, 'text/plain')
+            return self._send(200, report['html'])
+
+        def do_POST(self):
+            parts = urlparse(self.path).path.strip('/').split('/')
+            if daemon.on_event is None or parts[0] != 'webhook' or \
+                    len(parts) not in (2, 3):
+                return self._send(404, 'Not found\n', 'text/plain')
+            length = int(self.headers.get('Content-Length') or 0)
+            if length > MAX_WEBHOOK_BYTES:
+                return self._send(413, 'Payload too large\n', 'text/plain')
+            body = self.rfile.read(length)
+            try:
+                event = webhooks.parse_event(
+                    parts[1], self.headers, body, daemon.config,
+                    unquote(parts[2]) if len(parts) == 3 else None)
+            except webhooks.SignatureError as error:
+                log.warning('   Rejected %s webhook: %s', parts[1], error)
+                metrics.increment('webhooks_rejected')
+                return self._send(401, '%s\n' % error, 'text/plain')
+            except (ValueError, KeyError, TypeError):
+                return self._send(400, 'Bad webhook\n', 'text/plain')
+            if event is None:
+                return self._send(200, 'Ignored\n', 'text/plain')
+            daemon.request_event(event)
+            return self._send(202, 'Accepted\n', 'text/plain')
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def _index(daemon):
+    rows = []
+    for group in sorted(daemon.groups):
+        report = daemon.reports.get(group) or {}
+        generated = report.get('generated')
+        rows.append(u'<tr><td><a href="/report/%s">%s</a></td><td>%s</td><td>%s</td>'
+                    u'<td><a href="/report/%s?refresh=1">refresh</a></td></tr>' % (
+                        quote(group), escape(group),
+                        datetime.fromtimestamp(generated).strftime('%Y-%m-%d %H:%M:%S')
+                        if generated else 'pending',
+                        escape(report.get('status', '')), quote(group)))
+    return (u'<html><head><title>Jibe</title></head><body><h1>Jibe reports</h1>'
+            u'<table><tr><th>Group</th><th>Generated</th><th>Status</th><th></th></tr>'
+            u'%s</table></body></html>' % u''.join(rows))
@@ -1,17 +1,33 @@
 # Built In Modules
+import heapq
 import logging
 import re
+import threading
+import time
+from collections import namedtuple, OrderedDict
 from datetime import datetime
 
 # 3rd Party Modules
 import jira.client
 
 # Local Modules
-from jibe.intermediary import Issue, Comment
+from jibe.intermediary import Issue, Comment, IN_SYNC_STATE
+import jibe.metrics as metrics
+from jibe.singleflight import Group
 
 # Global Variables
 log = logging.getLogger(__name__)
 remote_link_title = "Upstream issue"
+# JIRA clients are reused per thread (see get_jira_client)
+_jira_clients = threading.local()
+# Concurrent groups looking up the same JIRA issue share one request
+_jira_issues = Group('jira.issue')
+_jira_comments = Group('jira.comments')
+# Order priority_order compares issues in, lowest first. Covers the
+# default priority schemes of JIRA Server and JIRA Cloud
+PRIORITY_RANKS = {'blocker': 0, 'highest': 0, 'critical': 1, 'high': 1,
+                  'major': 2, 'medium': 2, 'minor': 3, 'low': 3,
+                  'trivial': 4, 'lowest': 4}
 
 
 def get_jira_client(issue, config):
@@ -42,10 +58,38 @@ def get_jira_client(issue, config):
         log.error("   No jira_instance for issue and "
                   "there is no default in the config")
         raise Exception
-    client = jira.client.JIRA(**config['jibe']['jira'][jira_instance])
+    return get_jira_instance_client(jira_instance, config)
+
+
+def get_jira_instance_client(jira_instance, config):
+    """
+    Returns the JIRA client of a JIRA instance
+    Args:
+        jira_instance (str): JIRA instance in the config
+        config (dict): Config dict
+    Returns:
+        client (jira.client.JIRA): JIRA client
+    """
+    # Reuse the client (and its HTTP connection pool) of this thread
+    clients = _jira_clients.__dict__
+    client = clients.get(jira_instance)
+    metrics.cache('jira_client', client is not None)
+    if client is None:
+        client = jira.client.JIRA(**config['jibe']['jira'][jira_instance])
+        clients[jira_instance] = client
     return client
 
 
+def reset_jira_clients():
+    """
+    Drops the JIRA clients of this thread, i.e. after their config changed
+    Args:
+    Returns:
+        Nothing
+    """
+    _jira_clients.__dict__.clear()
+
+
 def matching_jira_issue_query(client, issue, config, free=False):
     """
     API calls that find matching JIRA tickets if any are present
@@ -64,7 +108,8 @@ def matching_jira_issue_query(client, issue, config, free=False):
     if free:
         query += ' and statusCategory != Done'
     # Query the JIRA client and store the results
-    results_of_query = client.search_issues(query)
+    with metrics.request('jira.search'):
+        results_of_query = client.search_issues(query)
 
     if len(results_of_query) > 1:
         # Sometimes if an issue gets dropped it is created with the
@@ -154,15 +199,57 @@ def check_comments_for_duplicate(client, result, username):
         return (jira.resource.Issue): JIRA issue if we were able to
                                       find it
     """
-    for comment in client.comments(result):
+    for comment in get_comments(client, result):
         search = re.search(r'Marking as duplicate of (\w*)-(\d*)',
                            comment.body)
         if search and comment.author.name == username:
             issue_id = search.groups()[0] + '-' + search.groups()[1]
-            return client.issue(issue_id)
+            return get_issue(client, issue_id)
     return True
 
 
+def get_issue(client, issue_id):
+    """
+    Gets a JIRA issue, concurrent lookups of the same issue share one
+    request
+    Args:
+        client (jira.client.JIRA): JIRA client
+        issue_id (str): Key of the JIRA issue (i.e. FACTORY-1234)
+    Returns:
+        issue (jira.resource.Issue): JIRA issue
+    """
+    return _jira_issues.do((_server(client), issue_id), _fetch_issue, client, issue_id)
+
+
+def _fetch_issue(client, issue_id):
+    with metrics.request('jira.issue'):
+        return client.issue(issue_id)
+
+
+def get_comments(client, existing):
+    """
+    Gets the comments of a JIRA issue, concurrent lookups of the same
+    issue share one request
+    Args:
+        client (jira.client.JIRA): JIRA client
+        existing (jira.resource.Issue): JIRA issue
+    Returns:
+        comments ([jira.resource.Comment]): Comments of the issue
+    """
+    return _jira_comments.do((_server(client), existing.key), _fetch_comments, client, existing)
+
+
+def _server(client):
+    # Clients that answer from memory (snapshots, benches) have no server,
+    # their lookups are only shared with themselves
+    return getattr(client, 'server_url', id(client))
+
+
+def _fetch_comments(client, existing):
+    with metrics.request('jira.comments'):
+        return client.comments(existing)
+
+
 def get_existing_jira_issue(client, issue, config):
     """
     Get a jira issue by the linked remote issue.
@@ -220,7 +307,7 @@ def check_comments(existing, issue, client):
                                             out-of-sync updated
     """
     # Get all existing comments
-    comments = client.comments(existing)
+    comments = get_comments(client, existing)
     # Remove any comments that have already been added
     comments_d = comment_matching(issue.comments, comments)
     updated_comments = []
@@ -304,17 +391,19 @@ def check_assignee(existing, issue):
         response (jibe.intermediary.Issue): Issue object with updated
                                             out-of-sync updated
     """
-    if existing.fields.assignee and issue.assignee:
+    # Pagure wraps a missing assignee as [None], Github uses []
+    assignee = issue.assignee[0] if issue.assignee else None
+    if existing.fields.assignee and assignee:
         if existing.fields.assignee.displayName\
-                == issue.assignee[0]['fullname']:
+                == assignee['fullname']:
             # If they're the same return
             return issue
-    elif not issue.assignee and not issue.assingee[0]:
+    elif not existing.fields.assignee and not assignee:
         # If they are both unassigned
         return issue
     # Else they are different
-    if issue.assignee[0]:
-        upstream = issue.assignee[0]['fullname']
+    if assignee:
+        upstream = assignee['fullname']
     else:
         upstream = 'Unassigned'
     if existing.fields.assignee:
@@ -358,17 +447,8 @@ def check_transition(existing, issue):
         response (jibe.intermediary.Issue): Issue object with updated
                                             out-of-sync updated
     """
-    # First get the closed status from the config file
-    try:
-        # For python 3 >
-        closed_status = list(
-            filter(lambda d: "transition" in d, issue.downstream.get(
-                'check')))[0]['transition']
-    except ValueError:
-        # for python 2.7
-        closed_status = (
-            filter(lambda d: "transition" in d, issue.downstream.get(
-                'check')))[0]['transition']
+    # First get the closed status from the compiled check plan
+    closed_status = get_check_plan(issue.downstream).closed_status
     if issue.status == 'Closed' and\
             existing.fields.status.name.upper() == closed_status.upper() or \
             issue.status == 'Open' and \
@@ -393,6 +473,119 @@ def check_transition(existing, issue):
     return issue
 
 
+# An immutable, per-project compilation of the config 'check' list
+#   checks: ordered tuple of (name, callable(existing, issue, client))
+#   closed_status: JIRA status used by the transition check (or None)
+#   names: check names used by the JINJA template (issue.check)
+CheckPlan = namedtuple('CheckPlan', ['checks', 'closed_status', 'names'])
+
+# Registered checks in the order they were added. The callables look up
+# the module level check functions when called so they can be patched
+CHECKS = OrderedDict([
+    ('comments', lambda existing, issue, client: check_comments(existing, issue, client)),
+    ('tags', lambda existing, issue, client: check_tags(existing, issue)),
+    ('fixVersion', lambda existing, issue, client: check_fixVersion(existing, issue)),
+    ('assignee', lambda existing, issue, client: check_assignee(existing, issue)),
+    ('title', lambda existing, issue, client: check_title(existing, issue)),
+    ('transition', lambda existing, issue, client: check_transition(existing, issue)),
+])
+
+
+# Fields of the JIRA issue (existing.fields) kept by snapshots, see
+# jibe.snapshot.downstream_record. Runs from snapshots ('jibe report',
+# 'jibe merge', 'jibe serve' and --state-dir) give the checks a stand-in
+# with only these fields, existing.key and client.comments(existing)
+SNAPSHOT_FIELDS = ('summary', 'description', 'labels', 'fixVersions',
+                   'assignee', 'status', 'priority', 'updated')
+
+
+def register_check(name, check, fields=()):
+    """
+    Registers a (third-party) check that can be used in the config
+    'check' list. The check must set issue.out_of_sync[name] when the
+    issue is out of sync and return the issue. It may only read the
+    fields of existing it declares, which snapshots must keep (see
+    SNAPSHOT_FIELDS), so it works the same in every mode.
+    Args:
+        name (str): Name of the check as used in the config file
+        check (function): Callable taking (existing, issue, client)
+        fields ([str]): Fields of existing.fields the check reads
+    Returns:
+        Nothing
+    Raises:
+        ValueError: If snapshots don't keep one of the fields
+    """
+    missing = [field for field in fields if field not in SNAPSHOT_FIELDS]
+    if missing:
+        raise ValueError('Check %r reads %s, snapshots only keep %s' % (
+            name, ', '.join(missing), ', '.join(SNAPSHOT_FIELDS)))
+    CHECKS[name] = check
+
+
+def compile_check_plan(check):
+    """
+    Compiles a config 'check' list into a CheckPlan
+    Args:
+        check (list): Check list from the config file, i.e.
+                      ['comments', {'transition': 'Closed'}]
+    Returns:
+        plan (CheckPlan): Compiled check plan
+    """
+    checks = []
+    closed_status = None
+    for item in check or []:
+        if isinstance(item, dict):
+            # Checks with options, i.e. {'transition': 'CLOSED_STATUS'}
+            names = list(item.keys())
+            if 'transition' in item:
+                closed_status = item['transition']
+        else:
+            names = [item]
+        for name in names:
+            if name not in CHECKS:
+                log.warning('   Unknown check %r in config, skipping' % name)
+                continue
+            checks.append((name, CHECKS[name]))
+    if any(name == 'transition' for name, _ in checks) and not closed_status:
+        log.warning('   No closed status given for transition check, skipping')
+        checks = [(name, func) for name, func in checks if name != 'transition']
+    return CheckPlan(checks=tuple(checks),
+                     closed_status=closed_status,
+                     names=tuple(name for name, _ in checks))
+
+
+def get_check_plan(downstream):
+    """
+    Returns the CheckPlan of a project, compiling (and storing) it if
+    that has not happened at config load
+    Args:
+        downstream (dict): Project config (issue.downstream)
+    Returns:
+        plan (CheckPlan): Compiled check plan
+    """
+    plan = downstream.get('check_plan')
+    if plan is None:
+        plan = compile_check_plan(downstream.get('check'))
+        downstream['check_plan'] = plan
+    return plan
+
+
+def compile_check_plans(config):
+    """
+    Compiles the check plan of every project in the config so all
+    issues of a project share it
+    Args:
+        config (dict): Config dict
+    Returns:
+        Nothing
+    """
+    for group in config['jibe'].get('send-to', {}).values():
+        for repos in group.get('upstream', {}).values():
+            for downstream in repos.values():
+                downstream['check_plan'] = compile_check_plan(
+                    downstream.get('check'))
+
+
 def update_out_of_sync(existing, issue, client, config):
     """
     Updates the 'out-of-sync' list to indicate fields that are out of sync
@@ -404,8 +597,8 @@ def update_out_of_sync(existing, issue, client, config):
     Returns:
         response (lst): Returns a list of matching JIRA issues if any are found
     """
-    # Get the list of what to check
-    check = issue.downstream.get('check', {})
+    # Get the compiled plan of what to check
+    plan = get_check_plan(issue.downstream)
 
     # Update basic information
     # Update issue key (i.e. FACTORY-XXX)
@@ -429,85 +622,197 @@ def update_out_of_sync(existing, issue, client, config):
         issue.priority = 'Unknown'
         issue.priority_icon = 'Unknown'
 
-    if not check:
-        # Something might be up if check returns {}
+    if not plan.checks:
+        # Something might be up if the plan is empty
         log.warning('   Nothing to check for issue %s' % issue.title)
         return issue
 
     total_done = 0
 
-    if 'comments' in check:
-        log.info('   Looking for out of sync comment(s)')
-        issue = check_comments(existing, issue, client)
-        if issue.out_of_sync['comments'] == 'in-sync':
-            total_done += 1
-
-    if 'tags' in check:
-        log.info('   Looking for out of sync tags')
-        issue = check_tags(existing, issue)
-        if issue.out_of_sync['tags'] == 'in-sync':
-            total_done += 1
-
-    if 'fixVersion' in check:
-        log.info('   Looking for out of sync fixVersion(s)')
-        issue = check_fixVersion(existing, issue)
-        if issue.out_of_sync['fixVersion'] == 'in-sync':
-            total_done += 1
-
-    if 'assignee' in check:
-        log.info('   Looking for out of sync assignee(s)')
-        issue = check_assignee(existing, issue)
-        if issue.out_of_sync['assignee'] == 'in-sync':
-            total_done += 1
-
-    if 'title' in check:
-        log.info('   Looking for out of sync title')
-        issue = check_title(existing, issue)
-        if issue.out_of_sync['title'] == 'in-sync':
-            total_done += 1
-
-    if any('transition' in item for item in check):
-        log.info('   Looking for out of sync transition state')
-        issue = check_transition(existing, issue)
-        if issue.out_of_sync['transition'] == 'in-sync':
+    for name, check in plan.checks:
+        log.info('   Looking for out of sync %s', name)
+        issue = check(existing, issue, client)
+        if issue.sync_state(name) == IN_SYNC_STATE:
             total_done += 1
 
     # Update percent done
-    issue.total = len(check)
+    issue.total = len(plan.checks)
     issue.done = total_done
     issue.percent_done = int(100 * float(issue.done) / float(issue.total))
     return issue
 
 
-def sync_with_downstream(issues, config):
+def sync_with_downstream(issues, config, top=None):
     """
     Function to clean up upstream issues that are already in sync
     Args:
         issues ([jibe.intermediary.Issue]): All upstream issues
         config (dict): Config dict
+        top (int): Only keep the top worst checked issues (see TopIssues)
     Returns:
         out_of_sync_issues ([jibe.intermediary.Issues]): List of issues that are out of sync
         missing_issues ([jibe.intermediary.Issues]): List of issues where no matching
                                                    JIRA issue could be found
     """
-    out_of_sync_issues = []
+    out_of_sync_issues = collector(top)
     missing_issues = []
     # Loop through all issues and find out if their out of sync
     for issue in issues:
-        log.info("   Considering upstream %s, %s", issue.url, issue.title)
-        # Create a client connection for this issue
-        client = get_jira_client(issue, config)
-
-        # Try to find
-        existing = get_existing_jira_issue(client, issue, config)
-        if existing:
-            # If we found an existing JIRA issue already
-            log.info("   Found existing, matching downstream %r.", existing.key)
-            # Update relevant metadata (i.e. tags, assignee, etc)
-            updated_issue = update_out_of_sync(existing, issue, client, config)
+        found, updated_issue = _sync_issue(issue, config)
+        if found:
             out_of_sync_issues.append(updated_issue)
         else:
-            log.warning("   Could not find existing issue for %s", issue.title)
             missing_issues.append(issue)
 
     return out_of_sync_issues, missing_issues
+
+
+def _sync_issue(issue, config):
+    """
+    Finds the JIRA issue of an upstream issue and checks it
+    Args:
+        issue (jibe.intermediary.Issue): Upstream issue
+        config (dict): Config dict
+    Returns:
+        found (bool): Whether it has a JIRA issue
+        issue (jibe.intermediary.Issue): The checked issue
+    """
+    log.info("   Considering upstream %s, %s", issue.url, issue.title)
+    # Create a client connection for this issue
+    client = get_jira_client(issue, config)
+
+    # Try to find
+    existing = get_existing_jira_issue(client, issue, config)
+    if existing:
+        # If we found an existing JIRA issue already
+        log.info("   Found existing, matching downstream %r.", existing.key)
+        # Update relevant metadata (i.e. tags, assignee, etc)
+        updated_issue = update_out_of_sync(existing, issue, client, config)
+    else:
+        log.warning("   Could not find existing issue for %s", issue.title)
+        updated_issue = issue
+    # The checks are done, drop what the report doesn't need
+    issue.compact()
+    return bool(existing), updated_issue
+
+
+def priority_order(issues, priorities):
+    """
+    Sorts issues by the priority of their JIRA issue when it was last
+    seen (Blocker first), then by their last upstream update (newest
+    first). Issues whose priority isn't known rank like Major ones
+    Args:
+        issues ([jibe.intermediary.Issue]): Upstream issues
+        priorities (dict): Upstream URL -> JIRA priority name
+    Returns:
+        issues ([jibe.intermediary.Issue]): Sorted issues
+    """
+    default = PRIORITY_RANKS['major']
+
+    def key(issue):
+        name = priorities.get(issue.url) or ''
+        return PRIORITY_RANKS.get(name.lower(), default), -issue.updated
+    return sorted(issues, key=key)
+
+
+def sync_until(issues, config, deadline, priorities, top=None):
+    """
+    Like sync_with_downstream, but compares the most important issues
+    first (see priority_order) and starts no comparison after the
+    deadline. Records the JIRA priority of every issue it compares
+    Args:
+        issues ([jibe.intermediary.Issue]): All upstream issues
+        config (dict): Config dict
+        deadline (float): Unix time after which no issue is compared
+        priorities (dict): Upstream URL -> JIRA priority name, updated
+                           with the priorities seen
+        top (int): Only keep the top worst checked issues (see TopIssues)
+    Returns:
+        out_of_sync_issues ([jibe.intermediary.Issues]): Checked issues
+        missing_issues ([jibe.intermediary.Issues]): Issues without JIRA issue
+        unchecked_issues ([jibe.intermediary.Issues]): Issues that were not
+                                                     compared in time
+    """
+    out_of_sync_issues = collector(top)
+    missing_issues = []
+    ordered = priority_order(issues, priorities)
+    for index, issue in enumerate(ordered):
+        if time.time() >= deadline:
+            unchecked = ordered[index:]
+            log.warning("   Deadline reached, %i issue(s) not checked", len(unchecked))
+            metrics.increment('issues_unchecked', len(unchecked))
+            return out_of_sync_issues, missing_issues, unchecked
+        found, updated_issue = _sync_issue(issue, config)
+        if found:
+            # Set from the JIRA issue by update_out_of_sync
+            priorities[issue.url] = issue.priority
+            out_of_sync_issues.append(updated_issue)
+        else:
+            missing_issues.append(issue)
+    return out_of_sync_issues, missing_issues, []
+
+
+class TopIssues(object):
+    """
+    Keeps the top worst of the checked issues as they are compared: the
+    most failed checks first, then the highest JIRA priority, then the
+    first compared. A heap of at most top issues holds them, the issues
+    pushed out are only counted (see left_out), so memory doesn't grow
+    with the group
+    """
+    def __init__(self, top):
+        self.top = top
+        self._heap = []
+        self._seen = 0
+        self.left_out = {'issues': 0, 'in_sync': 0, 'checks': OrderedDict()}
+
+    @staticmethod
+    def failed(issue):
+        return len(issue.failed_checks())
+
+    def _key(self, issue):
+        # The heap pops the least bad issue first
+        rank = PRIORITY_RANKS.get((issue.priority or '').lower(), PRIORITY_RANKS['major'])
+        return self.failed(issue), -rank, -self._seen
+
+    def append(self, issue):
+        self._seen += 1
+        entry = self._key(issue) + (issue,)
+        if len(self._heap) < self.top:
+            heapq.heappush(self._heap, entry)
+            return
+        if entry[:3] > self._heap[0][:3]:
+            entry = heapq.heapreplace(self._heap, entry)
+        self._count(entry[-1])
+
+    def _count(self, issue):
+        self.left_out['issues'] += 1
+        if not self.failed(issue):
+            self.left_out['in_sync'] += 1
+        for name in issue.failed_checks():
+            self.left_out['checks'][name] = self.left_out['checks'].get(name, 0) + 1
+
+    def issues(self):
+        """ The kept issues, worst first """
+        return [entry[-1] for entry in sorted(self._heap, key=lambda entry: entry[:3],
+                                              reverse=True)]
+
+    def __iter__(self):
+        return iter(self.issues())
+
+    def __len__(self):
+        return len(self._heap)
+
+
+def collector(top=None):
+    """
+    Returns what the checked issues are collected in: a list, or a
+    TopIssues if only the top worst are kept (--top)
+    Args:
+        top (int): Number of issues to keep, None for all
+    Returns:
+        issues (list or TopIssues): Empty collection
+    """
+    if top:
+        return TopIssues(top)
+    return []
@@ -1,12 +1,98 @@
 # Built In Modules
+import calendar
 from datetime import datetime
+try:
+    from collections.abc import MutableMapping  # py3
+except ImportError:
+    from collections import MutableMapping  # py2
+
+# Global Variables
+# Sync state of a check that found nothing out of sync
+IN_SYNC = 'in-sync'
+# Checks every issue reports on, in template order
+SYNC_FIELDS = ('comments', 'tags', 'fixVersion', 'assignee', 'title',
+               'transition')
+# Integer sync states returned by Issue.sync_state
+IN_SYNC_STATE = 0
+OUT_OF_SYNC_STATE = 1
+
+
+def _timestamp(value):
+    """
+    Unix time of an upstream date: Pagure sends seconds as a string,
+    GitHub an ISO 8601 string
+    Args:
+        value (str): Upstream date, or None
+    Returns:
+        timestamp (float): Unix time, 0 if it can't be read
+    """
+    if not value:
+        return 0.0
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return float(calendar.timegm(datetime.strptime(value[:19], '%Y-%m-%dT%H:%M:%S').timetuple()))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class OutOfSync(MutableMapping):
+    """
+    Dict-like view of an issue's out of sync checks. Checks that are
+    in sync are not stored, reading them returns IN_SYNC.
+    """
+    __slots__ = ('_issue',)
+
+    def __init__(self, issue):
+        self._issue = issue
+
+    def __getitem__(self, name):
+        details = self._issue._out_of_sync
+        if details and name in details:
+            return details[name]
+        return IN_SYNC
+
+    def __setitem__(self, name, value):
+        details = self._issue._out_of_sync
+        if value == IN_SYNC:
+            if details:
+                details.pop(name, None)
+            return
+        if details is None:
+            details = self._issue._out_of_sync = {}
+        details[name] = value
+
+    def __delitem__(self, name):
+        self[name] = IN_SYNC
+
+    def __iter__(self):
+        details = self._issue._out_of_sync or {}
+        for name in SYNC_FIELDS:
+            yield name
+        for name in details:
+            if name not in SYNC_FIELDS:
+                yield name
+
+    def __len__(self):
+        return len(list(iter(self)))
+
+    def __repr__(self):
+        return repr(dict(self.items()))
 
 
 class Issue(object):
+    __slots__ = ('source', 'title', 'url', 'upstream', 'comments', 'tags',
+                 'fixVersion', 'priority', 'priority_icon', 'content',
+                 'reporter', 'assignee', 'status', 'id', 'downstream_url',
+                 'downstream_id', 'percent_done', 'done', 'total', 'check',
+                 'downstream', 'candidates', 'updated', '_out_of_sync')
+
     def __init__(self, source, title, url, upstream, comments,
                  config, tags, fixVersion, priority, priority_icon,
                  content, reporter, assignee, status, id, group,
-                 downstream=None):
+                 downstream=None, updated=None):
         self.source = source
         self.title = title
         self.url = url
@@ -21,18 +107,18 @@ class Issue(object):
         self.assignee = assignee
         self.status = status
         self.id = str(id)
+        # Unix time of the last upstream update, 0 if unknown
+        self.updated = _timestamp(updated)
         self.downstream_url = ''
         self.downstream_id = ''
         self.percent_done = ''
         self.done = ''
         self.total = ''
-        self.check = []
-        self.out_of_sync = {'comments': 'in-sync',
-                            'tags': 'in-sync',
-                            'fixVersion': 'in-sync',
-                            'assignee': 'in-sync',
-                            'title': 'in-sync',
-                            'transition': 'in-sync'}
+        self.check = ()
+        # Likely JIRA issues of a missing issue, see jibe.similarity
+        self.candidates = ()
+        # Only the details of out of sync checks are stored
+        self._out_of_sync = None
         if not downstream:
             self.downstream = config['jibe']['send-to'][group]['upstream'][self.source][upstream]
         else:
@@ -42,6 +128,51 @@ class Issue(object):
     def upstream_title(self):
         return u'[%s] %s' % (self.upstream, self.title)
 
+    @property
+    def out_of_sync(self):
+        return OutOfSync(self)
+
+    @out_of_sync.setter
+    def out_of_sync(self, value):
+        self._out_of_sync = None
+        for name, details in value.items():
+            self.out_of_sync[name] = details
+
+    def sync_state(self, name):
+        """
+        Returns the sync state of a check
+        Args:
+            name (str): Name of the check
+        Returns:
+            state (int): IN_SYNC_STATE or OUT_OF_SYNC_STATE
+        """
+        if self._out_of_sync and name in self._out_of_sync:
+            return OUT_OF_SYNC_STATE
+        return IN_SYNC_STATE
+
+    def failed_checks(self):
+        """
+        Returns the checks that are out of sync
+        Args:
+        Returns:
+            names ([str]): Names of the out of sync checks, in the order
+                           they were set
+        """
+        return list(self._out_of_sync or ())
+
+    def compact(self):
+        """
+        Drops the fields that are only needed by the checks (body, comment
+        bodies, raw reporter/assignee data) once the issue was compared
+        Args:
+        Returns:
+            Nothing
+        """
+        self.content = None
+        self.comments = None
+        self.reporter = None
+        self.assignee = None
+
     @classmethod
     def from_github(cls, upstream, issue, config, group):
         comments = []
@@ -78,7 +209,8 @@ class Issue(object):
             assignee=issue['assignees'],
             status=issue['state'],
             id=issue['id'],
-            group=group
+            group=group,
+            updated=issue.get('updated_at')
         )
 
     @classmethod
@@ -118,7 +250,8 @@ class Issue(object):
             assignee=issue['assignee'],
             status=issue['status'],
             id=issue['date_created'],
-            group=group
+            group=group,
+            updated=issue.get('last_updated')
         )
 
     def __repr__(self):
@@ -126,6 +259,8 @@ class Issue(object):
 
 
 class Comment(object):
+    __slots__ = ('author', 'body', 'date_created')
+
     def __init__(self, author, body, date_created):
         self.author = author
         self.body = body
@@ -0,0 +1,59 @@
+# Built In Modules
+import importlib
+import sys
+import types
+
+
+class LazyModule(types.ModuleType):
+    """
+    Stands in for a module and only imports it when one of its attributes
+    is first used, so heavy dependencies (jira, PyGithub, requests,
+    jinja2) are only paid for on the code paths that need them.
+
+    Attributes are set and deleted on the real module, so mock.patch
+    works through the stand-in like it does on the module itself. Once
+    the module is imported, the globals of the module that made the
+    stand-in are pointed at the real module, so later uses cost no more
+    than a plain import.
+    """
+    def __init__(self, name, import_name=None):
+        """
+        Args:
+            name (str): Module the stand-in resolves to
+            import_name (str): Module to import, defaults to name (i.e.
+                               'jira.client' to use 'jira.client.JIRA'
+                               through a stand-in for 'jira')
+        """
+        super(LazyModule, self).__init__(name)
+        self.__dict__['_lazy_import'] = import_name or name
+        self.__dict__['_lazy_module'] = None
+        # Globals of the module the stand-in is made in
+        self.__dict__['_lazy_globals'] = sys._getframe(1).f_globals
+
+    def _load(self):
+        module = self.__dict__['_lazy_module']
+        if module is None:
+            importlib.import_module(self.__dict__['_lazy_import'])
+            module = self.__dict__['_lazy_module'] = sys.modules[self.__name__]
+            namespace = self.__dict__['_lazy_globals']
+            for name, value in list(namespace.items()):
+                if value is self:
+                    namespace[name] = module
+        return module
+
+    def __getattr__(self, name):
+        # Only called for what the stand-in itself doesn't have
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._load(), name, value)
+
+    def __delattr__(self, name):
+        delattr(self._load(), name)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'loaded' if self.__dict__['_lazy_module'] else 'not loaded'
+        return '<lazy module %r (%s)>' % (self.__name__, state)
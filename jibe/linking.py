@@ -0,0 +1,157 @@
+# Built In Modules
+import csv
+import io
+import json
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Local Modules
+import jibe.downstream as d
+import jibe.metrics as metrics
+
+# Global Variables
+log = logging.getLogger(__name__)
+
+
+def _reason(error):
+    # JiraError messages span several lines (headers, response body)
+    lines = str(error).strip().splitlines()
+    return lines[0] if lines else type(error).__name__
+
+
+def read_links(path, config):
+    """
+    Reads the links to add from a JSONL file ({"issue": "FACTORY-1",
+    "url": "...", "jira_instance": "..."} per line) or a CSV file
+    (issue,url[,jira_instance] per row, with an optional header row)
+    Args:
+        path (str): .jsonl or .csv file
+        config (dict): Config dict
+    Returns:
+        links (OrderedDict): (jira_instance, issue key) -> [url], in file
+                             order and without duplicates
+    """
+    default_instance = config['jibe']['default_jira_instance']
+    links = OrderedDict()
+    with io.open(path, encoding='utf-8') as fp:
+        if path.endswith('.jsonl') or path.endswith('.json'):
+            rows = [json.loads(line) for line in fp if line.strip()]
+        else:
+            rows = []
+            for row in csv.reader(fp):
+                if not row or row[0].strip().lower() == 'issue':
+                    continue
+                rows.append(dict(zip(('issue', 'url', 'jira_instance'),
+                                     [value.strip() for value in row])))
+    for number, row in enumerate(rows, 1):
+        if not row.get('issue') or not row.get('url'):
+            raise ValueError('%s: entry %i needs an issue and a url' % (path, number))
+        key = (row.get('jira_instance') or default_instance, row['issue'])
+        urls = links.setdefault(key, [])
+        if row['url'] not in urls:
+            urls.append(row['url'])
+    return links
+
+
+def link_issue(client, issue_id, urls, title=d.remote_link_title):
+    """
+    Adds the remote links an issue doesn't have yet and then re-indexes
+    it once, however many links were added
+    Args:
+        client (jira.client.JIRA): JIRA client
+        issue_id (str): Jira issue id (i.e. FACTORY-1245)
+        urls ([str]): Upstream URLs to link
+        title (str): Title of the remote links
+    Returns:
+        linked ([str]): URLs that were linked
+        skipped ([str]): URLs that were already linked
+        failed ([(str, str)]): (url, error) tuples
+    """
+    with metrics.request('jira.issue'):
+        downstream = client.issue(issue_id)
+    # All existing links of the issue in one request
+    with metrics.request('jira.remote_link'):
+        existing = set(link.object.url for link in client.remote_links(issue_id))
+
+    # Querying for application links requires admin perms, see
+    # jibe.main.attach_link_helper
+    client._applicationlinks = []  # pylint: disable=protected-access
+    linked, skipped, failed = [], [], []
+    for url in urls:
+        if url in existing:
+            skipped.append(url)
+            continue
+        try:
+            with metrics.request('jira.remote_link'):
+                client.add_remote_link(downstream.id, dict(url=url, title=title))
+        except Exception as error:
+            failed.append((url, _reason(error)))
+            continue
+        linked.append(url)
+
+    if linked:
+        # Edit the issue so it gets re-indexed, otherwise our searches
+        # won't find the new links
+        log.debug("    Modifying desc of %r to trigger re-index.", issue_id)
+        try:
+            with metrics.request('jira.update'):
+                downstream.update({'description': (downstream.fields.description or '') + ' '})
+        except Exception as error:
+            # The links are there, they are only found by searches once
+            # the issue is re-indexed
+            log.warning('   Could not re-index %s after linking it: %s', issue_id, _reason(error))
+    return linked, skipped, failed
+
+
+def link_all(links, config, jobs=1):
+    """
+    Adds remote links to many JIRA issues, up to jobs issues at a time.
+    JIRA clients are reused per thread and instance
+    Args:
+        links (OrderedDict): Links from read_links
+        config (dict): Config dict
+        jobs (int): Issues linked concurrently
+    Returns:
+        summary (dict): Counts of linked, skipped and failed links and the
+                        failures as (issue, url, error) tuples
+    """
+    summary = {'issues': len(links), 'linked': 0, 'skipped': 0, 'failures': []}
+    lock = threading.Lock()
+    done = [0]
+    # Log the progress about every 10%
+    every = max(len(links) // 10, 1)
+
+    def run(item):
+        (jira_instance, issue_id), urls = item
+        try:
+            client = d.get_jira_instance_client(jira_instance, config)
+            linked, skipped, failed = link_issue(client, issue_id, urls)
+        except Exception as error:
+            linked, skipped, failed = [], [], [(url, _reason(error)) for url in urls]
+        with lock:
+            summary['linked'] += len(linked)
+            summary['skipped'] += len(skipped)
+            summary['failures'].extend((issue_id, url, error) for url, error in failed)
+            done[0] += 1
+            if done[0] % every == 0 or done[0] == len(links):
+                log.info('   Linked %i/%i issue(s), %i failure(s)', done[0],
+                         len(links), len(summary['failures']))
+
+    if jobs > 1:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            list(executor.map(run, links.items()))
+    else:
+        for item in links.items():
+            run(item)
+
+    metrics.increment('links_added', summary['linked'])
+    metrics.increment('links_skipped', summary['skipped'])
+    metrics.increment('links_failed', len(summary['failures']))
+    log.info('   Added %i link(s) to %i issue(s), %i already existed, %i failed',
+             summary['linked'], summary['issues'], summary['skipped'],
+             len(summary['failures']))
+    for issue_id, url, error in summary['failures']:
+        log.error('     %s %s: %s', issue_id, url, error)
+    return summary
@@ -1,61 +1,207 @@
 """
 This script is used to send emails
 """
+import gzip
+import io
+import logging
 import smtplib
+from email.charset import Charset, QP
+from email.mime.application import MIMEApplication
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.image import MIMEImage
 from os.path import dirname, join
 import os
+import threading
+
+import jibe.metrics as metrics
 
 
 """
 A mailer component used to send emails
 Modified from the Serapis Project
+
+One SMTP connection is kept open for the whole run, call close() when done
 """
 
-DEFAULT_FROM = os.environ['DEFAULT_FROM']
-DEFAULT_SERVER = os.environ['DEFAULT_SERVER']
+log = logging.getLogger(__name__)
+
+
+# Images that can be referenced by the report (as cid:<name>)
+IMAGE_SPECS = [
+    ('../images/blocker.png', 'blocker_priority_image'),
+    ('../images/critical.png', 'critical_priority_image'),
+    ('../images/major.png', 'major_priority_image'),
+    ('../images/minor.png', 'minor_priority_image'),
+    ('../images/trivial.png', 'trivial_priority_image')
+]
+
+# Quoted-printable keeps mostly ASCII markup close to its size, where
+# base64 (the default for utf-8) adds a third
+CHARSET = Charset('utf-8')
+CHARSET.body_encoding = QP
+
+# Open SMTP connection, see get_connection
+_connection = None
+# Encoded image parts, see get_image_parts
+_image_parts = None
+# Serializes the use of the connection between threads
+_lock = threading.RLock()
+
+
+def get_settings():
+    """ Reads the mail settings from the environment. They are only needed
+    (and checked) when mail is sent, so the mailer can always be imported
+    :return dict: from, server, starttls, username and password
+    """
+    missing = [name for name in ('DEFAULT_FROM', 'DEFAULT_SERVER')
+               if not os.environ.get(name)]
+    if missing:
+        raise EnvironmentError('Set %s to send emails' % ' and '.join(missing))
+    return {
+        'from': os.environ['DEFAULT_FROM'],
+        'server': os.environ['DEFAULT_SERVER'],
+        # Optional STARTTLS and SMTP authentication
+        'starttls': os.environ.get('DEFAULT_STARTTLS', '').lower() in ('1', 'true', 'yes'),
+        'username': os.environ.get('DEFAULT_USERNAME'),
+        'password': os.environ.get('DEFAULT_PASSWORD'),
+    }
+
+
+def connect():
+    """ Opens a new SMTP connection, with STARTTLS and login if configured
+    :return smtplib.SMTP: SMTP connection
+    """
+    settings = get_settings()
+    server = smtplib.SMTP(settings['server'])
+    if settings['starttls']:
+        server.starttls()
+    if settings['username']:
+        server.login(settings['username'], settings['password'])
+    return server
+
+
+def get_connection():
+    """ Returns the open SMTP connection, connecting if needed
+    :return smtplib.SMTP: SMTP connection
+    """
+    global _connection
+    if _connection is None:
+        _connection = connect()
+    return _connection
 
 
-def __init__(self):
-    """Returns mailer object
+def close():
+    """ Closes the SMTP connection if one is open
     """
-    self._cfg = {}
-    self._cfg.setdefault("server", self.DEFAULT_SERVER)
-    self._cfg.setdefault("from", self.DEFAULT_FROM)
+    global _connection
+    with _lock:
+        if _connection is None:
+            return
+        try:
+            _connection.quit()
+        except smtplib.SMTPException:
+            pass
+        _connection = None
 
 
-def send(self, recipients, subject, text):
+def get_image_parts():
+    """ Reads and encodes the priority images once per process
+    :return list: (name, MIMEImage) tuples
+    """
+    global _image_parts
+    if _image_parts is None:
+        image_parts = []
+        for path, name in IMAGE_SPECS:
+            with open(join(dirname(__file__), path), 'rb') as fp:
+                image = MIMEImage(fp.read(), _subtype='png')
+            image.add_header('Content-ID', '<%s>' % name)
+            image_parts.append((name, image))
+        _image_parts = image_parts
+    return _image_parts
+
+
+def gzip_report(text):
+    """ Gzips a report, the same report always gives the same bytes
+    :param string text: report
+    :return bytes: gzipped report
+    """
+    # GzipFile because gzip.compress() only takes mtime from Python 3.8
+    buf = io.BytesIO()
+    with gzip.GzipFile(fileobj=buf, mode='wb', mtime=0) as fp:
+        fp.write(text.encode('utf-8'))
+    return buf.getvalue()
+
+
+def send_file(recipients, subject, path, **kwargs):
+    """ Sends a report rendered to a file, it is only read to be sent
+    :param list recipients : recipients of email
+    :param string subject : subject of the email
+    :param string path: HTML file of the report
+    :return int: size of the message in bytes
+    """
+    with io.open(path, encoding='utf-8') as fp:
+        text = fp.read()
+    return send(recipients, subject, text, **kwargs)
+
+
+def send(recipients, subject, text, plain=None, attachment=None):
     """ Sends email to recipients
     :param list recipients : recipients of email
     :param string subject : subject of the email
-    :param: bool attachments : bool to attach images
     :pram string text: text of the email
+    :param string plain: optional plain text alternative of the email
+    :param string attachment: optional file name, text is also attached
+                              gzipped under that name
+    :return int: size of the message in bytes
     """
-    sender = self._cfg["from"]
-    msg = MIMEMultipart('related')
+    global _connection
+    sender = get_settings()['from']
+    msg = html = MIMEMultipart('related')
+    part = MIMEText(text, 'html', CHARSET)
+    html.attach(part)
+
+    # Attach the images referenced by the report
+    for name, image in get_image_parts():
+        if 'cid:' + name in text:
+            html.attach(image)
+
+    if plain or attachment:
+        # mixed(alternative(plain, related(html, images)), attachment)
+        msg = MIMEMultipart('mixed')
+        body = MIMEMultipart('alternative')
+        if plain:
+            body.attach(MIMEText(plain, 'plain', CHARSET))
+        body.attach(html)
+        msg.attach(body)
+        if attachment:
+            report = MIMEApplication(gzip_report(text), 'gzip')
+            report.add_header('Content-Disposition', 'attachment', filename=attachment)
+            msg.attach(report)
     msg["Subject"] = subject
     msg["From"] = sender
     msg["To"] = ", ".join(recipients)
-    server = smtplib.SMTP(self._cfg["server"])
-    part = MIMEText(text, 'html', 'utf-8')
-    msg.attach(part)
-
-    # Attach images to the email
-    image_specs = [
-        ('../images/blocker.png', '<blocker_priority_image>'),
-        ('../images/critical.png', '<critical_priority_image>'),
-        ('../images/major.png', '<major_priority_image>'),
-        ('../images/minor.png', '<minor_priority_image>'),
-        ('../images/trivial.png', '<trivial_priority_image>')
-    ]
-
-    for spec in image_specs:
-        with open(join(dirname(__file__), spec[0]),
-                  'rb') as fp:
-            image = MIMEImage(fp.read(), _subtype='png')
-            image.add_header('Content-ID', spec[1])
-            msg.attach(image)
-
-    server.sendmail(sender, recipients, msg.as_string())
+
+    message = msg.as_string()
+    size = len(message.encode('utf-8'))
+    with _lock:
+        try:
+            with metrics.request('smtp'):
+                get_connection().sendmail(sender, recipients, message)
+            return size
+        except smtplib.SMTPServerDisconnected:
+            pass
+        except smtplib.SMTPException:
+            # The server refused the message, reconnecting won't help
+            raise
+        except (IOError, OSError):
+            # Socket level error
+            pass
+        # The connection went away (i.e. timed out between groups),
+        # reconnect and try once more
+        log.warning('   Lost connection to %s, reconnecting' % get_settings()['server'])
+        metrics.retry('smtp')
+        _connection = None
+        with metrics.request('smtp'):
+            get_connection().sendmail(sender, recipients, message)
+        return size
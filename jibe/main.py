@@ -3,21 +3,63 @@ import logging
 from datetime import datetime
 import argparse
 import sys
-
-# 3rd Party Modules
-import jinja2
-import requests
-import jira.client
+import os
+import io
+import re
+import time
+try:
+    from importlib import reload  # py3
+except ImportError:
+    pass  # py2 builtin
+try:
+    from html import escape as html_escape  # py3
+except ImportError:
+    from cgi import escape as html_escape  # py2
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import partial
 
 # Local Modules
 import config
-import jibe.upstream as u
-import jibe.downstream as d
-import jibe.mailer as m
+import jibe.metrics as metrics
+import jibe.profiling as profiling
+from jibe.lazy import LazyModule
 
 # Global Variables
+# Heavy modules are only imported on first use (see jibe.lazy), so
+# `jibe --help` doesn't pay for jira, PyGithub, requests or jinja2
+futures = LazyModule('concurrent.futures')
+jinja2 = LazyModule('jinja2')
+requests = LazyModule('requests')
+jira = LazyModule('jira', 'jira.client')
+u = LazyModule('jibe.upstream')
+d = LazyModule('jibe.downstream')
+m = LazyModule('jibe.mailer')
+spool = LazyModule('jibe.spool')
+cassette = LazyModule('jibe.cassette')
+linking = LazyModule('jibe.linking')
+snapshot = LazyModule('jibe.snapshot')
+daemon = LazyModule('jibe.daemon')
+webhooks = LazyModule('jibe.webhooks')
+similarity = LazyModule('jibe.similarity')
+sharding = LazyModule('jibe.sharding')
+checkpoint = LazyModule('jibe.checkpoint')
+intermediary = LazyModule('jibe.intermediary')
+sampling = LazyModule('jibe.sampling')
+throttle = LazyModule('jibe.throttle')
 log = logging.getLogger(__name__)
 remote_link_title = "Upstream issue"
+TEMPLATE_FILE = "html_template.jinja"
+# Same report with shared CSS classes, see --compact
+COMPACT_TEMPLATE_FILE = "compact_template.jinja"
+# Whitespace the compact report doesn't need, see minify: it is dropped
+# next to block level tags and collapsed to one space anywhere else (h2
+# is not one, the reports show it inline)
+_SPACE = re.compile(r'\s+')
+_BLOCK_TAG = re.compile(r'</?(?:html|head|body|style|table|tr|td|th|div|ul|li|hr|br|h1|p)\b[^<>]*>',
+                        re.IGNORECASE)
+# Process wide JINJA environment, see get_template_env
+_template_env = None
 
 
 def load_config():
@@ -95,7 +137,191 @@ def load_sync2jira_config():
     return new_config
 
 
-def create_html(out_of_sync_issues, missing_issues, joke):
+def reload_config(arguments, old_config=None):
+    """
+    Re-imports the config files, for 'jibe serve' to pick up changes
+    without restarting
+    Args:
+        arguments (Namespace): Parsed Arguments
+        old_config (dict): Config dict in use so far
+    Returns:
+        config (dict): The new config dict, with compiled check plans
+    """
+    if arguments.sync2jira:
+        import sync2jira_config
+        import config_sync2jira
+        reload(sync2jira_config)
+        reload(config_sync2jira)
+        new_config = load_sync2jira_config()
+    else:
+        reload(config)
+        new_config = load_config()
+    d.compile_check_plans(new_config)
+
+    # Clients of JIRA instances whose settings changed must be rebuilt,
+    # everything else stays warm
+    if old_config and old_config['jibe'].get('jira') != new_config['jibe'].get('jira'):
+        d.reset_jira_clients()
+    return new_config
+
+
+def config_files(arguments):
+    """
+    Files the config is loaded from
+    Args:
+        arguments (Namespace): Parsed Arguments
+    Returns:
+        paths ([str]): Config files
+    """
+    if arguments.sync2jira:
+        import sync2jira_config
+        import config_sync2jira
+        modules = [sync2jira_config, config_sync2jira]
+    else:
+        modules = [config]
+    return [os.path.splitext(module.__file__)[0] + '.py' for module in modules]
+
+
+def serve(config, arguments):
+    """
+    Runs 'jibe serve': a long lived process that keeps the clients, HTTP
+    sessions and compiled template warm, runs every group every
+    --interval seconds and serves the latest reports over HTTP. Reports
+    are mailed through the spool (--spool-dir, by default in
+    --snapshot-dir), so a restart never mails a report of the day again
+    Args:
+        config (dict): Config dict
+        arguments (Namespace): Parsed Arguments
+    Returns:
+        Nothing
+    """
+    arguments.spool_dir = arguments.spool_dir or os.path.join(arguments.snapshot_dir, 'spool')
+    arguments.keep_reports = True
+    sender = spool.DeliveryWorker(arguments.spool_dir)
+    for key in spool.pending_reports(arguments.spool_dir):
+        # Left over by the last process
+        sender.put(key)
+
+    store = on_event = None
+    if config['jibe'].get('webhooks'):
+        # Reports are made from state kept current by webhooks
+        store = webhooks.IssueStore()
+        webhooks.load_snapshots(store, arguments.snapshot_dir, config)
+        on_event = partial(webhooks.apply_event, store)
+
+    def refresh(group, config, send):
+        if store is None:
+            html = run_group(group, config, arguments, sender, send)
+        else:
+            html = store_group(group, config, arguments, store, send, sender)
+        if html is None and arguments.report_dir:
+            # Served from memory
+            with io.open(report_path(arguments, group), encoding='utf-8') as fp:
+                html = fp.read()
+        return html
+
+    worker = daemon.ReportDaemon(
+        config, refresh,
+        reload_config=lambda: reload_config(arguments, worker.config),
+        config_paths=config_files(arguments), interval=arguments.interval,
+        on_event=on_event)
+    server = daemon.make_server(worker, arguments.host, arguments.port)
+    sender.start()
+    worker.start()
+    log.info('   Serving reports on http://%s:%i/' % server.server_address[:2])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        # Wait for the queued reports to be delivered
+        sender.close(timeout=spool.DRAIN_TIMEOUT)
+        m.close()
+
+
+def get_template_env():
+    """
+    Returns the JINJA environment, creating it on first use. Compiled
+    templates are kept in memory for the rest of the process and in an
+    on-disk bytecode cache so cold starts skip compilation.
+    The templates pass every string of the trackers and the config
+    through |e, which is escape
+    Args:
+    Returns:
+        templateEnv (jinja2.Environment): JINJA environment
+    """
+    global _template_env
+    if _template_env is None:
+        templateLoader = jinja2.FileSystemLoader(searchpath="./jibe/")
+        _template_env = jinja2.Environment(
+            loader=templateLoader,
+            bytecode_cache=jinja2.FileSystemBytecodeCache(),
+            auto_reload=False)
+        _template_env.filters['e'] = escape
+    return _template_env
+
+
+def escape(value):
+    """
+    Escapes a value for HTML text and attributes. Used instead of
+    autoescape or the Markup objects of jinja2's escape, which made
+    rendering large reports twice as slow
+    Args:
+        value (object): Value to print
+    Returns:
+        escaped (str): Escaped text
+    """
+    return html_escape(u'%s' % value, True)
+
+
+def minify(chunks):
+    """
+    Collapses the whitespace of rendered HTML as it streams: runs of
+    whitespace next to block level tags (where browsers ignore them) are
+    dropped, the others become one space so inline text keeps its gaps
+    Args:
+        chunks (iterable): Rendered HTML chunks
+    Returns:
+        chunks (generator): Minified chunks
+    """
+    pending = last = ''
+    for chunk in chunks:
+        text = pending + chunk
+        # Hold back what depends on the next chunk: trailing whitespace
+        # and a tag that isn't finished yet (with the whitespace before it)
+        end = text.rfind('<')
+        if end == -1 or text.find('>', end) != -1:
+            end = len(text)
+        end = len(text[:end].rstrip())
+        pending = text[end:]
+        if not end:
+            continue
+        body = _collapse(last + text[:end], len(last))
+        # The last tag sent tells if leading whitespace is next to a block
+        output = last + body
+        last = output[output.rfind('<'):] if output.endswith('>') else output[-1]
+        yield body
+
+
+def _collapse(text, start):
+    """ Minifies the whitespace of text[start:], text[:start] was sent already """
+    parts = []
+    position = start
+    for match in _SPACE.finditer(text, start):
+        parts.append(text[position:match.start()])
+        tag = text.rfind('<', 0, match.start())
+        block = match.start() == 0 or _BLOCK_TAG.match(text, match.end()) or \
+            (tag != -1 and _BLOCK_TAG.fullmatch(text, tag, match.start()))
+        parts.append('' if block else ' ')
+        position = match.end()
+    parts.append(text[position:])
+    return ''.join(parts)
+
+
+def create_html(out_of_sync_issues, missing_issues, joke, output=None,
+                unchecked_issues=(), estimates=None, left_out=None,
+                compact=False):
     """
     Generates HTML from out-of-sync data
     Args:
@@ -109,13 +335,23 @@ def create_html(out_of_sync_issues, missing_issues, joke):
                                                     matching downstream
                                                     issue
         joke (str): Optional joke string
+        output (file): Optional file object, if given the HTML is
+                       streamed into it chunk by chunk
+        unchecked_issues ([jibe.intermediary.Issue]): Issues that were
+                                                      not compared
+                                                      before --deadline
+        estimates (dict): Rates estimated from a --sample (see
+                          jibe.sampling.estimate)
+        left_out (dict): Counts of the issues left out by --top (see
+                         jibe.downstream.TopIssues)
+        compact (bool): Render the compact, minified report (--compact)
     Returns:
         outputText (str): Generated HTML text
+        *Or*
+        size (int): Number of characters written to output
     """
-    templateLoader = jinja2.FileSystemLoader(searchpath="./jibe/")
-    templateEnv = jinja2.Environment(loader=templateLoader)
-    TEMPLATE_FILE = "html_template.jinja"
-    template = templateEnv.get_template(TEMPLATE_FILE)
+    template = get_template_env().get_template(
+        COMPACT_TEMPLATE_FILE if compact else TEMPLATE_FILE)
 
     if joke:
         templatevars = {"now": datetime.now().strftime('%Y-%m-%d'),
@@ -126,7 +362,75 @@ def create_html(out_of_sync_issues, missing_issues, joke):
         templatevars = {"now": datetime.now().strftime('%Y-%m-%d'),
                         "out_of_sync_issues": out_of_sync_issues,
                         "missing_issues": missing_issues}
-    return template.render(templatevars)
+    if unchecked_issues:
+        templatevars["unchecked_issues"] = unchecked_issues
+    if estimates:
+        templatevars["estimates"] = estimates
+    if left_out and left_out['issues']:
+        templatevars["left_out"] = left_out
+    if output is None:
+        if compact:
+            return u''.join(minify(template.generate(templatevars)))
+        return template.render(templatevars)
+
+    # Stream the report so it is never held in memory as a whole
+    chunks = template.generate(templatevars)
+    if compact:
+        chunks = minify(chunks)
+    size = 0
+    for chunk in chunks:
+        output.write(chunk)
+        size += len(chunk)
+    return size
+
+
+def create_text(group, out_of_sync_issues, missing_issues,
+                unchecked_issues=(), estimates=None, left_out=None):
+    """
+    Generates the short plain text summary sent along the compact report
+    Args:
+        group (str): Group in config file
+        out_of_sync_issues ([jibe.intermediary.Issue]): Listed issues
+                                                        with a JIRA issue
+        missing_issues ([jibe.intermediary.Issue]): Missing issues
+        unchecked_issues ([jibe.intermediary.Issue]): Issues that were
+                                                      not compared
+        estimates (dict): Rates estimated from a --sample
+        left_out (dict): Counts of the issues left out by --top
+    Returns:
+        text (str): Summary
+    """
+    failed = OrderedDict()
+    out_of_sync = 0
+    for issue in out_of_sync_issues:
+        names = issue.failed_checks()
+        if names:
+            out_of_sync += 1
+        for name in names:
+            failed[name] = failed.get(name, 0) + 1
+    if left_out:
+        out_of_sync += left_out['issues'] - left_out['in_sync']
+        for name, count in left_out['checks'].items():
+            failed[name] = failed.get(name, 0) + count
+
+    lines = ['Jibe report for %s (%s)' % (group, datetime.now().strftime('%Y-%m-%d')), '']
+    lines.append('%i issue(s) out of sync' % out_of_sync)
+    for name, count in failed.items():
+        lines.append('  %s: %i' % (name, count))
+    lines.append('%i issue(s) without JIRA issue' % len(missing_issues))
+    if unchecked_issues:
+        lines.append('%i issue(s) not checked before the deadline' % len(unchecked_issues))
+    if estimates:
+        lines.append('')
+        lines.append('Estimated from a sample of %i of %i issues:' % (
+            estimates['sampled'], estimates['population']))
+        for row in estimates['rows']:
+            if row['rate'] is not None:
+                lines.append('  %s: %.1f%% (%.1f%% - %.1f%%)' % (
+                    row['name'], row['rate'] * 100, row['low'] * 100, row['high'] * 100))
+    lines.append('')
+    lines.append('The full report is attached as %s.html.gz' % group)
+    return u'\n'.join(lines) + u'\n'
 
 
 def format_check(out_of_sync_issues):
@@ -139,25 +443,8 @@ def format_check(out_of_sync_issues):
         Nothing
     """
     for issue in out_of_sync_issues:
-        # Get check array from config file
-        old_check = issue.downstream['check']
-        new_check = []
-        for check in old_check:
-            try:
-                if 'transition' in check.keys():
-                    new_check.append('transition')
-            except AttributeError:
-                if 'comments' in check:
-                    new_check.append('comments')
-                elif 'tags' in check:
-                    new_check.append('tags')
-                elif 'fixVersion' in check:
-                    new_check.append('fixVersion')
-                elif 'assignee' in check:
-                    new_check.append('assignee')
-                elif 'title' in check:
-                    new_check.append('title')
-        issue.check = new_check
+        # The display names are precomputed in the project's check plan
+        issue.check = d.get_check_plan(issue.downstream).names
 
 
 def attach_link_helper(client, downstream, remote_link):
@@ -176,7 +463,7 @@ def attach_link_helper(client, downstream, remote_link):
     """
     log.info("   Attaching tracking link %r to %r",
              remote_link, downstream.key)
-    modified_desc = downstream.fields.description + " "
+    modified_desc = (downstream.fields.description or '') + " "
 
     # This is crazy.  Querying for application links requires admin perms which
     # we don't have, so duckpunch the client to think it has already made the
@@ -184,13 +471,15 @@ def attach_link_helper(client, downstream, remote_link):
     client._applicationlinks = []  # pylint: disable=protected-access
 
     # Add the link.
-    client.add_remote_link(downstream.id, remote_link)
+    with metrics.request('jira.remote_link'):
+        client.add_remote_link(downstream.id, remote_link)
 
     # Finally, after we've added the link we have to edit the issue so that it
     # gets re-indexed, otherwise our searches won't work. Also, Handle some
     # weird API changes here...
     log.debug("    Modifying desc of %r to trigger re-index.", downstream.key)
-    downstream.update({'description': modified_desc})
+    with metrics.request('jira.update'):
+        downstream.update({'description': modified_desc})
 
     return downstream
 
@@ -210,7 +499,8 @@ def attach_link(issue_id, url, config):
     client = jira.client.JIRA(**config['jibe']['jira'][default_instance])
 
     # Get downstream issue
-    downstream = client.issue(issue_id)
+    with metrics.request('jira.issue'):
+        downstream = client.issue(issue_id)
 
     # Attach link
     remote_link = dict(url=url, title=remote_link_title)
@@ -234,6 +524,495 @@ def get_dad_joke():
     return res.json()['joke']
 
 
+def group_joke(group, config):
+    """
+    The joke of a group's report
+    Args:
+        group (str): Group in config file
+        config (dict): Config dict
+    Returns:
+        joke (str): Dad joke, empty if the group doesn't want one
+    """
+    if config['jibe']['send-to'][group].get('fun', {}):
+        return get_dad_joke()
+    return ''
+
+
+@contextmanager
+def phase(name, group):
+    """
+    Times one phase of a group, and profiles it if requested
+    """
+    with metrics.timer(name, group), profiling.phase(name):
+        yield
+
+
+def report_path(arguments, group):
+    """
+    Args:
+        arguments (Namespace): Parsed Arguments
+        group (str): Group in config file
+    Returns:
+        path (str): File of the report of the group in --report-dir
+    """
+    return os.path.join(arguments.report_dir, group + '.html')
+
+
+def render_report(group, out_of_sync_issues, missing_issues, joke,
+                  email_to, subject, arguments, worker=None,
+                  unchecked_issues=(), estimates=None, left_out=None,
+                  mail=None):
+    """
+    Renders the report of a group into the spool, the report directory
+    or memory
+    Args:
+        group (str): Group in config file
+        out_of_sync_issues ([jibe.intermediary.Issue]): Out of sync issues
+        missing_issues ([jibe.intermediary.Issue]): Missing issues
+        joke (str): Optional joke string
+        email_to ([str]): Recipients of the report
+        subject (str): Subject of the email
+        arguments (Namespace): Parsed Arguments
+        worker (jibe.spool.DeliveryWorker): Delivery worker if spooling
+        unchecked_issues ([jibe.intermediary.Issue]): Issues that were
+                                                      not compared
+        estimates (dict): Rates estimated from a --sample
+        left_out (dict): Counts of the issues left out by --top
+        mail (dict): Extra jibe.mailer.send arguments, kept with the
+                     spooled report
+    Returns:
+        html (str): Generated HTML text, None if it was written to the
+                    report directory or spooled (unless 'jibe serve'
+                    keeps it)
+        key (str): Idempotency key if it was spooled
+        size (int): Size of the report, None if it was spooled before
+    """
+    render = partial(create_html, out_of_sync_issues, missing_issues, joke,
+                     unchecked_issues=unchecked_issues, estimates=estimates,
+                     left_out=left_out, compact=arguments.compact)
+    if worker and email_to:
+        html = None
+        if getattr(arguments, 'keep_reports', False):
+            # 'jibe serve' keeps the latest report of every group in memory
+            html = render()
+            key, size = spool.spool_report(
+                arguments.spool_dir, email_to, subject, lambda output: output.write(html),
+                group=group, mail=mail, rerun=arguments.rerun)
+        else:
+            key, size = spool.spool_report(
+                arguments.spool_dir, email_to, subject,
+                lambda output: render(output=output),
+                group=group, mail=mail, rerun=arguments.rerun)
+        return html, key, size
+    if arguments.report_dir:
+        # Only read back if it is mailed, see report_group
+        with io.open(report_path(arguments, group), 'w', encoding='utf-8') as output:
+            size = render(output=output)
+        return None, None, size
+    html = render()
+    return html, None, len(html)
+
+
+def fetch_records(group, config, repos=None):
+    """
+    Fetches the upstream issues of a group and their JIRA issues repo by
+    repo, checkpointing each repo once its issues and once their JIRA
+    issues are fetched (see jibe.checkpoint). A resumed run only fetches
+    what is missing
+    Args:
+        group (str): Group in config file
+        config (dict): Config dict
+        repos (set): Only fetch these (source, repo) tuples
+    Returns:
+        records ([dict]): Snapshot records (see jibe.snapshot), in the
+                          order of the repos in the config
+    """
+    records = []
+    for source, repo in sharding.units(config, group):
+        if repos is not None and (source, repo) not in repos:
+            continue
+        done = checkpoint.load(group, source, repo, 'downstream')
+        if done is None:
+            fetched = checkpoint.load(group, source, repo, 'upstream')
+            if fetched is None:
+                with phase('upstream', group):
+                    issues = u.get_upstream_issues(config, group, {(source, repo)})
+                checkpoint.save(group, source, repo, 'upstream',
+                                [snapshot.issue_record(issue, None) for issue in issues])
+            else:
+                issues = [intermediary.Issue(config=config, group=group, **record['issue'])
+                          for record in fetched]
+            with phase('downstream', group):
+                done = [snapshot.issue_record(issue, downstream) for issue, downstream
+                        in snapshot.fetch_downstream(issues, config)]
+            checkpoint.save(group, source, repo, 'downstream', done)
+        else:
+            log.info('   Resuming with the %i issue(s) of %s', len(done), repo)
+        records.extend(done)
+    return records
+
+
+def run_group(group, config, arguments, worker=None, send=True):
+    """
+    Runs the whole pipeline (fetch, compare, render, mail) for one group
+    Args:
+        group (str): Group in config file
+        config (dict): Config dict
+        arguments (Namespace): Parsed Arguments
+        worker (jibe.spool.DeliveryWorker): Delivery worker if spooling
+        send (bool): Mail the report, False to only render it
+    Returns:
+        html (str): Generated HTML text, None if it was spooled
+    """
+    unchecked_issues = ()
+    population = None
+    if checkpoint.enabled():
+        # Fetch repo by repo so an interrupted run can be resumed
+        records = fetch_records(group, config)
+        with phase('downstream', group):
+            out_of_sync_issues, missing_issues = \
+                snapshot.check_snapshot(records, config, group, arguments.top)
+    else:
+        # Get all upstream issues
+        with phase('upstream', group):
+            issues = u.get_upstream_issues(config, group)
+
+        if arguments.sample:
+            # Only a random sample of every repo is compared with JIRA,
+            # the report estimates the rates of all issues from it
+            issues, population = sampling.stratify(issues, arguments.sample)
+            log.info('   Comparing a sample of %i of %i issues', len(issues),
+                     sum(population.values()))
+
+        if arguments.deadline:
+            # Compare the most important issues first and stop at the
+            # deadline, the JIRA priorities seen are kept for the next run
+            path = snapshot.priorities_path(arguments.snapshot_dir, group)
+            priorities = snapshot.read_priorities(path)
+            with phase('downstream', group):
+                out_of_sync_issues, missing_issues, unchecked_issues = \
+                    d.sync_until(issues, config, arguments.deadline_at, priorities,
+                                 arguments.top)
+            snapshot.write_priorities(path, priorities)
+        else:
+            # Compare them with downstream issues
+            with phase('downstream', group):
+                out_of_sync_issues, missing_issues = \
+                    d.sync_with_downstream(issues, config, arguments.top)
+
+    # Issues cut by the deadline simply count as not sampled
+    estimates = None
+    if population is not None:
+        estimates = sampling.estimate(population, out_of_sync_issues, missing_issues)
+
+    return report_group(group, config, arguments, out_of_sync_issues,
+                        missing_issues, group_joke(group, config), worker, send,
+                        unchecked_issues=unchecked_issues, estimates=estimates)
+
+
+def fetch_group(group, config, arguments, worker=None):
+    """
+    Fetches the upstream and downstream data of one group into its
+    snapshot (see jibe.snapshot), for 'jibe report' to use later. With
+    --shard only the repos of the shard are fetched, into a partial
+    snapshot for 'jibe merge'
+    Args:
+        group (str): Group in config file
+        config (dict): Config dict
+        arguments (Namespace): Parsed Arguments
+        worker: Unused
+    Returns:
+        Nothing
+    """
+    repos = None
+    fun = config['jibe']['send-to'][group].get('fun', {})
+    path = snapshot.snapshot_path(arguments.snapshot_dir, group)
+    if arguments.shard:
+        index, count = arguments.shard
+        repos = sharding.shard_repos(config, group, index, count)
+        # The shard of the group writes a partial snapshot even without
+        # repos, it carries the joke
+        owner = sharding.shard_of(count, group) == index
+        if not repos and not owner:
+            log.info('   No repos of %s in shard %i/%i', group, index, count)
+            return
+        fun = fun and owner
+        path = sharding.shard_path(arguments.snapshot_dir, group, index, count)
+
+    records = None
+    if checkpoint.enabled():
+        # Fetch repo by repo so an interrupted fetch can be resumed
+        records = fetch_records(group, config, repos)
+    else:
+        # Get all upstream issues
+        with phase('upstream', group):
+            issues = u.get_upstream_issues(config, group, repos)
+
+    # Do we want jokes?
+    if fun:
+        joke = get_dad_joke()
+    else:
+        joke = ''
+
+    if records is not None:
+        count = snapshot.write_records(path, group, records, joke)
+    else:
+        # Look up their downstream issues and write everything out
+        with phase('downstream', group):
+            count = snapshot.write_snapshot(
+                path, group, snapshot.fetch_downstream(issues, config), joke)
+    log.info('   Wrote snapshot of %i issue(s) for %s to %s', count, group, path)
+
+
+def merge_group(group, config, arguments, worker=None):
+    """
+    Combines the partial snapshots 'jibe fetch --shard' wrote for one
+    group into its snapshot, then checks, renders and mails its report
+    Args:
+        group (str): Group in config file
+        config (dict): Config dict
+        arguments (Namespace): Parsed Arguments
+        worker (jibe.spool.DeliveryWorker): Delivery worker if spooling
+    Returns:
+        html (str): Generated HTML text, None if it was spooled
+    """
+    with phase('merge', group):
+        count = sharding.merge(arguments.snapshot_dir, group, config)
+    log.info('   Merged %i issue(s) of %s', count, group)
+    return report_snapshot_group(group, config, arguments, worker)
+
+
+def report_snapshot_group(group, config, arguments, worker=None, send=True):
+    """
+    Checks, renders and mails the report of one group from its snapshot,
+    without touching the upstream or JIRA APIs
+    Args:
+        group (str): Group in config file
+        config (dict): Config dict
+        arguments (Namespace): Parsed Arguments
+        worker (jibe.spool.DeliveryWorker): Delivery worker if spooling
+        send (bool): Mail the report, False to only render it
+    Returns:
+        html (str): Generated HTML text, None if it was spooled
+    """
+    path = snapshot.snapshot_path(arguments.snapshot_dir, group)
+    header, records = snapshot.read_snapshot(path)
+    log.info('   Reporting %s from snapshot taken %s', group,
+             datetime.fromtimestamp(header['created']).strftime('%Y-%m-%d %H:%M'))
+    with phase('downstream', group):
+        out_of_sync_issues, missing_issues = \
+            snapshot.check_snapshot(records, config, group, arguments.top)
+
+    return report_group(group, config, arguments, out_of_sync_issues,
+                        missing_issues, header['joke'], worker, send)
+
+
+def store_group(group, config, arguments, store, send=True, worker=None):
+    """
+    Checks, renders and mails the report of one group from the state
+    kept by 'jibe serve'. The group is only fetched in full if its state
+    is missing or older than --resync-interval, webhooks keep it current
+    in between
+    Args:
+        group (str): Group in config file
+        config (dict): Config dict
+        arguments (Namespace): Parsed Arguments
+        store (jibe.webhooks.IssueStore): Cached state
+        send (bool): Mail the report, False to only render it
+        worker (jibe.spool.DeliveryWorker): Delivery worker if spooling
+    Returns:
+        html (str): Generated HTML text
+    """
+    if not store.fresh(group, arguments.resync_interval):
+        with phase('upstream', group):
+            issues = u.get_upstream_issues(config, group)
+        with phase('downstream', group):
+            store.load(group, snapshot.fetch_downstream(issues, config),
+                       group_joke(group, config))
+
+    with phase('downstream', group):
+        out_of_sync_issues, missing_issues = \
+            snapshot.check_snapshot(store.records(group), config, group, arguments.top)
+    # Keep the state across restarts
+    store.save(snapshot.snapshot_path(arguments.snapshot_dir, group), group)
+
+    return report_group(group, config, arguments, out_of_sync_issues,
+                        missing_issues, store.joke(group), worker, send)
+
+
+def report_group(group, config, arguments, out_of_sync_issues,
+                 missing_issues, joke, worker=None, send=True,
+                 unchecked_issues=(), estimates=None):
+    """
+    Renders and mails the report of one group
+    Args:
+        group (str): Group in config file
+        config (dict): Config dict
+        arguments (Namespace): Parsed Arguments
+        out_of_sync_issues ([jibe.intermediary.Issue]): Checked issues
+        missing_issues ([jibe.intermediary.Issue]): Issues without
+                                                    downstream issue
+        joke (str): Optional joke string
+        worker (jibe.spool.DeliveryWorker): Delivery worker if spooling
+        send (bool): Mail the report, False to only render it
+        unchecked_issues ([jibe.intermediary.Issue]): Issues that were
+                                                      not compared
+                                                      before --deadline
+        estimates (dict): Rates estimated from a --sample (see
+                          jibe.sampling.estimate)
+    Returns:
+        html (str): Generated HTML text, None if it was spooled
+    """
+    # --top only kept the worst checked issues, the others were counted
+    left_out = None
+    if isinstance(out_of_sync_issues, d.TopIssues):
+        left_out = out_of_sync_issues.left_out
+        out_of_sync_issues = out_of_sync_issues.issues()
+
+    # Return differences to the user
+    # First format the check array for each issue
+    with phase('format_check', group):
+        format_check(out_of_sync_issues)
+
+    # Propose JIRA issues for the missing ones, leaving out the JIRA
+    # issues that are already matched
+    if arguments.suggest_matches and missing_issues:
+        with phase('suggest', group):
+            matched = set(issue.downstream_id for issue in out_of_sync_issues)
+            similarity.suggest(missing_issues, config, exclude=matched)
+        if arguments.suggestions_dir:
+            path = os.path.join(arguments.suggestions_dir, '%s-links.csv' % group)
+            count = similarity.write_suggestions(path, missing_issues, config)
+            log.info('   Wrote %i suggested link(s) for %s to %s', count, group, path)
+
+    # Remove in sync items if requested
+    if arguments.ignore_in_sync:
+        new_out_of_sync_issues = []
+        for issue in out_of_sync_issues:
+            if issue.total != issue.done:
+                new_out_of_sync_issues.append(issue)
+        out_of_sync_issues = new_out_of_sync_issues
+
+    # Then generate the HTML
+    email_to = config['jibe']['send-to'][group]['email-to'] if send else []
+    subject = 'Jibe Report for ' + group
+    if unchecked_issues:
+        subject += ' (partial)'
+    if estimates:
+        subject += ' (sampled)'
+    mail = {}
+    if arguments.compact:
+        # A summary for text only clients and the report as a file for
+        # clients that clip long messages
+        mail = {'plain': create_text(group, out_of_sync_issues, missing_issues,
+                                     unchecked_issues, estimates, left_out),
+                'attachment': group + '.html.gz'}
+    start = time.time()
+    with phase('render', group):
+        html, key, size = render_report(group, out_of_sync_issues,
+                                        missing_issues, joke, email_to,
+                                        subject, arguments, worker,
+                                        unchecked_issues, estimates, left_out,
+                                        mail)
+    if size is not None:
+        log.info('   Rendered report for %s in %.2fs (%i characters)',
+                 group, time.time() - start, size)
+
+    # Create mailer object and send email
+    if not send:
+        return html
+
+    if not email_to:
+        log.warning('   Email list is empty. No one was emailed.')
+        return html
+
+    if key:
+        # The worker sends it while we move on to the next group, and
+        # marks it as sent once it is delivered
+        checkpoint.spooled(group, key)
+        worker.put(key)
+        log.info('   Spooled report for %s' % group)
+        return html
+
+    with phase('send', group), checkpoint.sending(group):
+        if html is None:
+            sent = m.send_file(email_to, subject, report_path(arguments, group), **mail)
+        else:
+            sent = m.send(email_to, subject, html, **mail)
+    metrics.email(group, sent)
+    log.info('   Finished sending report for %s (%i bytes)' % (group, sent))
+    return html
+
+
+def parse_shard(text):
+    """
+    Parses a --shard value
+    Args:
+        text (str): I/N, the shard (1 to N) and the number of shards
+    Returns:
+        shard ((int, int)): Shard and number of shards
+    """
+    match = re.match(r'^(\d+)/(\d+)$', text.strip())
+    if not match or not 1 <= int(match.group(1)) <= int(match.group(2)):
+        raise argparse.ArgumentTypeError('expected I/N with 1 <= I <= N, got %r' % text)
+    return int(match.group(1)), int(match.group(2))
+
+
+def parse_duration(text):
+    """
+    Parses a --deadline value
+    Args:
+        text (str): Seconds, or a duration like 90s, 45m, 2h or 1h30m
+    Returns:
+        seconds (float): Duration in seconds
+    """
+    match = re.match(r'^(?:(\d+)h)?(?:(\d+)m)?(?:(\d+(?:\.\d+)?)s?)?$', text.strip())
+    if not text.strip() or not match:
+        raise argparse.ArgumentTypeError('expected a duration like 90s, 45m or 1h30m, got %r' % text)
+    hours, minutes, seconds = match.groups()
+    return int(hours or 0) * 3600 + int(minutes or 0) * 60 + float(seconds or 0)
+
+
+def parse_positive(text):
+    """
+    Parses a count that has to be at least 1 (i.e. --top)
+    Args:
+        text (str): Count
+    Returns:
+        count (int): Count
+    """
+    try:
+        count = int(text)
+    except ValueError:
+        count = 0
+    if count < 1:
+        raise argparse.ArgumentTypeError('expected a number of at least 1, got %r' % text)
+    return count
+
+
+def parse_sample(text):
+    """
+    Parses a --sample value
+    Args:
+        text (str): Number of issues, or a fraction of them (i.e. 0.1)
+    Returns:
+        size (int or float): Number of issues or fraction
+    """
+    try:
+        size = int(text)
+        valid = size >= 1
+    except ValueError:
+        try:
+            size = float(text)
+        except ValueError:
+            size = None
+        valid = size is not None and 0 < size < 1
+    if not valid:
+        raise argparse.ArgumentTypeError(
+            'expected a number of issues or a fraction between 0 and 1, got %r' % text)
+    return size
+
+
 def parse_args(args):
     """
     Function to parse arguments
@@ -246,14 +1025,120 @@ def parse_args(args):
     usage = "CLI for generating reports on upstream/downstream issues " \
             "that are out of sync"
     argparser = argparse.ArgumentParser(usage=usage)
+    argparser.add_argument('command', nargs='?', default='run',
+                           choices=['run', 'fetch', 'report', 'merge',
+                                    'deliver', 'serve'],
+                           help='run: generate and send reports (default), '
+                                'fetch: only write snapshots of the upstream '
+                                'and downstream data, '
+                                'report: generate and send reports from the '
+                                'snapshots, '
+                                'merge: combine the snapshots of fetch '
+                                '--shard and report from them, '
+                                'deliver: send the reports left in --spool-dir, '
+                                'serve: run the reports on a schedule and '
+                                'serve them over HTTP')
     argparser.add_argument('--sync2jira', default=False, action='store_true',
                            help='Parse sync2jira config file instead ')
     argparser.add_argument('--link-issue', nargs=2, type=str,
                            metavar=('FACTORY-XXX', 'some_url.com'),
                            help='Add remote link to downstream issue')
+    argparser.add_argument('--link-issues-from', type=str, metavar='FILE',
+                           help='Add the remote links listed in a CSV '
+                                '(issue,url[,jira_instance]) or JSONL file, '
+                                '--jobs issues at a time')
+    argparser.add_argument('--suggest-matches', default=False,
+                           action='store_true',
+                           help='Propose JIRA issues with similar summaries '
+                                'for the missing issues of projects with a '
+                                "'project' in the config")
+    argparser.add_argument('--suggestions-dir', type=str, metavar='DIR',
+                           help='Write the best proposed match of every '
+                                'missing issue to DIR/<group>-links.csv for '
+                                '--link-issues-from')
     argparser.add_argument('--ignore-in-sync', default=False,
                            action='store_true',
                            help='Omit issues that are in sync from report')
+    argparser.add_argument('--compact', default=False, action='store_true',
+                           help='Send compact reports (shared CSS, minified) '
+                                'with a plain text summary and the report '
+                                'attached gzipped')
+    argparser.add_argument('--report-dir', type=str, metavar='DIR',
+                           help='Stream each report to DIR/<group>.html '
+                                'before sending it')
+    argparser.add_argument('--jobs', type=int, default=1, metavar='N',
+                           help='Number of groups to process concurrently')
+    argparser.add_argument('--max-per-host', type=int, metavar='N',
+                           help='Most HTTP requests in flight at once per '
+                                'host (default: --jobs), fewer while the '
+                                'host is slow or rate limiting')
+    argparser.add_argument('--metrics-dir', type=str, metavar='DIR',
+                           help='Write run metrics as JSON and as a '
+                                'Prometheus textfile to DIR')
+    argparser.add_argument('--profile', default=False, action='store_true',
+                           help='Profile every phase with cProfile')
+    argparser.add_argument('--profile-memory', default=False,
+                           action='store_true',
+                           help='Trace the allocations of every phase')
+    argparser.add_argument('--profile-dir', type=str, default='jibe-profile',
+                           metavar='DIR',
+                           help='Where to write the profiles (default: '
+                                'jibe-profile)')
+    argparser.add_argument('--spool-dir', type=str, metavar='DIR',
+                           help='Write reports to the spool DIR and deliver '
+                                'them in the background')
+    argparser.add_argument('--rerun', default=False, action='store_true',
+                           help='Spool the reports again even if the report '
+                                'of the day was already spooled or sent')
+    argparser.add_argument('--snapshot-dir', type=str, default='jibe-snapshot',
+                           metavar='DIR',
+                           help='Where fetch writes and report reads the '
+                                'snapshots (default: jibe-snapshot)')
+    argparser.add_argument('--deadline', type=parse_duration,
+                           metavar='DURATION',
+                           help='Stop comparing issues after DURATION (i.e. '
+                                '90s, 45m, 1h30m) and send partial reports; '
+                                'the most important issues are compared '
+                                'first')
+    argparser.add_argument('--top', type=parse_positive, metavar='K',
+                           help='Only list the K issues with the most failed '
+                                'checks (then the highest priority), the '
+                                'others are only counted')
+    argparser.add_argument('--sample', type=parse_sample, metavar='N',
+                           help='Only compare a random sample of N issues '
+                                '(or a fraction of them, i.e. 0.1), drawn '
+                                'from every repo, and estimate the out of '
+                                'sync rates of all issues')
+    argparser.add_argument('--state-dir', type=str, metavar='DIR',
+                           help='Checkpoint every repo fetched and every '
+                                'report sent to DIR as the run goes')
+    argparser.add_argument('--resume', default=False, action='store_true',
+                           help='Continue the run checkpointed in '
+                                '--state-dir, skipping what it finished')
+    argparser.add_argument('--shard', type=parse_shard, metavar='I/N',
+                           help='Only fetch the repos of shard I of N (1 to '
+                                'N), combine the shards with merge')
+    cassettes = argparser.add_mutually_exclusive_group()
+    cassettes.add_argument('--record', type=str, metavar='DIR',
+                           help='Record every HTTP exchange of the run to '
+                                'cassettes in DIR')
+    cassettes.add_argument('--replay', type=str, metavar='DIR',
+                           help='Serve every HTTP request from the cassettes '
+                                'in DIR instead of the network')
+    argparser.add_argument('--host', type=str, default='127.0.0.1',
+                           help='Address serve listens on (default: '
+                                '127.0.0.1)')
+    argparser.add_argument('--port', type=int, default=8787,
+                           help='Port serve listens on (default: 8787)')
+    argparser.add_argument('--interval', type=float, default=86400,
+                           metavar='SECONDS',
+                           help='Seconds between the scheduled runs of '
+                                'serve (default: 86400)')
+    argparser.add_argument('--resync-interval', type=float, default=604800,
+                           metavar='SECONDS',
+                           help='Seconds after which serve fetches a group '
+                                'kept current by webhooks in full again '
+                                '(default: 604800)')
     parser = argparser.parse_args(args)
     return parser
 
@@ -267,6 +1152,43 @@ def main():
     """
     # Parse arguments
     arguments = parse_args(sys.argv[1:])
+    if arguments.deadline:
+        # The budget starts now, imports and config loading count too
+        arguments.deadline_at = time.time() + arguments.deadline
+
+    if arguments.command == 'deliver':
+        # Deliver what is left in the spool and return
+        if not arguments.spool_dir:
+            log.error('   deliver needs --spool-dir')
+            return
+        remaining = spool.deliver(arguments.spool_dir, force=True)
+        log.info('   %i report(s) still pending' % remaining)
+        return
+
+    if arguments.shard and arguments.command != 'fetch':
+        # Only fetching is split, merge puts the reports together
+        log.error('   --shard only applies to fetch')
+        return
+
+    if arguments.deadline and (arguments.command != 'run' or arguments.state_dir):
+        # Only run compares issues with JIRA, a checkpointed run is
+        # finished by resuming it instead
+        log.error('   --deadline only applies to run without --state-dir')
+        return
+
+    if arguments.sample and (arguments.command != 'run' or arguments.state_dir):
+        # A checkpointed run fetches every JIRA issue anyway
+        log.error('   --sample only applies to run without --state-dir')
+        return
+
+    if arguments.resume and not arguments.state_dir:
+        log.error('   --resume needs the --state-dir of the run to resume')
+        return
+
+    if arguments.top and arguments.sample:
+        # The estimates of a sample need every sampled issue
+        log.error('   --top can not be combined with --sample')
+        return
 
     # Load in config file
     if arguments.sync2jira:
@@ -274,47 +1196,136 @@ def main():
     else:
         config = load_config()
 
+    # Compile the check list of every project once
+    d.compile_check_plans(config)
+
+    try:
+        if not arguments.replay:
+            # Adapt the requests in flight to how each host copes, and
+            # fail fast on the hosts that are down
+            throttle.enable(arguments.max_per_host or arguments.jobs)
+
+        # Record every HTTP exchange of the run, or serve them from an
+        # earlier recording
+        if arguments.record:
+            cassette.record(arguments.record)
+        elif arguments.replay:
+            cassette.replay(arguments.replay)
+
+        run_command(config, arguments)
+    finally:
+        cassette.stop()
+        throttle.disable()
+
+
+def run_command(config, arguments):
+    """
+    Runs the command of validated arguments, with the HTTP requests
+    already throttled (and recorded or replayed) by main
+    Args:
+        config (dict): Config dict
+        arguments (Namespace): Parsed Arguments
+    Returns:
+        Nothing
+    """
     if arguments.link_issue:
         # Call link function and return
-        attach_link(arguments.link_issue[0],
-                    arguments.link_issue[1], config)
+        attach_link(arguments.link_issue[0], arguments.link_issue[1], config)
         return
 
-    # Loop through all groups
-    for group in config['jibe']['send-to']:
-        # Get all upstream issues
-        issues = u.get_upstream_issues(config, group)
+    if arguments.link_issues_from:
+        # Add every link of the file, --jobs issues at a time, and return
+        linking.link_all(linking.read_links(arguments.link_issues_from, config),
+                         config, arguments.jobs)
+        if arguments.metrics_dir:
+            metrics.write(arguments.metrics_dir)
+        return
 
-        # Compare them with downstream issues
-        out_of_sync_issues, missing_issues = \
-            d.sync_with_downstream(issues, config)
+    for directory in (arguments.report_dir, arguments.suggestions_dir):
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
 
-        # Return differences to the user
-        # First format the check array for each issue
-        format_check(out_of_sync_issues)
+    if arguments.command == 'serve':
+        # Reports are kept in memory and mailed on schedule
+        serve(config, arguments)
+        return
 
-        # Do we want jokes?
-        if config['jibe']['send-to'][group].get('fun', {}):
-            joke = get_dad_joke()
-        else:
-            joke = ''
-
-        # Remove in sync items if requested
-        if arguments.ignore_in_sync:
-            new_out_of_sync_issues = []
-            for issue in out_of_sync_issues:
-                if issue.total != issue.done:
-                    new_out_of_sync_issues.append(issue)
-            out_of_sync_issues = new_out_of_sync_issues
-
-        # Then generate the HTML
-        html = create_html(out_of_sync_issues, missing_issues, joke)
-
-        # Create mailer object and send email
-        if not config['jibe']['send-to'][group]['email-to']:
-            log.warning('   Email list is empty. No one was emailed.')
+    if arguments.state_dir:
+        # Record the progress of the run, or pick up where it stopped
+        checkpoint.enable(arguments.state_dir, resume=arguments.resume)
+
+    # Reports are delivered by a background worker when spooling
+    worker = None
+    if arguments.spool_dir:
+        worker = spool.DeliveryWorker(arguments.spool_dir,
+                                      on_delivered=checkpoint.delivered)
+        worker.start()
+
+    if arguments.profile or arguments.profile_memory:
+        profiling.enable(arguments.profile_dir, cpu=arguments.profile,
+                         memory=arguments.profile_memory)
+        if arguments.jobs > 1:
+            # The profilers only see the thread they are started in
+            log.warning('   Profiling, ignoring --jobs %i' % arguments.jobs)
+            arguments.jobs = 1
+
+    groups = list(config['jibe']['send-to'])
+    timings = {}
+    pipeline = {'run': run_group,
+                'fetch': fetch_group,
+                'report': report_snapshot_group,
+                'merge': merge_group}[arguments.command]
+
+    def run(group):
+        if arguments.command != 'fetch' and checkpoint.sent(group):
+            log.info('   Report for %s was already sent, skipping', group)
+            timings[group] = (0, 'sent')
             return
+        key = arguments.command != 'fetch' and checkpoint.spooled_key(group)
+        if key:
+            # Spooled, but the run stopped before it was delivered
+            if worker:
+                log.info('   Report for %s is still in the spool, delivering it', group)
+                worker.put(key)
+                timings[group] = (0, 'spooled')
+            else:
+                log.error('   The report of %s is in the spool, resume with its '
+                          '--spool-dir (or run jibe deliver) to send it', group)
+                timings[group] = (0, 'failed')
+            return
+        start = time.time()
+        try:
+            with metrics.timer('group', group):
+                pipeline(group, config, arguments, worker)
+            status = 'ok'
+        except Exception:
+            # Don't let one group take the others down
+            log.exception('   Failed to create report for %s' % group)
+            status = 'failed'
+        timings[group] = (time.time() - start, status)
+
+    try:
+        if arguments.jobs > 1:
+            # Run whole group pipelines concurrently
+            with futures.ThreadPoolExecutor(max_workers=arguments.jobs) as executor:
+                list(executor.map(run, groups))
+        else:
+            for group in groups:
+                run(group)
+    finally:
+        if worker:
+            # Wait for the queued reports to be delivered
+            worker.close(timeout=spool.DRAIN_TIMEOUT)
+        # Close the connection to the mail server
+        m.close()
 
-        m.send(config['jibe']['send-to'][group]['email-to'],
-               'Jibe Report for ' + group, html)
-        log.info('   Finished sending report for %s' % group)
+    # Per-group timing summary
+    log.info('   Finished %i group(s):' % len(groups))
+    for group in groups:
+        if group in timings:
+            log.info('     %-40s %8.2fs  %s', group, *timings[group])
+    metrics.increment('groups_failed', len([1 for _, status in timings.values()
+                                            if status == 'failed']))
+    if arguments.metrics_dir:
+        metrics.write(arguments.metrics_dir)
+    profiling.write()
@@ -0,0 +1,249 @@
+# Built In Modules
+import io
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Global Variables
+log = logging.getLogger(__name__)
+# Upper bounds (seconds) of the request latency histogram buckets
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+
+
+class Metrics(object):
+    """
+    Thread safe collection of the metrics of one run:
+        * wall time per phase and group
+        * requests, errors and latency histogram per endpoint family
+          (i.e. github.issues, jira.search, smtp)
+        * retries per endpoint family
+        * requests coalesced into one already in flight per endpoint family
+        * cache hits/misses per cache
+        * emails and bytes sent per group
+        * plain counters
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.phases = {}
+            self.requests = {}
+            self.errors = {}
+            self.latency = {}
+            self.retries = {}
+            self.coalesced = {}
+            self.caches = {}
+            self.emails = {}
+            self.counters = {}
+
+    @contextmanager
+    def timer(self, phase, group=''):
+        """ Adds the wall time of the block to (phase, group) """
+        start = time.time()
+        try:
+            yield
+        finally:
+            elapsed = time.time() - start
+            with self._lock:
+                key = (phase, group)
+                self.phases[key] = self.phases.get(key, 0.0) + elapsed
+
+    @contextmanager
+    def request(self, family):
+        """ Counts a request of an endpoint family and records its latency """
+        start = time.time()
+        try:
+            yield
+        except Exception:
+            with self._lock:
+                self.errors[family] = self.errors.get(family, 0) + 1
+            raise
+        finally:
+            self.observe(family, time.time() - start)
+
+    def observe(self, family, seconds):
+        with self._lock:
+            self.requests[family] = self.requests.get(family, 0) + 1
+            histogram = self.latency.setdefault(
+                family, {'buckets': [0] * len(BUCKETS), 'sum': 0.0})
+            histogram['sum'] += seconds
+            for index, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    histogram['buckets'][index] += 1
+                    break
+
+    def retry(self, family):
+        with self._lock:
+            self.retries[family] = self.retries.get(family, 0) + 1
+
+    def coalesce(self, family):
+        """ Counts a request that waited for an identical one in flight """
+        with self._lock:
+            self.coalesced[family] = self.coalesced.get(family, 0) + 1
+
+    def cache(self, name, hit):
+        with self._lock:
+            hits_misses = self.caches.setdefault(name, [0, 0])
+            hits_misses[0 if hit else 1] += 1
+
+    def email(self, group, size):
+        """ Counts an email of a group and its size in bytes """
+        with self._lock:
+            messages_bytes = self.emails.setdefault(group or 'all', [0, 0])
+            messages_bytes[0] += 1
+            messages_bytes[1] += size
+
+    def increment(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_dict(self):
+        """ Returns the metrics as a JSON serializable dict """
+        with self._lock:
+            phases = {}
+            for (phase, group), seconds in self.phases.items():
+                phases.setdefault(phase, {})[group or 'all'] = round(seconds, 6)
+            caches = {}
+            for name, (hits, misses) in self.caches.items():
+                total = hits + misses
+                caches[name] = {'hits': hits, 'misses': misses,
+                                'hit_ratio': float(hits) / total if total else 0.0}
+            latency = {}
+            for family, histogram in self.latency.items():
+                latency[family] = {
+                    'sum': round(histogram['sum'], 6),
+                    'buckets': dict(('+Inf' if bound == float('inf') else str(bound), count)
+                                    for bound, count in zip(BUCKETS, histogram['buckets']))}
+            return {
+                'started': self.started,
+                'duration': round(time.time() - self.started, 6),
+                'phases': phases,
+                'requests': dict(self.requests),
+                'errors': dict(self.errors),
+                'latency': latency,
+                'retries': dict(self.retries),
+                'coalesced': dict(self.coalesced),
+                'caches': caches,
+                'emails': dict((group, {'messages': messages, 'bytes': size})
+                               for group, (messages, size) in self.emails.items()),
+                'counters': dict(self.counters),
+            }
+
+    def to_prometheus(self):
+        """ Returns the metrics in the Prometheus text exposition format """
+        data = self.to_dict()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append('# HELP %s %s' % (name, help_text))
+            lines.append('# TYPE %s %s' % (name, kind))
+            for labels, value in samples:
+                lines.append('%s%s %s' % (name, _labels(labels), _number(value)))
+
+        metric('jibe_run_duration_seconds', 'gauge', 'Wall time of the run',
+               [({}, data['duration'])])
+        metric('jibe_run_timestamp_seconds', 'gauge', 'Start time of the run',
+               [({}, data['started'])])
+        metric('jibe_phase_duration_seconds', 'gauge', 'Wall time per phase and group',
+               [({'phase': phase, 'group': group}, seconds)
+                for phase, groups in sorted(data['phases'].items())
+                for group, seconds in sorted(groups.items())])
+        metric('jibe_requests_total', 'counter', 'Requests per endpoint family',
+               [({'family': family}, count) for family, count in sorted(data['requests'].items())])
+        metric('jibe_request_errors_total', 'counter', 'Failed requests per endpoint family',
+               [({'family': family}, count) for family, count in sorted(data['errors'].items())])
+        metric('jibe_retries_total', 'counter', 'Retries per endpoint family',
+               [({'family': family}, count) for family, count in sorted(data['retries'].items())])
+        metric('jibe_coalesced_requests_total', 'counter',
+               'Requests that shared an identical request in flight per endpoint family',
+               [({'family': family}, count) for family, count in sorted(data['coalesced'].items())])
+        # Histogram buckets are cumulative in Prometheus
+        lines.append('# HELP jibe_request_duration_seconds Request latency per endpoint family')
+        lines.append('# TYPE jibe_request_duration_seconds histogram')
+        with self._lock:
+            histograms = sorted((family, list(histogram['buckets']), histogram['sum'])
+                                for family, histogram in self.latency.items())
+        for family, buckets, total in histograms:
+            cumulative = 0
+            for bound, count in zip(BUCKETS, buckets):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else str(bound)
+                lines.append('jibe_request_duration_seconds_bucket%s %i' %
+                             (_labels({'family': family, 'le': le}), cumulative))
+            lines.append('jibe_request_duration_seconds_sum%s %s' %
+                         (_labels({'family': family}), _number(total)))
+            lines.append('jibe_request_duration_seconds_count%s %i' %
+                         (_labels({'family': family}), cumulative))
+        metric('jibe_cache_hits_total', 'counter', 'Cache hits',
+               [({'cache': name}, cache['hits']) for name, cache in sorted(data['caches'].items())])
+        metric('jibe_cache_misses_total', 'counter', 'Cache misses',
+               [({'cache': name}, cache['misses']) for name, cache in sorted(data['caches'].items())])
+        metric('jibe_cache_hit_ratio', 'gauge', 'Cache hit ratio',
+               [({'cache': name}, cache['hit_ratio']) for name, cache in sorted(data['caches'].items())])
+        metric('jibe_emails_total', 'counter', 'Emails sent per group',
+               [({'group': group}, email['messages'])
+                for group, email in sorted(data['emails'].items())])
+        metric('jibe_email_bytes_total', 'counter', 'Bytes of the emails sent per group',
+               [({'group': group}, email['bytes'])
+                for group, email in sorted(data['emails'].items())])
+        metric('jibe_events_total', 'counter', 'Other run counters',
+               [({'name': name}, count) for name, count in sorted(data['counters'].items())])
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{%s}' % ','.join(
+        '%s="%s"' % (key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in sorted(labels.items()))
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _write(path, text):
+    # Write to a temporary file first so collectors never read half a file
+    tmp = path + '.tmp'
+    with io.open(tmp, 'w', encoding='utf-8') as fp:
+        fp.write(text)
+    os.rename(tmp, path)
+
+
+# The metrics of the current run
+_metrics = Metrics()
+timer = _metrics.timer
+request = _metrics.request
+observe = _metrics.observe
+retry = _metrics.retry
+coalesce = _metrics.coalesce
+cache = _metrics.cache
+email = _metrics.email
+increment = _metrics.increment
+reset = _metrics.reset
+to_dict = _metrics.to_dict
+to_prometheus = _metrics.to_prometheus
+
+
+def write(metrics_dir):
+    """
+    Writes the metrics of the run as JSON (jibe-metrics.json) and as a
+    Prometheus textfile collector file (jibe.prom)
+    Args:
+        metrics_dir (str): Directory to write to
+    Returns:
+        Nothing
+    """
+    if not os.path.isdir(metrics_dir):
+        os.makedirs(metrics_dir)
+    _write(os.path.join(metrics_dir, 'jibe-metrics.json'),
+           json.dumps(to_dict(), indent=2, sort_keys=True))
+    _write(os.path.join(metrics_dir, 'jibe.prom'), to_prometheus())
+    log.info('   Wrote run metrics to %s' % metrics_dir)
@@ -0,0 +1,132 @@
+# Built In Modules
+import io
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+# Local Modules
+from jibe.lazy import LazyModule
+
+# Global Variables
+# Only imported when profiling is turned on
+cProfile = LazyModule('cProfile')
+tracemalloc = LazyModule('tracemalloc')
+log = logging.getLogger(__name__)
+# Number of allocation sites kept per phase
+TOP_N = 25
+# Set up by enable()
+_profile_dir = None
+_cpu = False
+_memory = False
+# One profile and one allocation summary per phase
+_profiles = {}
+_allocations = {}
+_lock = threading.Lock()
+
+
+def enable(profile_dir, cpu=True, memory=False):
+    """
+    Turns profiling of the run's phases on
+    Args:
+        profile_dir (str): Directory the results are written to
+        cpu (bool): Profile with cProfile
+        memory (bool): Trace allocations with tracemalloc
+    Returns:
+        Nothing
+    """
+    global _profile_dir, _cpu, _memory
+    _profile_dir = profile_dir
+    _cpu = cpu
+    _memory = memory
+    _profiles.clear()
+    _allocations.clear()
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable():
+    """
+    Turns profiling off again and forgets the results
+    Args:
+    Returns:
+        Nothing
+    """
+    global _cpu, _memory
+    if _memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _cpu = _memory = False
+    _profiles.clear()
+    _allocations.clear()
+
+
+def enabled():
+    return _cpu or _memory
+
+
+@contextmanager
+def phase(name):
+    """
+    Profiles the block as part of phase 'name'. Results of the same
+    phase (i.e. of every group) are added up.
+    """
+    if not enabled():
+        yield
+        return
+    with _lock:
+        profile = None
+        if _cpu:
+            profile = _profiles.setdefault(name, cProfile.Profile())
+            profile.enable()
+        before = tracemalloc.take_snapshot() if _memory else None
+        try:
+            yield
+        finally:
+            if profile:
+                profile.disable()
+            if before is not None:
+                after = tracemalloc.take_snapshot()
+                _add_allocations(name, after.compare_to(before, 'lineno'))
+
+
+def _add_allocations(name, differences):
+    allocations = _allocations.setdefault(name, {})
+    for difference in differences:
+        if not difference.size_diff:
+            continue
+        frame = difference.traceback[0]
+        site = '%s:%i' % (frame.filename, frame.lineno)
+        size, count = allocations.get(site, (0, 0))
+        allocations[site] = (size + difference.size_diff,
+                             count + difference.count_diff)
+
+
+def write():
+    """
+    Writes <phase>.pstats and <phase>-memory.txt for every profiled phase
+    Args:
+    Returns:
+        Nothing
+    """
+    if not enabled():
+        return
+    if not os.path.isdir(_profile_dir):
+        os.makedirs(_profile_dir)
+    for name, profile in _profiles.items():
+        path = os.path.join(_profile_dir, name + '.pstats')
+        profile.dump_stats(path)
+        log.info('   Wrote CPU profile of %s to %s' % (name, path))
+    for name, allocations in _allocations.items():
+        top = sorted(allocations.items(), key=lambda item: -abs(item[1][0]))[:TOP_N]
+        path = os.path.join(_profile_dir, name + '-memory.txt')
+        with io.open(path, 'w', encoding='utf-8') as fp:
+            fp.write(u'# Top %i allocation sites of phase %s (net bytes, net blocks)\n' % (TOP_N, name))
+            for site, (size, count) in top:
+                fp.write(u'%12i B %8i  %s\n' % (size, count, site))
+        log.info('   Wrote allocation summary of %s to %s' % (name, path))
+        for site, (size, count) in top[:5]:
+            log.info('     %s: %.1f KiB in %i block(s)' % (site, size / 1024.0, count))
+    if _memory:
+        current, peak = tracemalloc.get_traced_memory()
+        log.info('   Traced memory: %.1f MiB current, %.1f MiB peak' %
+                 (current / 1048576.0, peak / 1048576.0))
@@ -0,0 +1,159 @@
+# Built In Modules
+import math
+import random
+from collections import OrderedDict
+
+# Local Modules
+import jibe.downstream as d
+from jibe.intermediary import SYNC_FIELDS
+
+# Global Variables
+# Two sided 95% confidence
+Z = 1.96
+
+
+def stratum(issue):
+    """ Issues are sampled per repo """
+    return issue.source, issue.upstream
+
+
+def stratify(issues, size, rand=None):
+    """
+    Draws a random sample of the issues, stratified by repo: every repo
+    gets its share of the sample (and at least one issue if the sample
+    is large enough)
+    Args:
+        issues ([jibe.intermediary.Issue]): All upstream issues
+        size (int or float): Issues in the sample, or the fraction of
+                             the issues of every repo if below 1
+        rand (random.Random): Random number generator
+    Returns:
+        sample ([jibe.intermediary.Issue]): Sampled issues, in their
+                                            original order
+        population (OrderedDict): Repo -> number of issues in it
+    """
+    rand = rand or random.Random()
+    strata = OrderedDict()
+    for issue in issues:
+        strata.setdefault(stratum(issue), []).append(issue)
+    population = OrderedDict((key, len(members)) for key, members in strata.items())
+    total = sum(population.values())
+    if not total:
+        return [], population
+
+    if isinstance(size, float) and size < 1:
+        shares = dict((key, max(1, int(round(size * count))))
+                      for key, count in population.items())
+    else:
+        shares = _allocate(population, min(int(size), total))
+
+    chosen = set()
+    for key, members in strata.items():
+        chosen.update(id(issue) for issue in rand.sample(members, min(shares[key], len(members))))
+    return [issue for issue in issues if id(issue) in chosen], population
+
+
+def _allocate(population, size):
+    """ Splits size over the repos in proportion to their issues (largest remainder) """
+    total = float(sum(population.values()))
+    # Every repo is represented if the sample allows it
+    floor = 1 if size >= len(population) else 0
+    exact = dict((key, size * count / total) for key, count in population.items())
+    shares = dict((key, min(count, max(floor, int(exact[key]))))
+                  for key, count in population.items())
+    left = size - sum(shares.values())
+    for key in sorted(population, key=lambda key: exact[key] - int(exact[key]), reverse=True):
+        if left <= 0:
+            break
+        if shares[key] < population[key]:
+            shares[key] += 1
+            left -= 1
+    return shares
+
+
+def _estimate(strata):
+    """
+    Stratified estimate of a proportion with a 95% confidence interval
+    Args:
+        strata ([(float, int, int)]): (issues in the repo, issues
+                                       sampled, issues that count) per
+                                       repo
+    Returns:
+        rate (float): Estimated proportion
+        low (float): Lower bound
+        high (float): Upper bound
+    """
+    strata = [(size, sampled, hits) for size, sampled, hits in strata if sampled]
+    total = float(sum(size for size, _, _ in strata))
+    if not total:
+        return None, None, None
+    rate = variance = 0.0
+    for size, sampled, hits in strata:
+        weight = size / total
+        rate += weight * hits / float(sampled)
+        # Agresti-Coull adjusted proportion, so a repo where the sample
+        # found nothing still adds uncertainty
+        adjusted = (hits + 2.0) / (sampled + 4.0)
+        # Estimated sizes can round a census just below 0
+        correction = max(0.0, 1.0 - sampled / float(size))
+        variance += weight ** 2 * correction * adjusted * (1 - adjusted) / sampled
+    margin = Z * math.sqrt(variance)
+    return rate, max(0.0, rate - margin), min(1.0, rate + margin)
+
+
+def estimate(population, out_of_sync_issues, missing_issues):
+    """
+    Estimates the sync health of all issues from the compared sample
+    Args:
+        population (OrderedDict): Repo -> number of issues (see stratify)
+        out_of_sync_issues ([jibe.intermediary.Issue]): Sampled issues
+                                                        with a JIRA issue
+        missing_issues ([jibe.intermediary.Issue]): Sampled issues without
+    Returns:
+        estimates (dict): 'population' and 'sampled' counts and 'rows',
+                          one dict (name, rate, low, high, sampled) per
+                          estimate: issues out of sync, issues without
+                          JIRA issue and every check
+    """
+    found = OrderedDict((key, []) for key in population)
+    missing = dict((key, 0) for key in population)
+    for issue in out_of_sync_issues:
+        found[stratum(issue)].append(issue)
+    for issue in missing_issues:
+        missing[stratum(issue)] += 1
+
+    checks = []
+    for issues in found.values():
+        for issue in issues[:1]:
+            for name in d.get_check_plan(issue.downstream).names:
+                if name not in checks:
+                    checks.append(name)
+    # Template order first, custom checks after
+    checks.sort(key=lambda name: SYNC_FIELDS.index(name) if name in SYNC_FIELDS else len(SYNC_FIELDS))
+
+    def row(name, strata):
+        rate, low, high = _estimate(strata)
+        return {'name': name, 'rate': rate, 'low': low, 'high': high,
+                'sampled': sum(sampled for _, sampled, _ in strata)}
+
+    # The checks are rates among the issues with a JIRA issue, so every
+    # repo weighs (and is corrected for its finite size) by the issues
+    # with a JIRA issue it is estimated to have
+    linked = dict((key, population[key] * len(found[key]) / float(len(found[key]) + missing[key])
+                   if found[key] else 0.0) for key in population)
+    rows = [
+        row('Without JIRA issue', [(population[key], len(found[key]) + missing[key], missing[key])
+                                   for key in population]),
+        row('Out of sync', [(linked[key], len(found[key]),
+                             sum(1 for issue in found[key] if issue.failed_checks()))
+                            for key in population]),
+    ]
+    for name in checks:
+        rows.append(row(name, [
+            (linked[key], len(found[key]),
+             sum(1 for issue in found[key] if issue.sync_state(name)))
+            for key in population
+            if found[key] and name in d.get_check_plan(found[key][0].downstream).names]))
+    return {'population': sum(population.values()),
+            'sampled': len(out_of_sync_issues) + len(missing_issues),
+            'rows': rows}
@@ -0,0 +1,172 @@
+# Built In Modules
+import glob
+import hashlib
+import logging
+import os
+import re
+
+# Local Modules
+import jibe.snapshot as snapshot
+
+# Global Variables
+log = logging.getLogger(__name__)
+
+
+def units(config, group):
+    """
+    The repos of a group, in the order get_upstream_issues fetches them
+    Args:
+        config (dict): Config dict
+        group (str): Group in config file
+    Returns:
+        units ([(str, str)]): (source, repo) tuples
+    """
+    upstream = config['jibe']['send-to'][group]['upstream']
+    return [(source, repo) for source in ('github', 'pagure')
+            for repo in upstream.get(source, {})]
+
+
+def shard_of(count, *key):
+    """
+    Stable shard (1 to count) of a group or a (group, source, repo) unit.
+    The hash doesn't depend on the process or the machine, so every
+    worker agrees on it
+    Args:
+        count (int): Number of shards
+        key (str): Group, and optionally the source and repo
+    Returns:
+        shard (int): Shard the key belongs to
+    """
+    digest = hashlib.sha1(u'\0'.join(key).encode('utf-8')).hexdigest()
+    return int(digest, 16) % count + 1
+
+
+def shard_repos(config, group, index, count):
+    """
+    The repos of a group that belong to a shard
+    Args:
+        config (dict): Config dict
+        group (str): Group in config file
+        index (int): Shard (1 to count)
+        count (int): Number of shards
+    Returns:
+        repos (set): (source, repo) tuples
+    """
+    return set(unit for unit in units(config, group)
+               if shard_of(count, group, *unit) == index)
+
+
+def shards(config, group, count):
+    """
+    The shards that write a partial snapshot of a group: the shard of the
+    group itself (it fetches the joke, so every group has one) and the
+    shards of its repos
+    Args:
+        config (dict): Config dict
+        group (str): Group in config file
+        count (int): Number of shards
+    Returns:
+        shards ([int]): Shards, in order
+    """
+    result = set(shard_of(count, group, *unit) for unit in units(config, group))
+    result.add(shard_of(count, group))
+    return sorted(result)
+
+
+def shard_path(snapshot_dir, group, index, count):
+    """
+    Path of the partial snapshot a shard writes for a group
+    Args:
+        snapshot_dir (str): Snapshot directory
+        group (str): Group in config file
+        index (int): Shard (1 to count)
+        count (int): Number of shards
+    Returns:
+        path (str): Partial snapshot file
+    """
+    path = snapshot.snapshot_path(snapshot_dir, group)
+    return '%s.shard-%i-of-%i.msgpack' % (path[:-len('.msgpack')], index, count)
+
+
+def shard_count(snapshot_dir, group):
+    """
+    Number of shards the partial snapshots of a group were fetched with
+    Args:
+        snapshot_dir (str): Snapshot directory
+        group (str): Group in config file
+    Returns:
+        count (int): Number of shards
+    """
+    prefix = snapshot.snapshot_path(snapshot_dir, group)[:-len('.msgpack')]
+    counts = set()
+    for path in glob.glob(glob.escape(prefix) + '.shard-*-of-*.msgpack'):
+        match = re.match(r'\.shard-\d+-of-(\d+)\.msgpack$', path[len(prefix):])
+        if match:
+            counts.add(int(match.group(1)))
+    if not counts:
+        raise IOError('No partial snapshots of %s in %s' % (group, snapshot_dir))
+    if len(counts) > 1:
+        raise ValueError('Partial snapshots of %s were fetched with %s shards, '
+                         'remove the stale ones' % (
+                             group, ' and '.join(str(count) for count in sorted(counts))))
+    return counts.pop()
+
+
+class _Partial(object):
+    """ Records of a partial snapshot, with a look at the next one """
+    def __init__(self, path):
+        self.header, self._records = snapshot.read_snapshot(path)
+        self.next = next(self._records, None)
+
+    def take(self, unit):
+        """ Yields the records of a repo, they are next to each other """
+        while self.next is not None and \
+                (self.next['issue']['source'], self.next['issue']['upstream']) == unit:
+            yield self.next
+            self.next = next(self._records, None)
+
+    def rest(self):
+        while self.next is not None:
+            yield self.next
+            self.next = next(self._records, None)
+
+
+def merge(snapshot_dir, group, config):
+    """
+    Combines the partial snapshots of a group into its snapshot and then
+    removes them. The records are put in the order of the repos in the
+    config, so the report is the same for any number of shards (and
+    without sharding). Every partial is read once, one record at a time
+    Args:
+        snapshot_dir (str): Snapshot directory
+        group (str): Group in config file
+        config (dict): Config dict
+    Returns:
+        count (int): Number of issues in the snapshot
+    """
+    count = shard_count(snapshot_dir, group)
+    paths = dict((index, shard_path(snapshot_dir, group, index, count))
+                 for index in shards(config, group, count))
+    missing = sorted(index for index, path in paths.items() if not os.path.exists(path))
+    if missing:
+        raise IOError('Shard(s) %s of %i did not write a snapshot of %s' % (
+            ', '.join(str(index) for index in missing), count, group))
+    partials = dict((index, _Partial(path)) for index, path in paths.items())
+    owner = partials[shard_of(count, group)].header
+
+    def records():
+        for unit in units(config, group):
+            for record in partials[shard_of(count, group, *unit)].take(unit):
+                yield record
+        # Only left if the config changed since the fetch
+        for index in sorted(partials):
+            for record in partials[index].rest():
+                log.warning('   %s is no longer in shard %i of %s, skipping',
+                            record['issue']['upstream'], index, group)
+
+    created = min(partial.header['created'] for partial in partials.values())
+    total = snapshot.write_records(snapshot.snapshot_path(snapshot_dir, group), group,
+                                   records(), owner['joke'], created)
+    for path in paths.values():
+        os.remove(path)
+    return total
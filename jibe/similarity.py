@@ -0,0 +1,265 @@
+# Built In Modules
+import csv
+import io
+import logging
+import math
+import re
+import threading
+import time
+from collections import defaultdict
+
+# Local Modules
+import jibe.downstream as d
+import jibe.metrics as metrics
+from jibe.singleflight import Group
+
+# Global Variables
+log = logging.getLogger(__name__)
+# Length of the character n-grams
+NGRAM = 3
+# Candidates proposed per missing issue and the lowest score shown
+LIMIT = 3
+MIN_SCORE = 0.35
+# Seconds an index is reused before the project is swept again
+MAX_AGE = 3600
+# Issues fetched per page of the sweep
+PAGE_SIZE = 1000
+# (jira_instance, project) -> TitleIndex, see get_index. The lock only
+# guards the dict, the sweeps run outside of it
+_indexes = {}
+_lock = threading.Lock()
+# Concurrent sweeps of the same project share one
+_sweeps = Group('jira.title_index')
+
+
+def normalize(title):
+    """
+    Normalizes a title or summary for matching: lower case, without the
+    '[org/repo]' prefix Jibe and sync2jira put in front of summaries and
+    without punctuation
+    Args:
+        title (str): Title or summary
+    Returns:
+        tokens ([str]): Words of the title
+    """
+    title = re.sub(r'^\s*\[[^\]]*\]\s*', '', title or '')
+    return re.findall(r'\w+', title.lower(), re.UNICODE)
+
+
+def features(title):
+    """
+    Features of a title: its words and the character n-grams of each word
+    (padded, so short words still have one)
+    Args:
+        title (str): Title or summary
+    Returns:
+        features (set): Features of the title
+    """
+    result = set()
+    for token in normalize(title):
+        result.add(token)
+        padded = ' %s ' % token
+        for start in range(max(len(padded) - NGRAM + 1, 1)):
+            result.add('#' + padded[start:start + NGRAM])
+    return result
+
+
+class TitleIndex(object):
+    """
+    Inverted index over the summaries of the issues of one JIRA project.
+    Titles are compared by the cosine of their idf weighted feature sets,
+    so rare words and n-grams count more than common ones.
+    """
+    def __init__(self, issues=()):
+        """
+        Args:
+            issues (iterable): (key, summary) tuples
+        """
+        self.keys = []
+        self.summaries = []
+        self.created = time.time()
+        postings = defaultdict(list)
+        for key, summary in issues:
+            doc = len(self.keys)
+            self.keys.append(key)
+            self.summaries.append(summary)
+            for feature in features(summary):
+                postings[feature].append(doc)
+        self.postings = dict(postings)
+        count = float(max(len(self.keys), 1))
+        self.idf = dict((feature, math.log(1 + count / len(docs)))
+                        for feature, docs in self.postings.items())
+        norms = [0.0] * len(self.keys)
+        for feature, docs in self.postings.items():
+            weight = self.idf[feature] ** 2
+            for doc in docs:
+                norms[doc] += weight
+        self.norms = [math.sqrt(norm) for norm in norms]
+        # Features in more issues than this say little about a match and
+        # would make every lookup walk a large part of the project
+        self.max_postings = max(100, len(self.keys) // 10)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def candidates(self, title, limit=LIMIT, min_score=MIN_SCORE, exclude=()):
+        """
+        Ranks the issues of the project by the similarity of their summary
+        to a title
+        Args:
+            title (str): Upstream issue title
+            limit (int): Most candidates returned
+            min_score (float): Lowest similarity (0 to 1) returned
+            exclude (set): Keys that are not candidates (i.e. already
+                           matched to another upstream issue)
+        Returns:
+            candidates ([(str, str, float)]): (key, summary, score) tuples,
+                                              best first
+        """
+        title_features = features(title)
+        query = [(feature, self.idf[feature]) for feature in title_features
+                 if feature in self.idf]
+        if not query:
+            return []
+        scores = defaultdict(float)
+        for feature, weight in query:
+            docs = self.postings[feature]
+            if len(docs) > self.max_postings:
+                continue
+            weight = weight ** 2
+            for doc in docs:
+                scores[doc] += weight
+        # Features the title has but the project doesn't still count
+        # against it, with the weight of a feature seen once
+        unseen = len(title_features) - len(query)
+        query_norm = math.sqrt(sum(weight ** 2 for _, weight in query) +
+                               unseen * math.log(1 + len(self.keys)) ** 2)
+        ranked = []
+        for doc, score in scores.items():
+            score /= query_norm * self.norms[doc]
+            if score >= min_score and self.keys[doc] not in exclude:
+                ranked.append((score, doc))
+        ranked.sort(reverse=True)
+        return [(self.keys[doc], self.summaries[doc], round(score, 3))
+                for score, doc in ranked[:limit]]
+
+
+def sweep(client, project):
+    """
+    Reads the summary of every issue of a project, page by page
+    Args:
+        client (jira.client.JIRA): JIRA client
+        project (str): JIRA project key
+    Returns:
+        issues (generator): (key, summary) tuples
+    """
+    start = 0
+    while True:
+        with metrics.request('jira.search'):
+            page = client.search_issues('project = "%s" ORDER BY key' % project,
+                                        startAt=start, maxResults=PAGE_SIZE,
+                                        fields='summary')
+        for issue in page:
+            yield issue.key, issue.fields.summary
+        start += len(page)
+        if not page or start >= page.total:
+            return
+
+
+def get_index(jira_instance, project, config):
+    """
+    Returns the title index of a project, sweeping the project if it has
+    no index yet or its index is older than MAX_AGE
+    Args:
+        jira_instance (str): JIRA instance in the config
+        project (str): JIRA project key
+        config (dict): Config dict
+    Returns:
+        index (TitleIndex): Index of the project
+    """
+    key = (jira_instance, project)
+    index = _fresh_index(key)
+    metrics.cache('title_index', index is not None)
+    if index is None:
+        index = _sweeps.do(key, _build_index, key, config)
+    return index
+
+
+def _fresh_index(key):
+    with _lock:
+        index = _indexes.get(key)
+    if index is not None and time.time() - index.created < MAX_AGE:
+        return index
+    return None
+
+
+def _build_index(key, config):
+    # Another thread may have published it since we looked
+    index = _fresh_index(key)
+    if index is not None:
+        return index
+    jira_instance, project = key
+    start = time.time()
+    client = d.get_jira_instance_client(jira_instance, config)
+    index = TitleIndex(sweep(client, project))
+    with _lock:
+        _indexes[key] = index
+    log.info('   Indexed %i summaries of %s in %.2fs', len(index), project,
+             time.time() - start)
+    return index
+
+
+def suggest(missing_issues, config, exclude=()):
+    """
+    Proposes JIRA issues for the upstream issues that have none, by the
+    similarity of their titles. The projects are indexed once, so there
+    is no JIRA query per issue. Issues whose config names no JIRA
+    'project' get no candidates
+    Args:
+        missing_issues ([jibe.intermediary.Issue]): Issues without JIRA issue
+        config (dict): Config dict
+        exclude (set): JIRA keys already matched to an upstream issue
+    Returns:
+        Nothing, sets issue.candidates to dicts with the key, url,
+        summary and score of each candidate, best first
+    """
+    for issue in missing_issues:
+        project = issue.downstream.get('project')
+        if not project:
+            continue
+        jira_instance = issue.downstream.get('jira_instance') or \
+            config['jibe']['default_jira_instance']
+        server = config['jibe']['jira'][jira_instance]['options']['server']
+        index = get_index(jira_instance, project, config)
+        issue.candidates = [
+            {'key': key, 'url': '%s/browse/%s' % (server.rstrip('/'), key),
+             'summary': summary, 'score': score}
+            for key, summary, score in index.candidates(issue.title, exclude=exclude)]
+
+
+def write_suggestions(path, missing_issues, config):
+    """
+    Writes the best candidate of every missing issue as a CSV file that
+    --link-issues-from reads (issue,url,jira_instance, then the score and
+    summary for the reviewer)
+    Args:
+        path (str): CSV file
+        missing_issues ([jibe.intermediary.Issue]): Issues with candidates
+        config (dict): Config dict
+    Returns:
+        count (int): Number of suggestions written
+    """
+    count = 0
+    with io.open(path, 'w', encoding='utf-8', newline='') as fp:
+        writer = csv.writer(fp)
+        writer.writerow(['issue', 'url', 'jira_instance', 'score', 'summary'])
+        for issue in missing_issues:
+            if not issue.candidates:
+                continue
+            best = issue.candidates[0]
+            jira_instance = issue.downstream.get('jira_instance') or \
+                config['jibe']['default_jira_instance']
+            writer.writerow([best['key'], issue.url, jira_instance, best['score'],
+                             best['summary']])
+            count += 1
+    return count
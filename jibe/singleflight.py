@@ -0,0 +1,70 @@
+# Built In Modules
+import threading
+
+# Local Modules
+from jibe import metrics
+
+
+class _Call(object):
+    """
+    A lookup in flight and, once it is done, its outcome. Its lock is
+    held until then; a bare lock, as an Event costs more to make than
+    most lookups that are not coalesced take
+    """
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Lock()
+        self.done.acquire()
+        self.result = None
+        self.error = None
+
+
+class Group(object):
+    """
+    Coalesces concurrent identical lookups: while a lookup of a key is in
+    flight, the threads asking for the same key wait for it and share its
+    result (or its exception) instead of sending their own request.
+    Nothing is kept once the lookup is done, this is not a cache.
+    """
+    def __init__(self, family):
+        """
+        Args:
+            family (str): Endpoint family the coalesced requests are
+                          counted under (i.e. github.users)
+        """
+        self.family = family
+        # Only touched through dict.setdefault and dict.pop, which are
+        # atomic, so no lock is needed around it
+        self._calls = {}
+
+    def do(self, key, function, *args, **kwargs):
+        """
+        Calls function(*args, **kwargs), unless a call for key is already
+        in flight, then waits for that one
+        Args:
+            key (hashable): What is looked up
+            function (callable): Does the lookup
+        Returns:
+            result: What function returned
+        """
+        new = _Call()
+        call = self._calls.setdefault(key, new)
+        if call is not new:
+            metrics.coalesce(self.family)
+            # Held until the lookup is done
+            with call.done:
+                pass
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function(*args, **kwargs)
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            del self._calls[key]
+            call.done.release()
+        return call.result
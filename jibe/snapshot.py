@@ -0,0 +1,316 @@
+# Built In Modules
+import io
+import json
+import logging
+import mmap
+import os
+import re
+import time
+from datetime import datetime
+
+# 3rd Party Modules
+import msgpack
+
+# Local Modules
+import jibe.downstream as d
+from jibe.intermediary import Issue
+
+# Global Variables
+log = logging.getLogger(__name__)
+# Bumped whenever the layout of a snapshot changes
+VERSION = 1
+# Upstream issue fields kept in a snapshot (the Issue() arguments)
+ISSUE_FIELDS = ('source', 'title', 'url', 'upstream', 'comments', 'tags',
+                'fixVersion', 'priority', 'priority_icon', 'content',
+                'reporter', 'assignee', 'status', 'id', 'updated')
+
+
+class Resource(object):
+    """
+    Stand-in for the jira.resources objects the checks look at. It only
+    has what downstream_record keeps (see
+    jibe.downstream.SNAPSHOT_FIELDS)
+    """
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+    def __getattr__(self, name):
+        raise AttributeError('Snapshots do not keep %r of JIRA issues (see '
+                             'jibe.downstream.SNAPSHOT_FIELDS)' % name)
+
+
+class User(Resource):
+    """ Rendered like jira.resources.User """
+    def __str__(self):
+        return self.displayName
+
+
+class SnapshotClient(object):
+    """ Answers the JIRA calls of the checks from a snapshot """
+    def comments(self, existing):
+        return existing.comments
+
+    def __getattr__(self, name):
+        raise AttributeError('Checks can only call comments() on the JIRA '
+                             'client of a snapshot, not %s()' % name)
+
+
+def snapshot_path(snapshot_dir, group):
+    """
+    Path of the snapshot of a group
+    Args:
+        snapshot_dir (str): Snapshot directory
+        group (str): Group in config file
+    Returns:
+        path (str): Snapshot file
+    """
+    return os.path.join(snapshot_dir, re.sub(r'[^\w.-]', '_', group) + '.msgpack')
+
+
+def priorities_path(snapshot_dir, group):
+    """
+    Path of the JIRA priorities last seen for the issues of a group
+    Args:
+        snapshot_dir (str): Snapshot directory
+        group (str): Group in config file
+    Returns:
+        path (str): JSON file
+    """
+    return snapshot_path(snapshot_dir, group)[:-len('.msgpack')] + '.priorities.json'
+
+
+def read_priorities(path):
+    """
+    Reads the JIRA priorities last seen for the issues of a group
+    Args:
+        path (str): JSON file
+    Returns:
+        priorities (dict): Upstream URL -> JIRA priority name, empty if
+                           there is no file yet
+    """
+    if not os.path.exists(path):
+        return {}
+    with io.open(path, encoding='utf-8') as fp:
+        return json.load(fp)
+
+
+def write_priorities(path, priorities):
+    """
+    Writes the JIRA priorities seen for the issues of a group
+    Args:
+        path (str): JSON file
+        priorities (dict): Upstream URL -> JIRA priority name
+    Returns:
+        Nothing
+    """
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    with io.open(path + '.tmp', 'w', encoding='utf-8') as fp:
+        fp.write(json.dumps(priorities, sort_keys=True))
+    os.rename(path + '.tmp', path)
+
+
+def _default(obj):
+    # Comment dates are only ever displayed
+    if isinstance(obj, datetime):
+        return str(obj)
+    raise TypeError('Cannot store %r in a snapshot' % obj)
+
+
+def downstream_record(existing, comments=None):
+    """
+    Normalizes a JIRA issue (and its comments) for a snapshot
+    Args:
+        existing (jira.resource.Issue): JIRA issue
+        comments ([jira.resources.Comment]): Its comments, if needed
+    Returns:
+        record (dict): Normalized JIRA issue
+    """
+    fields = existing.fields
+    return {
+        'key': existing.key,
+        'summary': fields.summary,
+        'description': fields.description,
+        'labels': list(fields.labels),
+        'fixVersions': [version.name for version in fields.fixVersions],
+        'assignee': fields.assignee.displayName if fields.assignee else None,
+        'status': fields.status.name,
+        'priority': fields.priority.name if fields.priority else None,
+        'priority_icon': fields.priority.iconUrl if fields.priority else None,
+        'updated': fields.updated,
+        'comments': [{'body': comment.body, 'author': comment.author.name}
+                     for comment in comments or []],
+    }
+
+
+def existing_from_record(record):
+    """ Rebuilds a JIRA issue from its snapshot record """
+    priority = None
+    if record['priority']:
+        priority = Resource(name=record['priority'], iconUrl=record['priority_icon'])
+    return Resource(
+        key=record['key'],
+        comments=[Resource(body=comment['body'], author=Resource(name=comment['author']))
+                  for comment in record['comments']],
+        fields=Resource(
+            summary=record['summary'],
+            description=record['description'],
+            labels=record['labels'],
+            fixVersions=[Resource(name=name) for name in record['fixVersions']],
+            assignee=User(displayName=record['assignee']) if record['assignee'] else None,
+            status=Resource(name=record['status']),
+            priority=priority,
+            updated=record['updated']))
+
+
+def fetch_downstream(issues, config):
+    """
+    Looks up the JIRA issue (and comments, if they are checked) of every
+    upstream issue
+    Args:
+        issues ([jibe.intermediary.Issue]): Upstream issues
+        config (dict): Config dict
+    Returns:
+        pairs (generator): (issue, downstream record or None) tuples
+    """
+    for issue in issues:
+        client = d.get_jira_client(issue, config)
+        existing = d.get_existing_jira_issue(client, issue, config)
+        if not existing:
+            log.warning("   Could not find existing issue for %s", issue.title)
+            yield issue, None
+            continue
+        comments = None
+        if 'comments' in d.get_check_plan(issue.downstream).names:
+            comments = d.get_comments(client, existing)
+        yield issue, downstream_record(existing, comments)
+
+
+def issue_record(issue, downstream):
+    """
+    Snapshot record of an upstream issue and its JIRA issue
+    Args:
+        issue (jibe.intermediary.Issue): Upstream issue
+        downstream (dict): Downstream record or None
+    Returns:
+        record (dict): Snapshot record
+    """
+    return {'issue': dict((field, getattr(issue, field)) for field in ISSUE_FIELDS),
+            'downstream': downstream}
+
+
+def write_snapshot(path, group, pairs, joke=''):
+    """
+    Writes the snapshot of a group: a header followed by one record per
+    upstream issue, streamed so the group is never held twice in memory
+    Args:
+        path (str): Snapshot file
+        group (str): Group in config file
+        pairs (iterable): (issue, downstream record or None) tuples
+        joke (str): Joke of the report
+    Returns:
+        count (int): Number of issues written
+    """
+    return write_records(path, group, (issue_record(issue, downstream)
+                                       for issue, downstream in pairs), joke)
+
+
+def write_records(path, group, records, joke='', created=None):
+    """
+    Writes snapshot records (see issue_record) as the snapshot of a group
+    Args:
+        path (str): Snapshot file
+        group (str): Group in config file
+        records (iterable): Snapshot records
+        joke (str): Joke of the report
+        created (float): When the data was fetched, defaults to now
+    Returns:
+        count (int): Number of issues written
+    """
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    packer = msgpack.Packer(default=_default, use_bin_type=True)
+    count = 0
+    # Write to a temporary file first so a crash never leaves half a
+    # snapshot behind
+    with io.open(path + '.tmp', 'wb') as fp:
+        fp.write(packer.pack({'version': VERSION, 'group': group,
+                              'created': created or time.time(), 'joke': joke}))
+        for record in records:
+            fp.write(packer.pack(record))
+            count += 1
+    os.rename(path + '.tmp', path)
+    return count
+
+
+def read_snapshot(path):
+    """
+    Opens a snapshot. The file is memory-mapped and its records are
+    decoded one at a time
+    Args:
+        path (str): Snapshot file
+    Returns:
+        header (dict): Version, group, creation time and joke
+        records (generator): One dict per upstream issue
+    """
+    fp = io.open(path, 'rb')
+    try:
+        data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:
+        # Empty file
+        fp.close()
+        raise ValueError('%s is not a snapshot' % path)
+    unpacker = msgpack.Unpacker(data, raw=False)
+    try:
+        header = next(unpacker)
+    except StopIteration:
+        header = None
+    if not isinstance(header, dict) or header.get('version') != VERSION:
+        data.close()
+        fp.close()
+        raise ValueError('%s is not a version %i snapshot' % (path, VERSION))
+
+    def records():
+        try:
+            for record in unpacker:
+                yield record
+        finally:
+            data.close()
+            fp.close()
+    return header, records()
+
+
+def check_snapshot(records, config, group, top=None):
+    """
+    Runs the check plan over the records of a snapshot, without network
+    Args:
+        records (iterable): Records from read_snapshot
+        config (dict): Config dict
+        group (str): Group in config file
+        top (int): Only keep the top worst checked issues (see
+                   jibe.downstream.TopIssues)
+    Returns:
+        out_of_sync_issues ([jibe.intermediary.Issues]): Issues with a JIRA issue
+        missing_issues ([jibe.intermediary.Issues]): Issues without one
+    """
+    client = SnapshotClient()
+    out_of_sync_issues = d.collector(top)
+    missing_issues = []
+    for record in records:
+        try:
+            issue = Issue(config=config, group=group, **record['issue'])
+        except KeyError:
+            # The repo was removed from the config since the fetch
+            log.warning('   %s is no longer configured for %s, skipping',
+                        record['issue']['upstream'], group)
+            continue
+        if record['downstream']:
+            existing = existing_from_record(record['downstream'])
+            out_of_sync_issues.append(
+                d.update_out_of_sync(existing, issue, client, config))
+        else:
+            missing_issues.append(issue)
+        issue.compact()
+    return out_of_sync_issues, missing_issues
@@ -0,0 +1,302 @@
+"""
+Spool of rendered reports, mailed by a background worker or `jibe deliver`.
+
+Reports are delivered at most once, like the reports of jibe.checkpoint: a
+report is marked as sending before it is handed to the mail server. If
+sending fails the mark is removed and the report is retried, if the process
+dies while sending it the report stays in the spool with its mark and is
+never sent again on its own (remove the mark to send it).
+"""
+# Built In Modules
+import hashlib
+import heapq
+import io
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+try:
+    import queue  # py3
+except ImportError:
+    import Queue as queue  # py2
+
+# Local Modules
+import jibe.mailer as m
+import jibe.metrics as metrics
+
+# Global Variables
+log = logging.getLogger(__name__)
+# Delivery attempts before a report is moved to the 'failed' directory
+MAX_ATTEMPTS = 5
+# Seconds to wait before the first retry, doubled on every attempt
+BACKOFF = 30
+# Seconds a run waits for retries before leaving them to `jibe deliver`
+DRAIN_TIMEOUT = 300
+
+
+def report_key(recipients, subject, date=None):
+    """
+    Idempotency key of a report. The same report (subject, recipients
+    and day) always gets the same key so it is never sent twice: a
+    second run on the same day does not send its report, unless it is
+    spooled with rerun (see spool_report)
+    Args:
+        recipients ([str]): Recipients of the report
+        subject (str): Subject of the email
+        date (str): Day of the report, defaults to today
+    Returns:
+        key (str): Idempotency key
+    """
+    if not date:
+        date = datetime.now().strftime('%Y-%m-%d')
+    data = u'\n'.join([date, subject] + sorted(recipients))
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()[:32]
+
+
+def _path(spool_dir, state, key, ext):
+    return os.path.join(spool_dir, state, key + ext)
+
+
+def _write_meta(path, meta):
+    # Write to a temporary file first so a crash never leaves half a file
+    tmp = path + '.tmp'
+    with io.open(tmp, 'w', encoding='utf-8') as fp:
+        fp.write(json.dumps(meta, sort_keys=True))
+    os.rename(tmp, path)
+
+
+def _read_meta(path):
+    with io.open(path, encoding='utf-8') as fp:
+        return json.loads(fp.read())
+
+
+def _makedirs(spool_dir):
+    for state in ('pending', 'sent', 'failed'):
+        path = os.path.join(spool_dir, state)
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+
+def spool_report(spool_dir, recipients, subject, render, date=None,
+                 group=None, mail=None, rerun=False):
+    """
+    Renders a report into the spool directory
+    Args:
+        spool_dir (str): Spool directory
+        recipients ([str]): Recipients of the report
+        subject (str): Subject of the email
+        render (function): Called with an open file object, streams the
+                           report into it and returns its size
+        date (str): Day of the report, defaults to today
+        group (str): Group of the report, for the metrics
+        mail (dict): Extra jibe.mailer.send arguments
+        rerun (bool): Spool it under a new key if the report of the day
+                      was already spooled or sent
+    Returns:
+        key (str): Idempotency key of the report
+        size (int): Size of the rendered report, None if the report was
+                    already spooled or sent
+    """
+    _makedirs(spool_dir)
+    key = report_key(recipients, subject, date)
+    if os.path.exists(_path(spool_dir, 'sent', key, '.json')) or \
+            os.path.exists(_path(spool_dir, 'pending', key, '.json')):
+        if not rerun:
+            log.info('   Report %s (%s) was already spooled today, not sending it again '
+                     '(use --rerun to send it)' % (key, subject))
+            return key, None
+        # The time makes it a report of its own, the earlier one is left alone
+        key = report_key(recipients, subject, datetime.now().isoformat())
+
+    html_path = _path(spool_dir, 'pending', key, '.html')
+    with io.open(html_path + '.tmp', 'w', encoding='utf-8') as output:
+        size = render(output)
+    os.rename(html_path + '.tmp', html_path)
+    # The metadata file marks the report as ready to be delivered
+    _write_meta(_path(spool_dir, 'pending', key, '.json'),
+                {'recipients': recipients, 'subject': subject, 'group': group,
+                 'mail': mail or {}, 'attempts': 0, 'next_attempt': 0,
+                 'created': time.time()})
+    return key, size
+
+
+def deliver_one(spool_dir, key):
+    """
+    Tries to deliver one spooled report
+    Args:
+        spool_dir (str): Spool directory
+        key (str): Idempotency key of the report
+    Returns:
+        next_attempt (float): Time of the next attempt if delivery failed
+                              and should be retried, else None
+    """
+    meta_path = _path(spool_dir, 'pending', key, '.json')
+    html_path = _path(spool_dir, 'pending', key, '.html')
+    sending_path = _path(spool_dir, 'pending', key, '.sending')
+    sent_path = _path(spool_dir, 'sent', key, '.json')
+    if not os.path.exists(meta_path):
+        return None
+    meta = _read_meta(meta_path)
+    if not os.path.exists(sent_path):
+        if os.path.exists(sending_path):
+            # A process died while sending it, it may or may not have gone out
+            log.error('   Report %s (%s) may have been sent already, not sending it again '
+                      '(remove %s to send it)' % (key, meta['subject'], sending_path))
+            return None
+        with io.open(html_path, encoding='utf-8') as fp:
+            html = fp.read()
+        # Marked before it is sent so it is never sent twice
+        with io.open(sending_path, 'w', encoding='utf-8') as fp:
+            fp.write(u'')
+        try:
+            size = m.send(meta['recipients'], meta['subject'], html, **meta.get('mail', {}))
+        except Exception as error:
+            os.remove(sending_path)
+            meta['attempts'] += 1
+            if meta['attempts'] >= MAX_ATTEMPTS:
+                log.error('   Giving up on report %s (%s): %s' % (key, meta['subject'], error))
+                os.rename(html_path, _path(spool_dir, 'failed', key, '.html'))
+                _write_meta(_path(spool_dir, 'failed', key, '.json'), meta)
+                os.remove(meta_path)
+                return None
+            meta['next_attempt'] = time.time() + BACKOFF * 2 ** (meta['attempts'] - 1)
+            metrics.retry('smtp')
+            log.warning('   Could not send report %s (%s), attempt %i: %s' %
+                        (key, meta['subject'], meta['attempts'], error))
+            _write_meta(meta_path, meta)
+            return meta['next_attempt']
+        meta['sent'] = time.time()
+        metrics.email(meta.get('group'), size)
+        _write_meta(sent_path, meta)
+        log.info('   Delivered report %s (%s)' % (key, meta['subject']))
+    for path in (sending_path, meta_path, html_path):
+        if os.path.exists(path):
+            os.remove(path)
+    return None
+
+
+def delivered(spool_dir, key):
+    """
+    Args:
+        spool_dir (str): Spool directory
+        key (str): Idempotency key of the report
+    Returns:
+        delivered (bool): True if the report was delivered
+    """
+    return os.path.exists(_path(spool_dir, 'sent', key, '.json'))
+
+
+def pending_reports(spool_dir):
+    """
+    Lists the reports waiting to be delivered
+    Args:
+        spool_dir (str): Spool directory
+    Returns:
+        keys ([str]): Idempotency keys, oldest first
+    """
+    pending_dir = os.path.join(spool_dir, 'pending')
+    if not os.path.isdir(pending_dir):
+        return []
+    metas = []
+    for name in os.listdir(pending_dir):
+        if name.endswith('.json'):
+            key = name[:-len('.json')]
+            metas.append((_read_meta(os.path.join(pending_dir, name))['created'], key))
+    return [key for _, key in sorted(metas)]
+
+
+def deliver(spool_dir, force=False):
+    """
+    Delivers every pending report that is due (used by `jibe deliver`)
+    Args:
+        spool_dir (str): Spool directory
+        force (bool): Also try reports that are still backing off
+    Returns:
+        remaining (int): Number of reports still pending
+    """
+    remaining = 0
+    try:
+        for key in pending_reports(spool_dir):
+            meta = _read_meta(_path(spool_dir, 'pending', key, '.json'))
+            if not force and meta['next_attempt'] > time.time():
+                remaining += 1
+                continue
+            if deliver_one(spool_dir, key):
+                remaining += 1
+    finally:
+        m.close()
+    return remaining
+
+
+class DeliveryWorker(threading.Thread):
+    """
+    Background thread delivering spooled reports while the next groups
+    are being processed. Failed deliveries are retried with backoff.
+    on_delivered is called with the key of every report once it is
+    delivered.
+    """
+    def __init__(self, spool_dir, on_delivered=None):
+        super(DeliveryWorker, self).__init__(name='jibe-delivery')
+        self.daemon = True
+        self.spool_dir = spool_dir
+        self.on_delivered = on_delivered
+        self._queue = queue.Queue()
+        self._retries = []
+        self._deadline = None
+
+    def put(self, key):
+        """ Queues a spooled report for delivery """
+        self._queue.put(key)
+
+    def close(self, timeout=None):
+        """
+        Stops accepting reports and waits for the queued ones. Retries
+        that are not due before the timeout are left in the spool for
+        `jibe deliver`
+        """
+        if timeout is not None:
+            self._deadline = time.time() + timeout
+        self._queue.put(None)
+        self.join()
+
+    def run(self):
+        closing = False
+        while not (closing and not self._retries):
+            timeout = None
+            if self._retries:
+                timeout = max(self._retries[0][0] - time.time(), 0)
+            if closing:
+                if self._deadline is not None and \
+                        self._retries[0][0] > self._deadline:
+                    log.warning('   %i report(s) left in spool %s' %
+                                (len(self._retries), self.spool_dir))
+                    break
+                time.sleep(timeout)
+            else:
+                try:
+                    key = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    # A retry is due
+                    pass
+                else:
+                    if key is None:
+                        closing = True
+                    else:
+                        self._deliver(key)
+                    continue
+            _, key = heapq.heappop(self._retries)
+            self._deliver(key)
+        m.close()
+
+    def _deliver(self, key):
+        try:
+            next_attempt = deliver_one(self.spool_dir, key)
+        except Exception:
+            log.exception('   Could not deliver report %s' % key)
+            return
+        if next_attempt:
+            heapq.heappush(self._retries, (next_attempt, key))
+        elif self.on_delivered and delivered(self.spool_dir, key):
+            self.on_delivered(key)
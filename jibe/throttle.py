@@ -0,0 +1,200 @@
+# Built In Modules
+import logging
+import threading
+import time
+try:
+    from urllib.parse import urlsplit  # py3
+except ImportError:
+    from urlparse import urlsplit  # py2
+
+# 3rd Party Modules
+import requests
+import requests.adapters
+
+# Local Modules
+from jibe import metrics
+
+# Global Variables
+log = logging.getLogger(__name__)
+# Statuses that mean the host wants fewer requests
+OVERLOADED = (429, 503)
+# A request this many times slower than the usual latency of its host
+# (and slower than SPIKE_MIN_SECONDS) is a latency spike
+SPIKE_FACTOR = 3.0
+SPIKE_MIN_SECONDS = 1.0
+# Weight of the latest request in the usual latency of a host
+EWMA_WEIGHT = 0.2
+# Consecutive failures (connection errors, 5xx) that open the circuit of
+# a host, and seconds it stays open before a trial request is let through
+FAILURES = 5
+COOLDOWN = 30.0
+# Set up by enable()
+_limit = None
+_original_send = None
+_hosts = {}
+_lock = threading.Lock()
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """
+    Raised instead of sending a request to a host that kept failing.
+    Not a ConnectionError, so the jira client does not sleep and retry it.
+    """
+
+
+class HostLimiter(object):
+    """
+    AIMD concurrency limit and circuit breaker of one host:
+        * the limit grows by one for every limit requests that come back
+          healthy, up to the ceiling
+        * it is halved (down to 1) on 429/503, connection errors and
+          latency spikes
+        * after FAILURES failures in a row every request fails at once
+          for COOLDOWN seconds, then a single trial request decides
+          whether the circuit closes again
+    """
+    def __init__(self, host, ceiling, failures=FAILURES, cooldown=COOLDOWN):
+        """
+        Args:
+            host (str): Host the limit applies to, for the logs
+            ceiling (int): Most requests in flight at once
+            failures (int): Consecutive failures that open the circuit
+            cooldown (float): Seconds the circuit stays open
+        """
+        self.host = host
+        self.ceiling = max(1, ceiling)
+        # Start in the middle and let healthy responses open it up
+        self.limit = max(1.0, self.ceiling / 2.0)
+        self.failures = failures
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.latency = None
+        self.failed = 0
+        self.opened_at = None
+        self.trial = False
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """
+        Waits for a free slot
+        Args:
+        Returns:
+            Nothing
+        Raises:
+            CircuitOpenError: The circuit of the host is open
+        """
+        with self._condition:
+            while True:
+                if self.opened_at is not None:
+                    if self.trial or time.time() - self.opened_at < self.cooldown:
+                        metrics.increment('circuit_rejected')
+                        raise CircuitOpenError('Circuit of %s is open after %i failure(s)'
+                                               % (self.host, self.failed))
+                    # Half open, this request decides
+                    self.trial = True
+                    break
+                if self.in_flight < int(self.limit):
+                    break
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self, seconds, status=None):
+        """
+        Frees the slot of a finished request and adapts the limit
+        Args:
+            seconds (float): Latency of the request
+            status (int): HTTP status, None when no response came back
+        Returns:
+            Nothing
+        """
+        with self._condition:
+            self.in_flight -= 1
+            spike = self.latency is not None and seconds > SPIKE_MIN_SECONDS and \
+                seconds > SPIKE_FACTOR * self.latency
+            if status is not None:
+                self.latency = seconds if self.latency is None else \
+                    EWMA_WEIGHT * seconds + (1 - EWMA_WEIGHT) * self.latency
+
+            if status is None or status >= 500:
+                self.failed += 1
+            else:
+                self.failed = 0
+            if self.trial:
+                self.trial = False
+                self.opened_at = time.time() if self.failed else None
+                if not self.failed:
+                    log.info('   Circuit of %s closed again', self.host)
+            elif self.failed >= self.failures and self.opened_at is None:
+                log.warning('   %i failure(s) in a row from %s, failing its requests for %is',
+                            self.failed, self.host, self.cooldown)
+                metrics.increment('circuit_opened')
+                self.opened_at = time.time()
+
+            if status is None or status in OVERLOADED or spike:
+                self.limit = max(1.0, self.limit / 2)
+                metrics.increment('throttle_backoffs')
+            elif self.limit < self.ceiling:
+                self.limit = min(self.ceiling, self.limit + 1 / self.limit)
+            # Wake the waiters, a slot is free (or the circuit opened)
+            self._condition.notify_all()
+
+
+def enable(ceiling, failures=FAILURES, cooldown=COOLDOWN):
+    """
+    Puts every HTTP request made through requests (and so PyGithub, the
+    jira client and pagure) behind the limiter of its host
+    Args:
+        ceiling (int): Most requests in flight at once per host
+        failures (int): Consecutive failures that open the circuit of a host
+        cooldown (float): Seconds the circuit of a host stays open
+    Returns:
+        Nothing
+    """
+    global _limit, _original_send
+    if _limit:
+        raise RuntimeError('Already throttling HTTP requests')
+    _limit = (ceiling, failures, cooldown)
+    _hosts.clear()
+    _original_send = requests.adapters.HTTPAdapter.send
+    requests.adapters.HTTPAdapter.send = _send
+
+
+def disable():
+    """
+    Sends the HTTP requests straight away again
+    Args:
+    Returns:
+        Nothing
+    """
+    global _limit
+    if not _limit:
+        return
+    requests.adapters.HTTPAdapter.send = _original_send
+    _limit = None
+    _hosts.clear()
+
+
+def limiter(host):
+    """
+    Args:
+        host (str): Host (and port) of a request
+    Returns:
+        limiter (HostLimiter): Limiter of the host
+    """
+    with _lock:
+        if host not in _hosts:
+            _hosts[host] = HostLimiter(host, *_limit)
+        return _hosts[host]
+
+
+def _send(adapter, request, **kwargs):
+    host_limiter = limiter(urlsplit(request.url).netloc)
+    host_limiter.acquire()
+    start = time.time()
+    status = None
+    try:
+        response = _original_send(adapter, request, **kwargs)
+        status = response.status_code
+        return response
+    finally:
+        host_limiter.release(time.time() - start, status)
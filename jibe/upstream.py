@@ -1,5 +1,6 @@
 # Built In Modules
 import logging
+import threading
 try:
     from urllib.parse import urlencode  # py3
 except ImportError:
@@ -11,12 +12,34 @@ from github import Github
 
 # Local Modules
 import jibe.intermediary as i
+import jibe.metrics as metrics
+from jibe.singleflight import Group
 
 # Global Variables
 log = logging.getLogger(__name__)
+# HTTP sessions are reused per thread (see get_session)
+_sessions = threading.local()
+# Concurrent groups looking up the same GitHub data share one request
+_github_data = {'github.issues': Group('github.issues'),
+                'github.comments': Group('github.comments')}
+_user_names = Group('github.users')
 
 
-def get_upstream_issues(config, group):
+def get_session():
+    """
+    Returns the HTTP session of this thread so connections to the
+    upstream APIs are pooled
+    Args:
+    Returns:
+        session (requests.Session): HTTP session
+    """
+    session = getattr(_sessions, 'session', None)
+    if session is None:
+        session = _sessions.session = requests.Session()
+    return session
+
+
+def get_upstream_issues(config, group, repos=None):
     """
     Gets all upstream issues in question
     Args:
@@ -24,6 +47,9 @@ def get_upstream_issues(config, group):
                         later in the program
          group (str): Group in config file we should
                       look at
+         repos (set): Only get the issues of these (source, repo)
+                      tuples (i.e. the repos of one shard), all repos
+                      of the group by default
     Returns:
         Issues list(jibe.intermediary.Issues): List of issues
                                                that need to be
@@ -37,11 +63,15 @@ def get_upstream_issues(config, group):
     pagure_repo_names = config['jibe']['send-to'][group]['upstream']['pagure']\
         .keys()
     for repo in github_repo_names:
+        if repos is not None and ('github', repo) not in repos:
+            continue
         # Loop through all repos and get issue data
         for issue in github_issues(repo, config, group):
             all_issues.append(issue)
     log.info('   Done grabbing all Github issues ')
     for repo in pagure_repo_names:
+        if repos is not None and ('pagure', repo) not in repos:
+            continue
         # Loop through all repos and get issue data
         for issue in pagure_issues(repo, config, group):
             all_issues.append(issue)
@@ -69,7 +99,8 @@ def pagure_issues(upstream, config, group):
         .get('pagure', {}) \
         .get(upstream, {})
 
-    response = requests.get(url, params=params)
+    with metrics.request('pagure.issues'):
+        response = get_session().get(url, params=params)
     if not bool(response):
         try:
             reason = response.json()
@@ -116,7 +147,8 @@ def github_issues(upstream, config, group):
         .get('github', {})\
         .get(upstream, {})
 
-    url = 'https://api.github.com/repos/%s/issues' % upstream
+    base = config['jibe'].get('github_url', 'https://api.github.com')
+    url = base + '/repos/%s/issues' % upstream
     if _filter:
         url += '?' + urlencode(_filter)
 
@@ -125,62 +157,13 @@ def github_issues(upstream, config, group):
     # Initialize Github object so we can get their full
     # name (instead of their username)
     # And get comments if needed
-    github_client = Github(config['jibe']['github_token'])
+    github_client = Github(config['jibe']['github_token'], base_url=base,
+                           **config['jibe'].get('github_options', {}))
 
     # We need to format everything to a standard to we can
     # create an issue object
-    final_issues = []
-    for issue in issues:
-        # Update comments:
-        # If there are no comments just make an empty array
-        if issue['comments'] == 0:
-            issue['comments'] = []
-        else:
-            # We have multiple comments and need to make api call to get them
-            repo = github_client.get_repo(upstream)
-            comments = []
-            github_issue = repo.get_issue(number=issue['number'])
-            for comment in github_issue.get_comments():
-                # First make API call to get the users name
-                comments.append({
-                    'author': comment.user.name,
-                    'name': comment.user.login,
-                    'body': comment.body,
-                    'id': comment.id,
-                    'date_created': comment.created_at,
-                    'changed': None
-                })
-            # Assign the message with the newly formatted comments :)
-            issue['comments'] = comments
-
-        # Update reporter:
-        # Search for the user
-        reporter = github_client.get_user(issue['user']['login'])
-        # Update the reporter field in the message (to match Pagure format)
-        issue['user']['fullname'] = reporter.name
-
-        # Update assignee(s):
-        assignees = []
-        for person in issue['assignees']:
-            assignee = github_client.get_user(person['login'])
-            assignees.append({'fullname': assignee.name})
-        # Update the assignee field in the message (to match Pagure format)
-        issue['assignees'] = assignees
-
-        # Update label(s):
-        if issue['labels']:
-            # loop through all the labels on Github and add them
-            # to the new label list and then reassign the message
-            new_label = []
-            for label in issue['labels']:
-                new_label.append(label['name'])
-            issue['labels'] = new_label
-
-        # Update milestone:
-        if issue['milestone']:
-            issue['milestone'] = issue['milestone']['title']
-
-        final_issues.append(issue)
+    final_issues = [_format_github_issue(issue, github_client, upstream, base)
+                    for issue in issues]
 
     final_issues = list((
         i.Issue.from_github(
@@ -192,13 +175,126 @@ def github_issues(upstream, config, group):
         yield issue
 
 
+def _format_github_issue(issue, github_client, upstream, github_url):
+    """
+    Formats a GitHub API issue to the Pagure format Issue.from_github
+    expects: comments, reporter and assignee names are looked up
+    Args:
+        issue (dict): GitHub API issue
+        github_client (github.Github): PyGithub client
+        upstream (str): Upstream repo name
+        github_url (str): GitHub API the client talks to
+    Returns:
+        issue (dict): The formatted issue
+    """
+    # Update comments:
+    # If there are no comments just make an empty array
+    if issue['comments'] == 0:
+        issue['comments'] = []
+    else:
+        # We have multiple comments and need to make api call to get them
+        with metrics.request('github.repos'):
+            repo = github_client.get_repo(upstream)
+        comments = []
+        with metrics.request('github.issues'):
+            github_issue = repo.get_issue(number=issue['number'])
+        with metrics.request('github.comments'):
+            github_comments = list(github_issue.get_comments())
+        for comment in github_comments:
+            # First make API call to get the users name
+            author = _user_name(github_client, github_url, comment.user.login, comment.user)
+            comments.append({
+                'author': author,
+                'name': comment.user.login,
+                'body': comment.body,
+                'id': comment.id,
+                'date_created': comment.created_at,
+                'changed': None
+            })
+        # Assign the message with the newly formatted comments :)
+        issue['comments'] = comments
+
+    # Update reporter:
+    # Search for the user
+    reporter = _user_name(github_client, github_url, issue['user']['login'])
+    # Update the reporter field in the message (to match Pagure format)
+    issue['user']['fullname'] = reporter
+
+    # Update assignee(s):
+    assignees = []
+    for person in issue['assignees']:
+        assignees.append({'fullname': _user_name(github_client, github_url, person['login'])})
+    # Update the assignee field in the message (to match Pagure format)
+    issue['assignees'] = assignees
+
+    # Update label(s):
+    if issue['labels']:
+        # loop through all the labels on Github and add them
+        # to the new label list and then reassign the message
+        new_label = []
+        for label in issue['labels']:
+            new_label.append(label['name'])
+        issue['labels'] = new_label
+
+    # Update milestone:
+    if issue['milestone']:
+        issue['milestone'] = issue['milestone']['title']
+
+    return issue
+
+
+def _user_name(github_client, github_url, login, user=None):
+    """
+    Looks up the full name of a GitHub user, concurrent lookups of the
+    same login on the same GitHub share one request
+    Args:
+        github_client (github.Github): PyGithub client
+        github_url (str): GitHub API the client talks to
+        login (str): Login of the user
+        user (github.NamedUser.NamedUser): Not yet loaded user to
+                                           complete instead of getting it
+    Returns:
+        name (str): Full name of the user
+    """
+    return _user_names.do((github_url, login), _fetch_user_name, github_client, login, user)
+
+
+def _fetch_user_name(github_client, login, user):
+    with metrics.request('github.users'):
+        if user is None:
+            user = github_client.get_user(login)
+        return user.name
+
+
+def get_github_issue(upstream, number, config):
+    """
+    Gets a single GitHub issue, formatted like the issues of
+    github_issues (i.e. after a webhook told us it changed)
+    Args:
+        upstream (str): Upstream repo name
+        number (int): Issue number
+        config (dict): Config dict
+    Returns:
+        issue (dict): Formatted issue for Issue.from_github
+    """
+    token = config['jibe'].get('github_token')
+    headers = {'Authorization': 'token ' + token} if token else {}
+    base = config['jibe'].get('github_url', 'https://api.github.com')
+    response = _fetch_github_data(base + '/repos/%s/issues/%i' % (upstream, number),
+                                  headers)
+    github_client = Github(token, base_url=base,
+                           **config['jibe'].get('github_options', {}))
+    return _format_github_issue(response.json(), github_client, upstream, base)
+
+
 def _get_all_github_issues(url, headers):
     """ Pagination utility.  Obnoxious. """
     link = dict(next=url)
     while 'next' in link:
         response = _fetch_github_data(link['next'], headers)
         for issue in response.json():
-            comments = _fetch_github_data(issue['comments_url'], headers)
+            comments = _fetch_github_data(issue['comments_url'], headers,
+                                          family='github.comments')
             issue['comments'] = comments.json()
             yield issue
         link = _github_link_field_to_dict(response.headers.get('link', None))
@@ -219,8 +315,14 @@ def _github_link_field_to_dict(field):
     ])
 
 
-def _fetch_github_data(url, headers):
-    response = requests.get(url, headers=headers)
+def _fetch_github_data(url, headers, family='github.issues'):
+    return _github_data[family].do((url, headers.get('Authorization')),
+                                   _get_github_data, url, headers, family)
+
+
+def _get_github_data(url, headers, family):
+    with metrics.request(family):
+        response = get_session().get(url, headers=headers)
     if not bool(response):
         try:
             reason = response.json()
@@ -0,0 +1,345 @@
+# Built In Modules
+import copy
+import hashlib
+import hmac
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+
+# Local Modules
+import jibe.downstream as d
+import jibe.intermediary as i
+import jibe.metrics as metrics
+import jibe.snapshot as snapshot
+import jibe.upstream as u
+
+# Global Variables
+log = logging.getLogger(__name__)
+# GitHub actions after which an issue is no longer in its repo
+GITHUB_REMOVED = ('deleted', 'transferred')
+# Pagure topics after which an issue is no longer in its repo
+PAGURE_REMOVED = ('issue.drop',)
+
+
+class SignatureError(Exception):
+    """ The signature of a webhook is missing or wrong """
+
+
+class IssueStore(object):
+    """
+    Cached state of every group: one snapshot record (see
+    jibe.snapshot.issue_record) per upstream issue, keyed by its URL.
+    Filled by a full fetch and kept current by webhooks.
+
+    Only used from the thread of the daemon, so it is not locked.
+    """
+    def __init__(self):
+        # group -> {'records', 'created', 'joke', 'dirty'}
+        self.groups = {}
+
+    def fresh(self, group, max_age):
+        """
+        Args:
+            group (str): Group in config file
+            max_age (float): Seconds after which a full fetch is due
+        Returns:
+            fresh (bool): True if the group was fetched less than
+                          max_age seconds ago
+        """
+        state = self.groups.get(group)
+        return bool(state) and time.time() - state['created'] < max_age
+
+    def load(self, group, pairs, joke='', created=None):
+        """
+        Replaces the state of a group with a full fetch
+        Args:
+            group (str): Group in config file
+            pairs (iterable): (issue, downstream record or None) tuples
+            joke (str): Joke of the report
+            created (float): When the data was fetched, defaults to now
+        Returns:
+            Nothing
+        """
+        records = OrderedDict()
+        for issue, downstream in pairs:
+            records[issue.url] = snapshot.issue_record(issue, downstream)
+        self.groups[group] = {'records': records, 'created': created or time.time(),
+                              'joke': joke, 'dirty': True}
+
+    def load_snapshot(self, path):
+        """
+        Fills the state of a group from its snapshot (i.e. one written by
+        'jibe fetch' or by an earlier 'jibe serve')
+        Args:
+            path (str): Snapshot file
+        Returns:
+            group (str): Group of the snapshot
+        """
+        header, records = snapshot.read_snapshot(path)
+        state = {'records': OrderedDict(), 'created': header['created'],
+                 'joke': header['joke'], 'dirty': False}
+        for record in records:
+            state['records'][record['issue']['url']] = record
+        self.groups[header['group']] = state
+        return header['group']
+
+    def save(self, path, group):
+        """
+        Writes the state of a group as its snapshot, if it changed
+        Args:
+            path (str): Snapshot file
+            group (str): Group in config file
+        Returns:
+            Nothing
+        """
+        state = self.groups[group]
+        if state['dirty']:
+            snapshot.write_records(path, group, state['records'].values(),
+                                   state['joke'], state['created'])
+            state['dirty'] = False
+
+    def records(self, group):
+        return list(self.groups[group]['records'].values())
+
+    def joke(self, group):
+        return self.groups[group]['joke']
+
+    def put(self, group, issue, downstream):
+        state = self.groups[group]
+        state['records'][issue.url] = snapshot.issue_record(issue, downstream)
+        state['dirty'] = True
+
+    def remove(self, group, url):
+        state = self.groups[group]
+        if state['records'].pop(url, None) is not None:
+            state['dirty'] = True
+
+    def find(self, urls=(), key=None):
+        """
+        Finds the records of upstream URLs or of a JIRA issue
+        Args:
+            urls ([str]): Upstream issue URLs
+            key (str): JIRA issue key
+        Returns:
+            found ([(str, dict)]): (group, record) tuples
+        """
+        found = []
+        for group, state in self.groups.items():
+            for url, record in state['records'].items():
+                downstream = record['downstream']
+                if url in urls or (key and downstream and downstream['key'] == key):
+                    found.append((group, record))
+        return found
+
+
+def secret(config, source, name=None):
+    """
+    Webhook secret of a source, from the 'webhooks' section of the config.
+    A source either has one secret or one per repo (Pagure) or JIRA
+    instance
+    Args:
+        config (dict): Config dict
+        source (str): github, pagure or jira
+        name (str): Repo or JIRA instance
+    Returns:
+        secret (str): The secret, None if there is none
+    """
+    secrets = config['jibe'].get('webhooks', {}).get(source)
+    if isinstance(secrets, dict):
+        return secrets.get(name)
+    return secrets
+
+
+def verify_signature(secret, body, signature):
+    """
+    Checks the HMAC-SHA256 signature of a webhook
+    Args:
+        secret (str): Shared secret
+        body (bytes): Raw request body
+        signature (str): Hex digest, with or without 'sha256=' prefix
+    Returns:
+        Nothing, raises SignatureError if the signature does not match
+    """
+    if not secret or not signature:
+        raise SignatureError('Missing webhook secret or signature')
+    if signature.startswith('sha256='):
+        signature = signature[len('sha256='):]
+    expected = hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+    if not hmac.compare_digest(expected, signature.lower()):
+        raise SignatureError('Webhook signature does not match')
+
+
+def parse_event(source, headers, body, config, name=None):
+    """
+    Verifies and parses a webhook:
+        * GitHub 'issues' and 'issue_comment' events
+          (X-Hub-Signature-256)
+        * Pagure 'issue.*' topics (X-Pagure-Signature-256, keyed per repo)
+        * JIRA issue, comment and remote link events (X-Hub-Signature)
+    Args:
+        source (str): github, pagure or jira
+        headers (dict): Request headers
+        body (bytes): Raw request body
+        config (dict): Config dict
+        name (str): JIRA instance the webhook comes from
+    Returns:
+        event (dict): The event, None if it does not concern Jibe
+    """
+    if source == 'github':
+        verify_signature(secret(config, 'github'), body,
+                         headers.get('X-Hub-Signature-256'))
+        payload = json.loads(body.decode('utf-8'))
+        if headers.get('X-GitHub-Event') not in ('issues', 'issue_comment'):
+            return None
+        issue = payload['issue']
+        if 'pull_request' in issue:
+            # We don't want to copy these around
+            return None
+        return {'source': 'github', 'repo': payload['repository']['full_name'],
+                'number': issue['number'], 'url': issue['html_url'],
+                'removed': headers['X-GitHub-Event'] == 'issues' and
+                payload.get('action') in GITHUB_REMOVED}
+
+    if source == 'pagure':
+        payload = json.loads(body.decode('utf-8'))
+        topic = payload.get('topic') or headers.get('X-Pagure-Topic', '')
+        msg = payload.get('msg', {})
+        repo = msg.get('project', {}).get('fullname')
+        # The key of a Pagure webhook is per project, so only trust the
+        # payload once the signature matched the key of its project
+        verify_signature(secret(config, 'pagure', repo), body,
+                         headers.get('X-Pagure-Signature-256'))
+        if not topic.startswith('issue.') or 'issue' not in msg:
+            return None
+        base = config['jibe'].get('pagure_url', 'https://pagure.io')
+        return {'source': 'pagure', 'repo': repo, 'issue': msg['issue'],
+                'url': base + '/%s/issue/%i' % (repo, msg['issue']['id']),
+                'removed': topic in PAGURE_REMOVED}
+
+    if source == 'jira':
+        name = name or config['jibe'].get('default_jira_instance')
+        verify_signature(secret(config, 'jira', name), body,
+                         headers.get('X-Hub-Signature'))
+        payload = json.loads(body.decode('utf-8'))
+        kind = payload.get('webhookEvent', '')
+        if not (kind.startswith('jira:issue_') or kind.startswith('comment_') or
+                'remote' in kind):
+            return None
+        link = payload.get('remoteIssueLink') or payload.get('remoteLink') or {}
+        url = link.get('object', {}).get('url') or link.get('url')
+        return {'source': 'jira', 'jira_instance': name,
+                'key': payload.get('issue', {}).get('key'),
+                'urls': [url] if url else [],
+                'remote_link': 'remote' in kind}
+    raise ValueError('Unknown webhook source %s' % source)
+
+
+def _groups_of(config, source, repo):
+    return [group for group, settings in config['jibe']['send-to'].items()
+            if repo in settings['upstream'].get(source, {})]
+
+
+def _listed(config, source, repo, state):
+    """ Would a full fetch (with the filters of the repo) list the issue? """
+    _filter = config['jibe'].get('filters', {}).get(source, {}).get(repo, {})
+    if source == 'github':
+        return _filter.get('state', 'open') in (state, 'all')
+    return _filter.get('status', 'Open') in (state, 'all')
+
+
+def _refetch_downstream(store, group, issue, config):
+    for issue, downstream in snapshot.fetch_downstream([issue], config):
+        store.put(group, issue, downstream)
+
+
+def apply_event(store, event, config):
+    """
+    Updates the cached state of the issue pairs a webhook concerns. Only
+    those pairs are fetched again
+    Args:
+        store (IssueStore): Cached state
+        event (dict): Event from parse_event
+        config (dict): Config dict
+    Returns:
+        groups ([str]): Groups whose state changed
+    """
+    metrics.increment('webhooks_' + event['source'])
+    if event['source'] == 'jira':
+        return _apply_jira_event(store, event, config)
+
+    source, repo = event['source'], event['repo']
+    # Groups that were never fetched get the issue with their next full fetch
+    groups = [group for group in _groups_of(config, source, repo)
+              if group in store.groups]
+    if not groups:
+        return []
+    data = None
+    if not event['removed']:
+        if source == 'github':
+            data = u.get_github_issue(repo, event['number'], config)
+            listed = _listed(config, source, repo, data['state'])
+        else:
+            data = event['issue']
+            listed = _listed(config, source, repo, data['status'])
+        if not listed:
+            data = None
+    for group in groups:
+        if data is None:
+            store.remove(group, event['url'])
+            continue
+        # Issue.from_* format their input in place
+        issue_data = copy.deepcopy(data)
+        if source == 'github':
+            issue = i.Issue.from_github(repo, issue_data, config, group)
+        else:
+            # Like pagure_issues does, JIRA supports one assignee
+            issue_data['assignee'] = [issue_data['assignee']]
+            issue = i.Issue.from_pagure(repo, issue_data, config, group)
+        _refetch_downstream(store, group, issue, config)
+    log.info('   Updated %s for %s', event['url'], ', '.join(groups))
+    return groups
+
+
+def _apply_jira_event(store, event, config):
+    urls = list(event['urls'])
+    if event['remote_link'] and not urls and event['key']:
+        # A new link can pair a missing issue, find out what it links to
+        client = d.get_jira_instance_client(event['jira_instance'], config)
+        with metrics.request('jira.remote_link'):
+            links = client.remote_links(event['key'])
+        urls = [link.object.url for link in links]
+    groups = []
+    for group, record in store.find(urls, event['key']):
+        try:
+            issue = i.Issue(config=config, group=group, **record['issue'])
+        except KeyError:
+            # The repo was removed from the config
+            continue
+        _refetch_downstream(store, group, issue, config)
+        if group not in groups:
+            groups.append(group)
+    log.info('   Updated %s for %s', event['key'] or ', '.join(urls),
+             ', '.join(groups) or 'no group')
+    return groups
+
+
+def load_snapshots(store, snapshot_dir, config):
+    """
+    Fills the store from the snapshots of the configured groups
+    Args:
+        store (IssueStore): Cached state
+        snapshot_dir (str): Snapshot directory
+        config (dict): Config dict
+    Returns:
+        Nothing
+    """
+    for group in config['jibe']['send-to']:
+        path = snapshot.snapshot_path(snapshot_dir, group)
+        if not os.path.exists(path):
+            continue
+        try:
+            store.load_snapshot(path)
+        except ValueError:
+            log.warning('   Ignoring %s, it is not a current snapshot', path)
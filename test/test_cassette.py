@@ -0,0 +1,126 @@
+# Built In Modules
+import mock
+import os
+import shutil
+import tempfile
+import unittest
+try:
+    # Python 3.3 >
+    from unittest.mock import MagicMock  # noqa: F401
+except ImportError:
+    from mock import MagicMock  # noqa: F401
+
+# 3rd Party Modules
+import requests
+
+# Local Modules
+import jibe.cassette as c
+
+# Global Variables
+SEND = 'requests.adapters.HTTPAdapter.send'
+
+
+class TestCassette(unittest.TestCase):
+    """
+    This class tests the cassette.py file under jibe
+    """
+    def setUp(self):
+        self.cassette_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        c.stop()
+        shutil.rmtree(self.cassette_dir)
+
+    def _response(self, request, text, status=200):
+        response = requests.Response()
+        response.status_code = status
+        response.reason = 'OK'
+        response.headers['Content-Type'] = 'application/json'
+        response.headers['Link'] = '<mock_next>; rel="next"'
+        response.headers['Set-Cookie'] = 'mock_cookie'
+        response._content = text.encode('utf-8')
+        response.url = request.url
+        response.request = request
+        return response
+
+    def test_request_key(self):
+        """
+        Tests 'request_key' function ignores the order of query parameters
+        """
+        # Call the function
+        first = c.request_key('get', 'https://mock/path?b=2&a=1')
+        second = c.request_key('GET', 'https://mock/path?a=1&b=2')
+
+        # Assert everything was called correctly
+        self.assertEqual(first, second)
+        self.assertEqual(first, 'GET https://mock/path?a=1&b=2')
+        self.assertNotEqual(c.request_key('POST', 'https://mock/path', b'{"a": 1}'),
+                            c.request_key('POST', 'https://mock/path', b'{"a": 2}'))
+
+    def test_record_replay(self):
+        """
+        Tests recording a run and replaying it without the network
+        """
+        # Set up return values
+        responses = iter(['{"page": 1}', '{"page": 2}', '{"other": true}'])
+
+        def send(adapter, request, **kwargs):
+            return self._response(request, next(responses))
+
+        # Record
+        with mock.patch(SEND, side_effect=send, autospec=True) as mock_send:
+            c.record(self.cassette_dir)
+            session = requests.Session()
+            session.get('https://mock.github/issues?page=1&per_page=30')
+            session.get('https://mock.github/issues?per_page=30&page=1')
+            session.get('https://mock.jira/rest/api/2/serverInfo')
+            c.stop()
+            self.assertEqual(mock_send.call_count, 3)
+        self.assertEqual(sorted(os.listdir(self.cassette_dir)),
+                         ['mock.github.jsonl.gz', 'mock.jira.jsonl.gz'])
+
+        # Replay
+        with mock.patch(SEND) as mock_send:
+            c.replay(self.cassette_dir)
+            session = requests.Session()
+            first = session.get('https://mock.github/issues?page=1&per_page=30')
+            second = session.get('https://mock.github/issues?page=1&per_page=30')
+            third = session.get('https://mock.github/issues?page=1&per_page=30')
+            other = session.get('https://mock.jira/rest/api/2/serverInfo')
+
+            # Assert everything was called correctly
+            mock_send.assert_not_called()
+            c.stop()
+        self.assertEqual(first.json(), {'page': 1})
+        self.assertEqual(second.json(), {'page': 2})
+        # The last response is repeated once they run out
+        self.assertEqual(third.json(), {'page': 2})
+        self.assertEqual(other.json(), {'other': True})
+        self.assertEqual(first.headers['link'], '<mock_next>; rel="next"')
+        self.assertNotIn('Set-Cookie', first.headers)
+
+    def test_replay_missing(self):
+        """
+        Tests replaying a request that was never recorded
+        """
+        # Call the function
+        c.replay(self.cassette_dir)
+
+        # Assert everything was called correctly
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            requests.get('https://mock.github/not_recorded')
+
+    def test_stop_restores_send(self):
+        """
+        Tests 'stop' function puts the original send back
+        """
+        # Set up return values
+        original = requests.adapters.HTTPAdapter.send
+
+        # Call the function
+        c.replay(self.cassette_dir)
+        self.assertIsNot(requests.adapters.HTTPAdapter.send, original)
+        c.stop()
+
+        # Assert everything was called correctly
+        self.assertIs(requests.adapters.HTTPAdapter.send, original)
@@ -0,0 +1,128 @@
+# Built In Modules
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+# Local Modules
+import jibe.checkpoint as c
+
+# Global Variables
+PATH = 'jibe.checkpoint.'
+
+
+class TestCheckpoint(unittest.TestCase):
+    """
+    This class tests the checkpoint.py file under jibe
+    """
+    def setUp(self):
+        self.state_dir = tempfile.mkdtemp()
+        self.mock_records = [{'issue': {'id': '1'}, 'downstream': None}]
+        c.enable(self.state_dir)
+
+    def tearDown(self):
+        c.disable()
+        shutil.rmtree(self.state_dir)
+
+    def test_save_load(self):
+        """
+        Tests 'save' and 'load' keep the records of a repo per stage
+        """
+        # Call the function
+        c.save('NAME_OF_GROUP', 'github', 'org/repo', 'upstream', self.mock_records)
+
+        # Assert everything was called correctly
+        self.assertEqual(c.load('NAME_OF_GROUP', 'github', 'org/repo', 'upstream'),
+                         self.mock_records)
+        self.assertIsNone(c.load('NAME_OF_GROUP', 'github', 'org/repo', 'downstream'))
+        self.assertIsNone(c.load('NAME_OF_GROUP', 'pagure', 'org/repo', 'upstream'))
+
+    def test_enable_resume(self):
+        """
+        Tests 'enable' keeps the state to resume and clears it otherwise
+        """
+        # Set up return values
+        c.save('NAME_OF_GROUP', 'github', 'org/repo', 'upstream', self.mock_records)
+        with c.sending('NAME_OF_GROUP'):
+            pass
+        other = os.path.join(self.state_dir, 'README')
+        with io.open(other, 'w') as fp:
+            fp.write(u'not ours')
+
+        # Call the function
+        c.enable(self.state_dir, resume=True)
+        resumed = (c.sent('NAME_OF_GROUP'),
+                   c.load('NAME_OF_GROUP', 'github', 'org/repo', 'upstream'))
+        c.enable(self.state_dir)
+
+        # Assert everything was called correctly
+        self.assertEqual(resumed, (True, self.mock_records))
+        self.assertFalse(c.sent('NAME_OF_GROUP'))
+        self.assertIsNone(c.load('NAME_OF_GROUP', 'github', 'org/repo', 'upstream'))
+        self.assertEqual(os.listdir(self.state_dir), ['README'])
+
+    def test_sending_failed(self):
+        """
+        Tests 'sending' only marks reports that were sent
+        """
+        # Call the function
+        with self.assertRaises(IOError):
+            with c.sending('NAME_OF_GROUP'):
+                raise IOError('mock_error')
+
+        # Assert everything was called correctly
+        self.assertFalse(c.sent('NAME_OF_GROUP'))
+
+    def test_sending_interrupted(self):
+        """
+        Tests 'sent' never sends a report again that may have been sent
+        """
+        # Set up return values
+        with self.assertRaises(KeyboardInterrupt):
+            with c.sending('NAME_OF_GROUP'):
+                raise KeyboardInterrupt()
+
+        # Call the function
+        response = c.sent('NAME_OF_GROUP')
+
+        # Assert everything was called correctly
+        self.assertTrue(response)
+
+    def test_spooled(self):
+        """
+        Tests a spooled report is only marked as sent once it is delivered
+        """
+        # Set up return values
+        c.spooled('NAME_OF_GROUP', 'mock_key')
+        c.spooled('OTHER_GROUP', 'other_key')
+
+        # Call the function
+        spooled = (c.sent('NAME_OF_GROUP'), c.spooled_key('NAME_OF_GROUP'))
+        c.delivered('mock_key')
+
+        # Assert everything was called correctly
+        self.assertEqual(spooled, (False, 'mock_key'))
+        self.assertTrue(c.sent('NAME_OF_GROUP'))
+        self.assertIsNone(c.spooled_key('NAME_OF_GROUP'))
+        self.assertEqual(c.spooled_key('OTHER_GROUP'), 'other_key')
+        c.enable(self.state_dir)
+        self.assertEqual(os.listdir(self.state_dir), [])
+
+    def test_disabled(self):
+        """
+        Tests nothing is recorded without a state directory
+        """
+        # Set up return values
+        c.disable()
+
+        # Call the function
+        with c.sending('NAME_OF_GROUP'):
+            pass
+        c.spooled('NAME_OF_GROUP', 'mock_key')
+        c.delivered('mock_key')
+
+        # Assert everything was called correctly
+        self.assertFalse(c.sent('NAME_OF_GROUP'))
+        self.assertIsNone(c.spooled_key('NAME_OF_GROUP'))
+        self.assertEqual(os.listdir(self.state_dir), [])
@@ -0,0 +1,254 @@
+# Built In Modules
+import mock
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+try:
+    # Python 3.3 >
+    from unittest.mock import MagicMock  # noqa: F401
+except ImportError:
+    from mock import MagicMock  # noqa: F401
+from urllib.error import HTTPError
+from urllib.request import urlopen, Request
+
+# Local Modules
+import jibe.daemon as dm
+
+# Global Variables
+PATH = 'jibe.daemon.'
+
+
+class TestDaemon(unittest.TestCase):
+    """
+    This class tests the daemon.py file under jibe
+    """
+    def setUp(self):
+        self.config_dir = tempfile.mkdtemp()
+        self.config_path = os.path.join(self.config_dir, 'config.py')
+        with open(self.config_path, 'w') as fp:
+            fp.write('config = {}\n')
+        self.mock_config = {'jibe': {'send-to': {'group_1': {}, 'group 2': {}}}}
+        self.mock_refresh = MagicMock(side_effect=lambda group, config, send: 'html of ' + group)
+        self.daemon = dm.ReportDaemon(self.mock_config, self.mock_refresh,
+                                      config_paths=[self.config_path], interval=3600)
+
+    def tearDown(self):
+        if self.daemon.is_alive():
+            self.daemon.stop()
+        shutil.rmtree(self.config_dir)
+
+    def _wait_for(self, group):
+        for _ in range(500):
+            if group in self.daemon.reports:
+                return
+            time.sleep(0.01)
+        self.fail('No report for %s' % group)
+
+    def _start(self):
+        # Leave out the reports rendered at start
+        self.daemon.start()
+        self._wait_for('group_1')
+        self._wait_for('group 2')
+        self.daemon.reports.clear()
+        self.mock_refresh.reset_mock()
+
+    def test_start(self):
+        """
+        Tests every group is rendered but not mailed at start
+        """
+        # Call the function
+        self.daemon.start()
+        self._wait_for('group_1')
+        self._wait_for('group 2')
+
+        # Assert everything was called correctly
+        self.mock_refresh.assert_any_call('group_1', self.mock_config, False)
+        self.mock_refresh.assert_any_call('group 2', self.mock_config, False)
+        self.assertEqual(self.mock_refresh.call_count, 2)
+        self.assertEqual(self.daemon.reports['group_1']['html'], 'html of group_1')
+        self.assertEqual(self.daemon.reports['group_1']['status'], 'ok')
+        self.assertGreater(self.daemon._next_run, time.time() + 3500)
+
+    def test_scheduled_run(self):
+        """
+        Tests the first scheduled run, one interval after the start,
+        refreshes and mails every group
+        """
+        # Set up return values
+        mailed = threading.Event()
+        self.mock_refresh.side_effect = lambda group, config, send: \
+            send and group == 'group 2' and mailed.set()
+        self.daemon = dm.ReportDaemon(self.mock_config, self.mock_refresh, interval=0.2)
+
+        # Call the function
+        self.daemon.start()
+
+        # Assert everything was called correctly
+        self.assertTrue(mailed.wait(5))
+        self.assertEqual([call[0][2] for call in self.mock_refresh.call_args_list],
+                         [False, False, True, True])
+        self.mock_refresh.assert_any_call('group_1', self.mock_config, True)
+
+    def test_request_refresh(self):
+        """
+        Tests an on-demand refresh does not mail the report
+        """
+        # Set up return values
+        self._start()
+
+        # Call the function
+        done = self.daemon.request_refresh('group_1')
+
+        # Assert everything was called correctly
+        self.assertTrue(done.wait(5))
+        self.mock_refresh.assert_called_once_with('group_1', self.mock_config, False)
+        self.assertNotIn('group 2', self.daemon.reports)
+
+    def test_refresh_failed(self):
+        """
+        Tests a failed refresh keeps the last good report
+        """
+        # Set up return values
+        self.daemon.reports['group_1'] = {'html': 'old_html', 'generated': 1}
+        self.mock_refresh.side_effect = Exception
+
+        # Call the function
+        self.daemon._refresh('group_1', False)
+
+        # Assert everything was called correctly
+        self.assertEqual(self.daemon.reports['group_1']['html'], 'old_html')
+        self.assertEqual(self.daemon.reports['group_1']['status'], 'failed')
+
+    def test_check_config(self):
+        """
+        Tests the config is only reloaded when its file changes
+        """
+        # Set up return values
+        new_config = {'jibe': {'send-to': {'group_1': {}}}}
+        self.daemon.reload_config = MagicMock(return_value=new_config)
+        self.daemon.reports['group 2'] = {'html': 'mock_html'}
+
+        # Call the function
+        self.assertFalse(self.daemon.check_config())
+        os.utime(self.config_path, (0, 0))
+        self.assertTrue(self.daemon.check_config())
+
+        # Assert everything was called correctly
+        self.daemon.reload_config.assert_called_once_with()
+        self.assertIs(self.daemon.config, new_config)
+        self.assertEqual(self.daemon.groups, ['group_1'])
+        self.assertNotIn('group 2', self.daemon.reports)
+
+    def test_check_config_broken(self):
+        """
+        Tests a config that fails to load keeps the old one
+        """
+        # Set up return values
+        self.daemon.reload_config = MagicMock(side_effect=SyntaxError)
+        os.utime(self.config_path, (0, 0))
+
+        # Call the function
+        self.assertFalse(self.daemon.check_config())
+
+        # Assert everything was called correctly
+        self.assertIs(self.daemon.config, self.mock_config)
+
+    @mock.patch(PATH + 'metrics.to_prometheus', return_value='mock_metrics')
+    def test_server(self, mock_to_prometheus):
+        """
+        Tests the HTTP endpoints
+        """
+        # Set up return values
+        self._start()
+        server = dm.make_server(self.daemon, port=0)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        url = 'http://127.0.0.1:%i' % server.server_address[1]
+
+        try:
+            # No report yet
+            with self.assertRaises(HTTPError) as error:
+                urlopen(url + '/report/group_1')
+            self.assertEqual(error.exception.code, 503)
+            with self.assertRaises(HTTPError) as error:
+                urlopen(url + '/report/unknown')
+            self.assertEqual(error.exception.code, 404)
+
+            # Call the function
+            refreshed = urlopen(url + '/report/group%202?refresh=1').read()
+            cached = urlopen(url + '/report/group%202').read()
+            index = urlopen(url + '/').read()
+            prometheus = urlopen(url + '/metrics').read()
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+        # Assert everything was called correctly
+        self.assertEqual(refreshed, b'html of group 2')
+        self.assertEqual(cached, b'html of group 2')
+        self.mock_refresh.assert_called_once_with('group 2', self.mock_config, False)
+        self.assertIn(b'href="/report/group%202"', index)
+        self.assertIn(b'pending', index)
+        self.assertEqual(prometheus, b'mock_metrics')
+
+    def test_index(self):
+        """
+        Tests the index escapes the group names
+        """
+        # Set up return values
+        self.mock_config['jibe']['send-to'] = {'<b>group</b>': {}}
+        self.daemon.reports['<b>group</b>'] = {'generated': None, 'status': 'failed & retrying'}
+
+        # Call the function
+        response = dm._index(self.daemon)
+
+        # Assert everything was called correctly
+        self.assertIn('>&lt;b&gt;group&lt;/b&gt;</a>', response)
+        self.assertIn('href="/report/%3Cb%3Egroup%3C/b%3E"', response)
+        self.assertIn('failed &amp; retrying', response)
+        self.assertNotIn('<b>', response)
+
+    def test_webhook(self):
+        """
+        Tests webhooks are verified, applied and re-render their groups
+        """
+        # Set up return values
+        self.daemon.on_event = MagicMock(return_value=['group_1'])
+        self._start()
+        server = dm.make_server(self.daemon, port=0)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        url = 'http://127.0.0.1:%i/webhook/github' % server.server_address[1]
+
+        def post(body):
+            request = Request(url, data=body, headers={'X-GitHub-Event': 'issues'})
+            try:
+                return urlopen(request).getcode()
+            except HTTPError as error:
+                return error.code
+
+        try:
+            # Call the function
+            with mock.patch(PATH + 'webhooks.parse_event') as mock_parse_event:
+                mock_parse_event.side_effect = dm.webhooks.SignatureError('mock_error')
+                rejected = post(b'mock_body')
+                mock_parse_event.side_effect = None
+                mock_parse_event.return_value = {'source': 'github'}
+                accepted = post(b'mock_body')
+            self._wait_for('group_1')
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+        # Assert everything was called correctly
+        self.assertEqual(rejected, 401)
+        self.assertEqual(accepted, 202)
+        self.assertEqual(mock_parse_event.call_args[0][0], 'github')
+        self.assertEqual(mock_parse_event.call_args[0][2], b'mock_body')
+        self.daemon.on_event.assert_called_once_with({'source': 'github'}, self.mock_config)
+        self.mock_refresh.assert_called_once_with('group_1', self.mock_config, False)
@@ -9,7 +9,7 @@ except ImportError:
 
 # Local Modules
 import jibe.downstream as d
-from jibe.intermediary import Issue
+from jibe.intermediary import Issue, IN_SYNC_STATE
 
 # Global Variables
 PATH = 'jibe.downstream.'
@@ -23,6 +23,8 @@ class TestDownstream(unittest.TestCase):
         """
         Setting up the testing environment
         """
+        # Clear the cached JIRA clients
+        d._jira_clients.__dict__.clear()
         # Mock Config dict
         self.mock_config = {
             'jibe': {
@@ -146,6 +148,10 @@ class TestDownstream(unittest.TestCase):
         mock_client.assert_called_with(mock_jira='mock_jira')
         self.assertEqual('Successful call!', response)
 
+        # The client is reused
+        d.get_jira_client(issue=mock_issue, config=self.mock_config)
+        mock_client.assert_called_once()
+
     @mock.patch(PATH + 'find_username')
     @mock.patch(PATH + 'check_comments_for_duplicate')
     @mock.patch('jira.client.JIRA')
@@ -228,6 +234,21 @@ class TestDownstream(unittest.TestCase):
         mock_client.comments.assert_called_with(self.mock_downstream)
         mock_client.issue.assert_called_with('TEST-1234')
 
+    def test_get_comments_no_server(self):
+        """
+        Tests 'get_comments' function with a client that answers from memory
+        """
+        # Set up return values
+        class Client(object):
+            def comments(self, existing):
+                return ['mock_comment']
+
+        # Call the function
+        response = d.get_comments(Client(), self.mock_downstream)
+
+        # Assert everything was called correctly
+        self.assertEqual(response, ['mock_comment'])
+
     def test_comment_matching(self):
         """
         Tests 'comment_matching' function
@@ -275,8 +296,8 @@ class TestDownstream(unittest.TestCase):
     @mock.patch(PATH + 'comment_matching')
     @mock.patch('jira.client.JIRA')
     def test_check_comments_out_of_sync(self,
-                                       mock_client,
-                                       mock_comment_matching):
+                                        mock_client,
+                                        mock_comment_matching):
         """
         Tests 'check_comments' function where we have one comment out of sync
         """
@@ -379,6 +400,27 @@ class TestDownstream(unittest.TestCase):
                          {'upstream': 'dummy_user',
                           'downstream': self.mock_downstream.fields.assignee})
 
+    def test_check_assignee_unassigned(self):
+        """
+        Test 'check_assignee' function where neither side is assigned
+        """
+        # Set up return values
+        self.mock_downstream.fields.assignee = None
+        self.mock_issue.assignee = [None]
+
+        # Call the function
+        response = d.check_assignee(self.mock_downstream, self.mock_issue)
+
+        # Assert everything was called correctly
+        self.assertEqual(response.out_of_sync['assignee'], 'in-sync')
+
+        # Github reports no assignees as an empty list
+        assignee = self.mock_downstream.fields.assignee = MagicMock()
+        self.mock_issue.assignee = []
+        response = d.check_assignee(self.mock_downstream, self.mock_issue)
+        self.assertEqual(response.out_of_sync['assignee'],
+                         {'upstream': 'Unassigned', 'downstream': assignee})
+
     def test_check_title(self):
         """
         Tests 'check_title' function where we have titles in sync
@@ -428,8 +470,7 @@ class TestDownstream(unittest.TestCase):
 
         # Assert everything was called correctly
         self.assertEqual(response.out_of_sync['transition'],
-                         {'upstream-close-downstream-open':
-                              {'upstream': 'Closed', 'downstream': 'Open'}})
+                         {'upstream-close-downstream-open': {'upstream': 'Closed', 'downstream': 'Open'}})
 
     def test_check_transition_out_of_sync_downstream(self):
         """
@@ -446,9 +487,8 @@ class TestDownstream(unittest.TestCase):
 
         # Assert everything was called correctly
         self.assertEqual(response.out_of_sync['transition'],
-                         {'upstream-open-downstream-close':
-                              {'upstream': 'Open', 'downstream':
-                                  'CUSTOM TRANSITION'}})
+                         {'upstream-open-downstream-close': {'upstream': 'Open',
+                                                             'downstream': 'CUSTOM TRANSITION'}})
 
     @mock.patch(PATH + 'check_comments')
     @mock.patch(PATH + 'check_tags')
@@ -475,6 +515,7 @@ class TestDownstream(unittest.TestCase):
         mock_check_fixVersion.return_value = self.mock_issue
         mock_check_tags.return_value = self.mock_issue
         mock_check_comments.return_value = self.mock_issue
+        self.mock_issue.sync_state.return_value = IN_SYNC_STATE
 
         # Call the function
         response = d.update_out_of_sync(
@@ -524,5 +565,149 @@ class TestDownstream(unittest.TestCase):
             self.mock_config
         )
 
+    def test_priority_order(self):
+        """
+        Tests 'priority_order' function
+        """
+        # Set up return values
+        issues = []
+        for url, updated in (('minor', 3), ('unknown', 1), ('blocker_old', 1),
+                             ('blocker_new', 2), ('highest', 0)):
+            issue = MagicMock()
+            issue.url = url
+            issue.updated = updated
+            issues.append(issue)
+        priorities = {'minor': 'Minor', 'blocker_old': 'Blocker', 'blocker_new': 'Blocker',
+                      'highest': 'Highest'}
+
+        # Call the function
+        response = d.priority_order(issues, priorities)
+
+        # Assert everything was called correctly
+        self.assertEqual([issue.url for issue in response],
+                         ['blocker_new', 'blocker_old', 'highest', 'unknown', 'minor'])
+
+    def test_top_issues(self):
+        """
+        Tests 'TopIssues' keeps the worst issues and counts the others
+        """
+        # Set up return values
+        issues = []
+        for url, priority, failed in (('in_sync', 'Blocker', []), ('minor', 'Minor', ['tags']),
+                                      ('blocker', 'Blocker', ['tags']),
+                                      ('worst', None, ['tags', 'title']),
+                                      ('blocker_later', 'Blocker', ['title']),
+                                      ('trivial', 'Trivial', ['tags'])):
+            issue = MagicMock(url=url, priority=priority)
+            issue.failed_checks.return_value = failed
+            issues.append(issue)
+        top = d.collector(3)
+
+        # Call the function
+        for issue in issues:
+            top.append(issue)
+
+        # Assert everything was called correctly
+        self.assertEqual([issue.url for issue in top], ['worst', 'blocker', 'blocker_later'])
+        self.assertEqual(len(top), 3)
+        self.assertEqual(top.left_out, {'issues': 3, 'in_sync': 1,
+                                        'checks': {'tags': 2}})
+        self.assertEqual(d.collector(None), [])
+
+    @mock.patch(PATH + 'time')
+    @mock.patch(PATH + 'priority_order')
+    @mock.patch(PATH + '_sync_issue')
+    def test_sync_until(self,
+                        mock_sync_issue,
+                        mock_priority_order,
+                        mock_time):
+        """
+        Tests 'sync_until' function stops comparing at the deadline
+        """
+        # Set up return values
+        issues = [MagicMock(url='url_%i' % index, priority='Critical') for index in range(4)]
+        mock_priority_order.return_value = issues
+        mock_sync_issue.side_effect = [(True, issues[0]), (False, issues[1])]
+        mock_time.time.side_effect = [1, 2, 10]
+        priorities = {'other_url': 'Minor'}
+
+        # Call the function
+        out_of_sync_issues, missing_issues, unchecked_issues = d.sync_until(
+            issues, self.mock_config, 10, priorities)
+
+        # Assert everything was called correctly
+        self.assertEqual(out_of_sync_issues, [issues[0]])
+        self.assertEqual(missing_issues, [issues[1]])
+        self.assertEqual(unchecked_issues, issues[2:])
+        self.assertEqual(priorities, {'other_url': 'Minor', 'url_0': 'Critical'})
+        mock_priority_order.assert_called_with(issues, priorities)
+
+    def test_compile_check_plan(self):
+        """
+        Tests 'compile_check_plan' function
+        """
+        # Call the function
+        response = d.compile_check_plan(self.mock_issue.downstream['check'])
+
+        # Assert everything was called correctly
+        self.assertEqual(response.names, ('comments', 'tags', 'fixVersion',
+                                          'assignee', 'title', 'transition'))
+        self.assertEqual(response.closed_status, 'CUSTOM TRANSITION')
+        self.assertEqual(len(response.checks), 6)
+
+    def test_compile_check_plan_unknown(self):
+        """
+        Tests 'compile_check_plan' function with an unknown check and
+        a transition check without a closed status
+        """
+        # Call the function
+        response = d.compile_check_plan(['tags', 'unknown', 'transition'])
+
+        # Assert everything was called correctly
+        self.assertEqual(response.names, ('tags',))
+        self.assertEqual(response.closed_status, None)
+
+    @mock.patch.dict(PATH + 'CHECKS')
+    def test_register_check(self):
+        """
+        Tests 'register_check' function with a third-party check
+        """
+        # Set up return values
+        mock_check = MagicMock()
+
+        # Call the function
+        d.register_check('mock_check', mock_check)
+        response = d.compile_check_plan(['tags', 'mock_check'])
 
+        # Assert everything was called correctly
+        self.assertEqual(response.names, ('tags', 'mock_check'))
+        self.assertEqual(response.checks[1], ('mock_check', mock_check))
+
+    @mock.patch.dict(PATH + 'CHECKS')
+    def test_register_check_fields(self):
+        """
+        Tests 'register_check' function refuses checks reading fields
+        snapshots don't keep
+        """
+        # Set up return values
+        mock_check = MagicMock()
 
+        # Call the function
+        d.register_check('mock_check', mock_check, fields=['labels', 'updated'])
+        with self.assertRaises(ValueError):
+            d.register_check('mock_other_check', mock_check, fields=['labels', 'customfield_1'])
+
+        # Assert everything was called correctly
+        self.assertIs(d.CHECKS['mock_check'], mock_check)
+        self.assertNotIn('mock_other_check', d.CHECKS)
+
+    def test_get_check_plan(self):
+        """
+        Tests 'get_check_plan' function stores the compiled plan
+        """
+        # Call the function
+        response = d.get_check_plan(self.mock_issue.downstream)
+
+        # Assert everything was called correctly
+        self.assertIs(self.mock_issue.downstream['check_plan'], response)
+        self.assertIs(d.get_check_plan(self.mock_issue.downstream), response)
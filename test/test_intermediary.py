@@ -157,3 +157,68 @@ class TestIntermediary(unittest.TestCase):
         self.assertEqual(response.out_of_sync, {'comments': 'in-sync', 'tags': 'in-sync',
                                                 'fixVersion': 'in-sync', 'assignee': 'in-sync',
                                                 'title': 'in-sync', 'transition': 'in-sync'})
+
+    def test_out_of_sync(self):
+        """
+        This tests the 'out_of_sync' view and 'sync_state' of the Issue class
+        """
+        # Set up return values
+        issue = i.Issue.from_pagure(
+            upstream='pagure',
+            issue={'comments': [], 'title': 'mock_title', 'id': 1234,
+                   'tags': [], 'milestone': None, 'priority': None,
+                   'content': 'mock_content', 'user': 'mock_reporter',
+                   'assignee': ['mock_assignee'], 'status': 'Open',
+                   'date_created': 'mock_date'},
+            config=self.mock_config,
+            group='NAME_OF_GROUP'
+        )
+
+        # Call the function
+        issue.out_of_sync['title'] = {'upstream': 'a', 'downstream': 'b'}
+        issue.out_of_sync['tags'] = 'in-sync'
+
+        # Assert that we made the calls correctly
+        self.assertEqual(issue.out_of_sync['title'], {'upstream': 'a', 'downstream': 'b'})
+        self.assertEqual(issue.out_of_sync['tags'], 'in-sync')
+        self.assertEqual(issue.sync_state('title'), i.OUT_OF_SYNC_STATE)
+        self.assertEqual(issue.sync_state('tags'), i.IN_SYNC_STATE)
+        self.assertEqual(issue.failed_checks(), ['title'])
+        self.assertEqual(issue._out_of_sync, {'title': {'upstream': 'a', 'downstream': 'b'}})
+        self.assertFalse(hasattr(issue, '__dict__'))
+
+    def test_compact(self):
+        """
+        This tests the 'compact' function under the Issue class
+        """
+        # Set up return values
+        issue = i.Issue.from_github(
+            upstream='github',
+            issue={'comments': [], 'title': 'mock_title', 'html_url': 'mock_url',
+                   'id': 1234, 'labels': [], 'milestone': None, 'body': 'mock_content',
+                   'user': 'mock_reporter', 'assignees': [], 'state': 'open'},
+            config=self.mock_config,
+            group='NAME_OF_GROUP'
+        )
+
+        # Call the function
+        issue.compact()
+
+        # Assert that we made the calls correctly
+        self.assertEqual(issue.content, None)
+        self.assertEqual(issue.comments, None)
+        self.assertEqual(issue.reporter, None)
+        self.assertEqual(issue.assignee, None)
+        self.assertEqual(issue.title, 'mock_title')
+        self.assertEqual(issue.url, 'mock_url')
+
+    def test_timestamp(self):
+        """
+        This function tests '_timestamp' reads GitHub and Pagure dates
+        """
+        # Call the function
+        response = [i._timestamp(value) for value in
+                    ('2019-01-01T00:00:00Z', '1546300800', None, 'mock_date')]
+
+        # Assert everything was called correctly
+        self.assertEqual(response, [1546300800.0, 1546300800.0, 0.0, 0.0])
@@ -0,0 +1,53 @@
+# Built In Modules
+import mock
+import sys
+import unittest
+
+# Local Modules
+from jibe.lazy import LazyModule
+
+
+def _namespace(name):
+    """ Globals of a module that made a stand-in for name """
+    namespace = {'LazyModule': LazyModule}
+    exec('stand_in = LazyModule(%r)' % name, namespace)
+    return namespace
+
+
+class TestLazy(unittest.TestCase):
+    """
+    This class tests the lazy.py file under jibe
+    """
+    def test_load(self):
+        """
+        Tests 'LazyModule' points the global at the real module once it is used
+        """
+        # Set up return values
+        namespace = _namespace('colorsys')
+        stand_in = namespace['stand_in']
+        self.assertIsInstance(stand_in, LazyModule)
+
+        # Call the function
+        response = stand_in.rgb_to_hsv(1.0, 0.0, 0.0)
+
+        # Assert everything was called correctly
+        self.assertEqual(response, (0.0, 1.0, 1.0))
+        self.assertIs(namespace['stand_in'], sys.modules['colorsys'])
+        self.assertEqual(stand_in.hsv_to_rgb(0.0, 1.0, 1.0), (1.0, 0.0, 0.0))
+
+    def test_patch(self):
+        """
+        Tests 'LazyModule' patches the real module through the stand-in
+        """
+        # Set up return values
+        namespace = _namespace('json')
+        stand_in = namespace['stand_in']
+
+        # Call the function
+        with mock.patch.object(stand_in, 'dumps') as mock_dumps:
+            response = sys.modules['json'].dumps({})
+
+        # Assert everything was called correctly
+        self.assertIs(response, mock_dumps.return_value)
+        self.assertIsNot(sys.modules['json'].dumps, mock_dumps)
+        self.assertIs(namespace['stand_in'], sys.modules['json'])
@@ -0,0 +1,151 @@
+# Built In Modules
+import io
+import mock
+import os
+import shutil
+import tempfile
+import unittest
+try:
+    # Python 3.3 >
+    from unittest.mock import MagicMock  # noqa: F401
+except ImportError:
+    from mock import MagicMock  # noqa: F401
+
+# Local Modules
+import jibe.linking as linking
+
+# Global Variables
+PATH = 'jibe.linking.'
+
+
+class TestLinking(unittest.TestCase):
+    """
+    This class tests the linking.py file under jibe
+    """
+    def setUp(self):
+        self.mock_config = {'jibe': {'default_jira_instance': 'mock_jira'}}
+        self.link_dir = tempfile.mkdtemp()
+        self.mock_link = MagicMock()
+        self.mock_link.object.url = 'mock_existing_url'
+        self.mock_client = MagicMock()
+        self.mock_client.issue.return_value.id = 'mock_id'
+        self.mock_client.issue.return_value.fields.description = 'mock_description'
+        self.mock_client.remote_links.return_value = [self.mock_link]
+
+    def tearDown(self):
+        shutil.rmtree(self.link_dir)
+
+    def _write(self, name, text):
+        path = os.path.join(self.link_dir, name)
+        with io.open(path, 'w', encoding='utf-8') as fp:
+            fp.write(text)
+        return path
+
+    def test_read_links_csv(self):
+        """
+        Tests 'read_links' function groups the links of a CSV file per issue
+        """
+        # Set up return values
+        path = self._write('links.csv', u'issue,url\nFACTORY-1,url_1\nFACTORY-2,url_2,other_jira\n'
+                                        u'FACTORY-1,url_3\nFACTORY-1,url_1\n')
+
+        # Call the function
+        response = linking.read_links(path, self.mock_config)
+
+        # Assert everything was called correctly
+        self.assertEqual(list(response.items()), [
+            (('mock_jira', 'FACTORY-1'), ['url_1', 'url_3']),
+            (('other_jira', 'FACTORY-2'), ['url_2'])])
+
+    def test_read_links_jsonl(self):
+        """
+        Tests 'read_links' function with a JSONL file
+        """
+        # Set up return values
+        path = self._write('links.jsonl', u'{"issue": "FACTORY-1", "url": "url_1"}\n\n'
+                                          u'{"issue": "FACTORY-2"}\n')
+
+        # Call the function
+        with self.assertRaises(ValueError):
+            linking.read_links(path, self.mock_config)
+
+    def test_link_issue(self):
+        """
+        Tests 'link_issue' function skips existing links and re-indexes once
+        """
+        # Set up return values
+        self.mock_client.add_remote_link.side_effect = [None, None, Exception('mock_error')]
+
+        # Call the function
+        linked, skipped, failed = linking.link_issue(
+            self.mock_client, 'FACTORY-1',
+            ['url_1', 'mock_existing_url', 'url_2', 'url_3'])
+
+        # Assert everything was called correctly
+        self.assertEqual(linked, ['url_1', 'url_2'])
+        self.assertEqual(skipped, ['mock_existing_url'])
+        self.assertEqual(failed, [('url_3', 'mock_error')])
+        self.mock_client.remote_links.assert_called_once_with('FACTORY-1')
+        self.mock_client.add_remote_link.assert_any_call(
+            'mock_id', {'url': 'url_1', 'title': 'Upstream issue'})
+        self.mock_client.issue.return_value.update.assert_called_once_with(
+            {'description': 'mock_description '})
+
+    def test_link_issue_no_description(self):
+        """
+        Tests 'link_issue' function re-indexes issues without description and
+        reports the links as linked when re-indexing fails
+        """
+        # Set up return values
+        self.mock_client.issue.return_value.fields.description = None
+
+        # Call the function
+        linked, skipped, failed = linking.link_issue(self.mock_client, 'FACTORY-1', ['url_1'])
+        self.mock_client.issue.return_value.update.side_effect = Exception('mock_error')
+        response = linking.link_issue(self.mock_client, 'FACTORY-1', ['url_2'])
+
+        # Assert everything was called correctly
+        self.assertEqual((linked, skipped, failed), (['url_1'], [], []))
+        self.assertEqual(response, (['url_2'], [], []))
+        self.mock_client.issue.return_value.update.assert_called_with({'description': ' '})
+
+    def test_link_issue_nothing_new(self):
+        """
+        Tests 'link_issue' function doesn't re-index when nothing was added
+        """
+        # Call the function
+        linked, skipped, failed = linking.link_issue(self.mock_client, 'FACTORY-1', ['mock_existing_url'])
+
+        # Assert everything was called correctly
+        self.assertEqual((linked, skipped, failed), ([], ['mock_existing_url'], []))
+        self.mock_client.add_remote_link.assert_not_called()
+        self.mock_client.issue.return_value.update.assert_not_called()
+
+    @mock.patch(PATH + 'd.get_jira_instance_client')
+    def test_link_all(self,
+                      mock_get_jira_instance_client):
+        """
+        Tests 'link_all' function summarizes links and failures
+        """
+        # Set up return values
+        def issue(issue_id):
+            if issue_id == 'FACTORY-404':
+                raise Exception('mock_not_found')
+            return self.mock_client.issue.return_value
+        self.mock_client.issue.side_effect = issue
+        mock_get_jira_instance_client.return_value = self.mock_client
+        links = {('mock_jira', 'FACTORY-1'): ['url_1', 'mock_existing_url'],
+                 ('mock_jira', 'FACTORY-2'): ['url_2'],
+                 ('mock_jira', 'FACTORY-404'): ['url_3', 'url_4']}
+
+        # Call the function
+        response = linking.link_all(links, self.mock_config, jobs=2)
+
+        # Assert everything was called correctly
+        self.assertEqual(response['issues'], 3)
+        self.assertEqual(response['linked'], 2)
+        self.assertEqual(response['skipped'], 1)
+        self.assertEqual(sorted(response['failures']),
+                         [('FACTORY-404', 'url_3', 'mock_not_found'),
+                          ('FACTORY-404', 'url_4', 'mock_not_found')])
+        mock_get_jira_instance_client.assert_called_with('mock_jira', self.mock_config)
@@ -0,0 +1,209 @@
+# Built In Modules
+import email
+import gzip
+import io
+import mock
+import os
+import shutil
+import smtplib
+import tempfile
+import unittest
+try:
+    # Python 3.3 >
+    from unittest.mock import MagicMock  # noqa: F401
+except ImportError:
+    from mock import MagicMock  # noqa: F401
+
+# Local Modules
+import jibe.mailer as m
+
+# Global Variables
+PATH = 'jibe.mailer.'
+
+
+class TestMailer(unittest.TestCase):
+    """
+    This class tests the mailer.py file under jibe
+    """
+    def setUp(self):
+        # Reset the module level connection
+        m._connection = None
+        environ = mock.patch.dict(os.environ, {'DEFAULT_FROM': 'mock_from',
+                                               'DEFAULT_SERVER': 'mock_server'})
+        environ.start()
+        self.addCleanup(environ.stop)
+
+    def tearDown(self):
+        m._connection = None
+
+    @mock.patch(PATH + 'smtplib.SMTP')
+    def test_send(self,
+                  mock_smtp):
+        """
+        Tests 'send' function reuses one connection and only attaches
+        referenced images
+        """
+        # Call the function
+        m.send(['mock_email'], 'mock_subject', '<img src="cid:major_priority_image">')
+        m.send(['mock_email'], 'mock_subject', 'no images')
+
+        # Assert everything was called correctly
+        mock_smtp.assert_called_once_with('mock_server')
+        self.assertEqual(mock_smtp().sendmail.call_count, 2)
+        first = mock_smtp().sendmail.call_args_list[0][0][2]
+        second = mock_smtp().sendmail.call_args_list[1][0][2]
+        self.assertIn('<major_priority_image>', first)
+        self.assertNotIn('<blocker_priority_image>', first)
+        self.assertNotIn('image/png', second)
+
+    @mock.patch(PATH + 'send')
+    def test_send_file(self,
+                       mock_send):
+        """
+        Tests 'send_file' function sends the report in a file
+        """
+        # Set up return values
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'report.html')
+        with io.open(path, 'w', encoding='utf-8') as fp:
+            fp.write(u'mock_html \u2714')
+
+        # Call the function
+        response = m.send_file(['mock_email'], 'mock_subject', path, attachment='mock_file')
+
+        # Assert everything was called correctly
+        mock_send.assert_called_with(['mock_email'], 'mock_subject', u'mock_html \u2714',
+                                     attachment='mock_file')
+        self.assertEqual(response, mock_send.return_value)
+
+    @mock.patch(PATH + 'smtplib.SMTP')
+    def test_send_attachment(self,
+                             mock_smtp):
+        """
+        Tests 'send' function adds the plain text part and the gzipped
+        report and returns the size of the message
+        """
+        # Call the function
+        response = m.send(['mock_email'], 'mock_subject', u'<p>r\xe9port</p>', plain='mock_summary',
+                          attachment='mock_group.html.gz')
+
+        # Assert everything was called correctly
+        message = email.message_from_string(mock_smtp().sendmail.call_args[0][2])
+        parts = dict((part.get_content_type(), part) for part in message.walk())
+        self.assertEqual(response, len(mock_smtp().sendmail.call_args[0][2]))
+        self.assertEqual(message.get_content_type(), 'multipart/mixed')
+        self.assertEqual(parts['text/plain'].get_payload(decode=True), b'mock_summary')
+        self.assertEqual(parts['application/gzip'].get_filename(), 'mock_group.html.gz')
+        self.assertEqual(gzip.decompress(parts['application/gzip'].get_payload(decode=True)),
+                         parts['text/html'].get_payload(decode=True))
+        self.assertEqual(parts['text/html'].get_payload(decode=True).decode('utf-8'),
+                         u'<p>r\xe9port</p>')
+
+    def test_gzip_report(self):
+        """
+        Tests 'gzip_report' function compresses the report reproducibly
+        """
+        # Call the function
+        response = m.gzip_report(u'<p>r\xe9port</p>')
+
+        # Assert everything was called correctly
+        self.assertEqual(gzip.decompress(response), u'<p>r\xe9port</p>'.encode('utf-8'))
+        # No timestamp in the header
+        self.assertEqual(response[4:8], b'\x00\x00\x00\x00')
+        self.assertEqual(m.gzip_report(u'<p>r\xe9port</p>'), response)
+
+    @mock.patch(PATH + 'smtplib.SMTP')
+    def test_send_reconnect(self,
+                            mock_smtp):
+        """
+        Tests 'send' function reconnects when the server disconnected
+        """
+        # Set up return values
+        mock_dead = MagicMock()
+        mock_dead.sendmail.side_effect = smtplib.SMTPServerDisconnected()
+        mock_alive = MagicMock()
+        mock_smtp.side_effect = [mock_dead, mock_alive]
+
+        # Call the function
+        m.send(['mock_email'], 'mock_subject', 'mock_text')
+
+        # Assert everything was called correctly
+        self.assertEqual(mock_smtp.call_count, 2)
+        mock_alive.sendmail.assert_called_once()
+        self.assertIs(m._connection, mock_alive)
+
+    @mock.patch(PATH + 'smtplib.SMTP')
+    def test_send_refused(self,
+                          mock_smtp):
+        """
+        Tests 'send' function does not retry when the message was refused
+        """
+        # Set up return values
+        mock_smtp().sendmail.side_effect = smtplib.SMTPRecipientsRefused({})
+
+        # Call the function
+        with self.assertRaises(smtplib.SMTPRecipientsRefused):
+            m.send(['mock_email'], 'mock_subject', 'mock_text')
+
+    @mock.patch.dict(os.environ, {'DEFAULT_STARTTLS': 'true',
+                                  'DEFAULT_USERNAME': 'mock_user',
+                                  'DEFAULT_PASSWORD': 'mock_password'})
+    @mock.patch(PATH + 'smtplib.SMTP')
+    def test_connect(self,
+                     mock_smtp):
+        """
+        Tests 'connect' function with STARTTLS and login
+        """
+        # Call the function
+        response = m.connect()
+
+        # Assert everything was called correctly
+        mock_smtp().starttls.assert_called_with()
+        mock_smtp().login.assert_called_with('mock_user', 'mock_password')
+        self.assertEqual(response, mock_smtp())
+
+    @mock.patch(PATH + 'smtplib.SMTP')
+    def test_send_unconfigured(self,
+                               mock_smtp):
+        """
+        Tests 'send' function needs the mail settings only when sending
+        """
+        # Set up return values
+        environ = dict(os.environ)
+        environ.pop('DEFAULT_FROM', None)
+
+        # Call the function
+        with mock.patch.dict(os.environ, environ, clear=True):
+            with self.assertRaises(EnvironmentError):
+                m.send(['mock_email'], 'mock_subject', 'mock_text')
+
+        # Assert everything was called correctly
+        mock_smtp.assert_not_called()
+
+    def test_close(self):
+        """
+        Tests 'close' function
+        """
+        # Set up return values
+        mock_connection = MagicMock()
+        m._connection = mock_connection
+
+        # Call the function
+        m.close()
+
+        # Assert everything was called correctly
+        mock_connection.quit.assert_called_with()
+        self.assertIsNone(m._connection)
+
+    def test_get_image_parts(self):
+        """
+        Tests 'get_image_parts' function builds the parts once
+        """
+        # Call the function
+        response = m.get_image_parts()
+
+        # Assert everything was called correctly
+        self.assertIs(m.get_image_parts(), response)
+        self.assertEqual([name for name, _ in response],
+                         [name for _, name in m.IMAGE_SPECS])
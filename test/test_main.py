@@ -1,12 +1,22 @@
 # Built In Modules
+import argparse
+import io
+import os
 import mock
+import re
+import shutil
+import tempfile
 import unittest
+from html.parser import HTMLParser
 try:
     # Python 3.3 >
     from unittest.mock import MagicMock  # noqa: F401
 except ImportError:
     from mock import MagicMock  # noqa: F401
 
+# 3rd Party Modules
+import requests.adapters
+
 # Local Modules
 import jibe.main as m
 
@@ -14,6 +24,39 @@ import jibe.main as m
 PATH = 'jibe.main.'
 
 
+class _TextContent(HTMLParser):
+    """ Text of a report as it reads, one line per block """
+    BLOCKS = ('table', 'tr', 'td', 'th', 'div', 'ul', 'li', 'hr', 'br', 'h1', 'p')
+
+    def __init__(self, html):
+        HTMLParser.__init__(self, convert_charrefs=True)
+        self.parts = []
+        self.inline = []
+        self.style = False
+        self.feed(html)
+        text = ''.join(self.parts).split('\n')
+        self.lines = [line for line in (' '.join(line.split()) for line in text) if line]
+
+    def handle_starttag(self, tag, attrs):
+        self.style = self.style or tag == 'style'
+        # The full report shows some paragraphs inline
+        inline = tag == 'p' and 'inline' in (dict(attrs).get('style') or '')
+        if tag == 'p':
+            self.inline.append(inline)
+        if tag in self.BLOCKS and not inline:
+            self.parts.append('\n')
+
+    def handle_endtag(self, tag):
+        self.style = self.style and tag != 'style'
+        inline = tag == 'p' and self.inline and self.inline.pop()
+        if tag in self.BLOCKS and not inline:
+            self.parts.append('\n')
+
+    def handle_data(self, data):
+        if not self.style:
+            self.parts.append(re.sub(r'\s+', ' ', data))
+
+
 class TestMain(unittest.TestCase):
     """
     This class tests main.py under jibe
@@ -95,6 +138,16 @@ class TestMain(unittest.TestCase):
                 }
             }
         }
+        # Reset the cached JINJA environment
+        m._template_env = None
+        # Sends are mocked, don't leave their sizes in the run metrics
+        self.addCleanup(m.metrics.reset)
+        # Read before the tests patch parse_args
+        self.mock_defaults = vars(m.parse_args([]))
+
+    def _args(self, **overrides):
+        """ Command line defaults with the flags a test cares about """
+        return argparse.Namespace(**dict(self.mock_defaults, **overrides))
 
     @mock.patch(PATH + 'load_config_files')
     def test_load_sync2jira_config(self,
@@ -109,11 +162,10 @@ class TestMain(unittest.TestCase):
         response = m.load_sync2jira_config()
 
         # Assert everything was called correctly
-        self.assertEqual(response, {'jibe': {'jira': {'example':
-                                                          {'options':
-                                                               {'verify': True, 'server':
-                                                                          'https://some_jira_server_somewhere.com'},
-                                                                  'basic_auth': ('YOU_USERNAME', 'YOUR_PASSWORD')}},
+        self.assertEqual(response, {'jibe': {'jira': {'example': {
+                                                 'options': {'verify': True,
+                                                             'server': 'https://some_jira_server_somewhere.com'},
+                                                 'basic_auth': ('YOU_USERNAME', 'YOUR_PASSWORD')}},
                                              'default_jira_instance': 'example', 'github_token': 'YOUR_TOKEN',
                                              'send-to': {'NAME_OF_GROUP': {'fun': {}, 'email-to': ['SOME_EMAIL_LIST'],
                                                                            'upstream': {'pagure': {},
@@ -147,7 +199,10 @@ class TestMain(unittest.TestCase):
 
         # Assert everything was called correctly
         mock_jinja2.FileSystemLoader.assert_called_with(searchpath='./jibe/')
-        mock_jinja2.Environment.assert_called_with(loader='mock_templateLoader')
+        mock_jinja2.Environment.assert_called_with(
+            loader='mock_templateLoader',
+            bytecode_cache=mock_jinja2.FileSystemBytecodeCache(),
+            auto_reload=False)
         mock_templateEnv.get_template.assert_called_with("html_template.jinja")
         mock_datetime_now.strftime.assert_called_with('%Y-%m-%d')
         mock_template.render.assert_called_with({'out_of_sync_issues': ['out_of_sync'],
@@ -183,7 +238,10 @@ class TestMain(unittest.TestCase):
 
         # Assert everything was called correctly
         mock_jinja2.FileSystemLoader.assert_called_with(searchpath='./jibe/')
-        mock_jinja2.Environment.assert_called_with(loader='mock_templateLoader')
+        mock_jinja2.Environment.assert_called_with(
+            loader='mock_templateLoader',
+            bytecode_cache=mock_jinja2.FileSystemBytecodeCache(),
+            auto_reload=False)
         mock_templateEnv.get_template.assert_called_with("html_template.jinja")
         mock_datetime_now.strftime.assert_called_with('%Y-%m-%d')
         mock_template.render.assert_called_with({'out_of_sync_issues': ['out_of_sync'],
@@ -192,6 +250,50 @@ class TestMain(unittest.TestCase):
                                                  'joke': 'test'})
         self.assertEqual(response, 'mock_render')
 
+    @mock.patch(PATH + 'jinja2')
+    def test_create_html_cached(self,
+                                mock_jinja2):
+        """
+        Tests 'create_html' function reuses the JINJA environment
+        """
+        # Call the function
+        m.create_html(out_of_sync_issues=[], missing_issues=[], joke='')
+        m.create_html(out_of_sync_issues=[], missing_issues=[], joke='')
+
+        # Assert everything was called correctly
+        self.assertEqual(mock_jinja2.Environment.call_count, 1)
+
+    @mock.patch(PATH + 'datetime')
+    @mock.patch(PATH + 'jinja2')
+    def test_create_html_stream(self,
+                                mock_jinja2,
+                                mock_datetime):
+        """
+        Tests 'create_html' function streaming into a file object
+        """
+        # Set up return values
+        mock_template = MagicMock()
+        mock_template.generate.return_value = iter(['<html>', '</html>'])
+        mock_jinja2.Environment().get_template.return_value = mock_template
+        mock_datetime.now().strftime.return_value = 'mock_now'
+        output = io.StringIO()
+
+        # Call the function
+        response = m.create_html(
+            out_of_sync_issues=['out_of_sync'],
+            missing_issues=['missing_issues'],
+            joke='',
+            output=output
+        )
+
+        # Assert everything was called correctly
+        mock_template.generate.assert_called_with({'out_of_sync_issues': ['out_of_sync'],
+                                                   'now': 'mock_now',
+                                                   'missing_issues': ['missing_issues']})
+        mock_template.render.assert_not_called()
+        self.assertEqual(output.getvalue(), '<html></html>')
+        self.assertEqual(response, 13)
+
     @mock.patch('jira.client.JIRA')
     def test_attach_link_helper(self,
                                 mock_client):
@@ -227,7 +329,6 @@ class TestMain(unittest.TestCase):
         mock_client().issue.return_value = 'mock_downstream'
         mock_attach_link_helper.return_value = True
 
-
         # Call the function
         m.attach_link(
             issue_id='mock_issue_id',
@@ -266,10 +367,7 @@ class TestMain(unittest.TestCase):
         Test 'main' function with no parameters
         """
         # Set up return values
-        mock_args = MagicMock()
-        mock_args.sync2jira = False
-        mock_args.link_issue = False
-        mock_args.ignore_in_sync = False
+        mock_args = self._args()
         mock_parse_args.return_value = mock_args
         mock_load_config.return_value = self.mock_config
         mock_get_upstream_issues.return_value = 'mock_issues'
@@ -281,7 +379,7 @@ class TestMain(unittest.TestCase):
 
         # Assert everything was called correctly
         mock_get_upstream_issues.assert_called_with(self.mock_config, 'NAME_OF_GROUP')
-        mock_sync_with_downstream.assert_called_with('mock_issues', self.mock_config)
+        mock_sync_with_downstream.assert_called_with('mock_issues', self.mock_config, None)
         mock_format_check.assert_called_with('mock_out_of_sync')
         mock_m_send.assert_called_with(['mock_email'], 'Jibe Report for NAME_OF_GROUP', 'mock_html')
         mock_load_sync2jira_config.assert_not_called()
@@ -311,10 +409,7 @@ class TestMain(unittest.TestCase):
         Test 'main' function where we load from sync2jira config file
         """
         # Set up return values
-        mock_args = MagicMock()
-        mock_args.sync2jira = True
-        mock_args.link_issue = False
-        mock_args.ignore_in_sync = False
+        mock_args = self._args(sync2jira=True)
         mock_parse_args.return_value = mock_args
         mock_load_sync2jira_config.return_value = self.mock_config
         mock_get_upstream_issues.return_value = 'mock_issues'
@@ -326,7 +421,7 @@ class TestMain(unittest.TestCase):
 
         # Assert everything was called correctly
         mock_get_upstream_issues.assert_called_with(self.mock_config, 'NAME_OF_GROUP')
-        mock_sync_with_downstream.assert_called_with('mock_issues', self.mock_config)
+        mock_sync_with_downstream.assert_called_with('mock_issues', self.mock_config, None)
         mock_format_check.assert_called_with('mock_out_of_sync')
         mock_m_send.assert_called_with(['mock_email'], 'Jibe Report for NAME_OF_GROUP', 'mock_html')
         mock_load_sync2jira_config.assert_any_call()
@@ -342,24 +437,21 @@ class TestMain(unittest.TestCase):
     @mock.patch(PATH + 'u.get_upstream_issues')
     @mock.patch(PATH + 'load_config')
     @mock.patch(PATH + 'parse_args')
-    def test_main_sync2jira(self,
-                            mock_parse_args,
-                            mock_load_config,
-                            mock_get_upstream_issues,
-                            mock_sync_with_downstream,
-                            mock_format_check,
-                            mock_create_html,
-                            mock_m_send,
-                            mock_load_sync2jira_config,
-                            mock_attach_link):
+    def test_main_link_issue(self,
+                             mock_parse_args,
+                             mock_load_config,
+                             mock_get_upstream_issues,
+                             mock_sync_with_downstream,
+                             mock_format_check,
+                             mock_create_html,
+                             mock_m_send,
+                             mock_load_sync2jira_config,
+                             mock_attach_link):
         """
-        Test 'main' function where we load from sync2jira config file
+        Test 'main' function where we only link an issue
         """
         # Set up return values
-        mock_args = MagicMock()
-        mock_args.sync2jira = False
-        mock_args.link_issue = ['mock_id', 'mock_url']
-        mock_args.ignore_in_sync = False
+        mock_args = self._args(link_issue=['mock_id', 'mock_url'])
         mock_parse_args.return_value = mock_args
         mock_load_config.return_value = self.mock_config
         mock_get_upstream_issues.return_value = 'mock_issues'
@@ -376,4 +468,995 @@ class TestMain(unittest.TestCase):
         mock_format_check.assert_not_called()
         mock_m_send.assert_not_called()
         mock_load_config.assert_any_call()
-        mock_load_sync2jira_config.assert_not_called()
\ No newline at end of file
+        mock_load_sync2jira_config.assert_not_called()
+
+    @mock.patch(PATH + 'spool')
+    @mock.patch(PATH + 'm.send')
+    @mock.patch(PATH + 'create_html')
+    @mock.patch(PATH + 'format_check')
+    @mock.patch(PATH + 'd.sync_with_downstream')
+    @mock.patch(PATH + 'u.get_upstream_issues')
+    @mock.patch(PATH + 'load_config')
+    @mock.patch(PATH + 'parse_args')
+    def test_main_spool(self,
+                        mock_parse_args,
+                        mock_load_config,
+                        mock_get_upstream_issues,
+                        mock_sync_with_downstream,
+                        mock_format_check,
+                        mock_create_html,
+                        mock_m_send,
+                        mock_spool):
+        """
+        Test 'main' function where reports are spooled and delivered in the background
+        """
+        # Set up return values
+        mock_args = self._args(spool_dir='mock_spool_dir')
+        mock_parse_args.return_value = mock_args
+        mock_load_config.return_value = self.mock_config
+        mock_sync_with_downstream.return_value = ([], [])
+        mock_spool.spool_report.return_value = ('mock_key', 10)
+
+        # Call the function
+        m.main()
+
+        # Assert everything was called correctly
+        mock_spool.DeliveryWorker.assert_called_with('mock_spool_dir',
+                                                     on_delivered=m.checkpoint.delivered)
+        mock_spool.DeliveryWorker().start.assert_called_with()
+        self.assertEqual(mock_spool.spool_report.call_args[0][:3],
+                         ('mock_spool_dir', ['mock_email'], 'Jibe Report for NAME_OF_GROUP'))
+        self.assertFalse(mock_spool.spool_report.call_args[1]['rerun'])
+        mock_spool.DeliveryWorker().put.assert_called_with('mock_key')
+        mock_spool.DeliveryWorker().close.assert_called_with(timeout=mock_spool.DRAIN_TIMEOUT)
+        mock_m_send.assert_not_called()
+
+    @mock.patch(PATH + 'spool')
+    @mock.patch(PATH + 'u.get_upstream_issues')
+    @mock.patch(PATH + 'load_config')
+    @mock.patch(PATH + 'parse_args')
+    def test_main_deliver(self,
+                          mock_parse_args,
+                          mock_load_config,
+                          mock_get_upstream_issues,
+                          mock_spool):
+        """
+        Test 'main' function with the deliver command
+        """
+        # Set up return values
+        mock_args = self._args(command='deliver', spool_dir='mock_spool_dir')
+        mock_parse_args.return_value = mock_args
+        mock_spool.deliver.return_value = 0
+
+        # Call the function
+        m.main()
+
+        # Assert everything was called correctly
+        mock_spool.deliver.assert_called_with('mock_spool_dir', force=True)
+        mock_get_upstream_issues.assert_not_called()
+        mock_load_config.assert_not_called()
+
+    @mock.patch(PATH + 'throttle')
+    @mock.patch(PATH + 'm.send')
+    @mock.patch(PATH + 'create_html')
+    @mock.patch(PATH + 'format_check')
+    @mock.patch(PATH + 'd.sync_with_downstream')
+    @mock.patch(PATH + 'u.get_upstream_issues')
+    @mock.patch(PATH + 'load_config')
+    @mock.patch(PATH + 'parse_args')
+    def test_main_jobs(self,
+                       mock_parse_args,
+                       mock_load_config,
+                       mock_get_upstream_issues,
+                       mock_sync_with_downstream,
+                       mock_format_check,
+                       mock_create_html,
+                       mock_m_send,
+                       mock_throttle):
+        """
+        Test 'main' function running groups concurrently where one group fails
+        and one group has no email list
+        """
+        # Set up return values
+        mock_args = self._args(jobs=3)
+        mock_parse_args.return_value = mock_args
+        self.mock_config['jibe']['send-to'] = {
+            'GROUP_FAILING': {'email-to': ['mock_email']},
+            'GROUP_NO_EMAIL': {'email-to': []},
+            'GROUP_OK': {'email-to': ['mock_email']},
+        }
+        mock_load_config.return_value = self.mock_config
+
+        def get_upstream_issues(config, group):
+            if group == 'GROUP_FAILING':
+                raise IOError('mock_error')
+            return 'mock_issues'
+        mock_get_upstream_issues.side_effect = get_upstream_issues
+        mock_sync_with_downstream.return_value = ('mock_out_of_sync', 'mock_out_of_sync')
+        mock_create_html.return_value = 'mock_html'
+
+        # Call the function
+        m.main()
+
+        # Assert everything was called correctly
+        self.assertEqual(mock_get_upstream_issues.call_count, 3)
+        mock_m_send.assert_called_once_with(['mock_email'], 'Jibe Report for GROUP_OK', 'mock_html')
+        mock_throttle.enable.assert_called_with(3)
+        mock_throttle.disable.assert_called_with()
+
+    @mock.patch(PATH + 'os.makedirs')
+    @mock.patch(PATH + 'load_config')
+    @mock.patch(PATH + 'parse_args')
+    def test_main_restores_send(self,
+                                mock_parse_args,
+                                mock_load_config,
+                                mock_makedirs):
+        """
+        Test 'main' function leaving HTTP requests as it found them when the
+        arguments are rejected or the run fails early
+        """
+        # Set up return values
+        send = requests.adapters.HTTPAdapter.send
+        mock_load_config.return_value = self.mock_config
+        mock_makedirs.side_effect = OSError('mock_error')
+
+        # Call the function
+        mock_parse_args.return_value = self._args(resume=True)
+        m.main()
+        mock_parse_args.return_value = self._args(report_dir='mock_missing_dir')
+        with self.assertRaises(OSError):
+            m.main()
+        mock_parse_args.return_value = self._args(resume=True)
+        m.main()
+
+        # Assert everything was called correctly
+        self.assertEqual(mock_load_config.call_count, 1)
+        self.assertIs(requests.adapters.HTTPAdapter.send, send)
+
+    @mock.patch(PATH + 'throttle')
+    @mock.patch(PATH + 'cassette')
+    @mock.patch(PATH + 'm.send')
+    @mock.patch(PATH + 'create_html')
+    @mock.patch(PATH + 'format_check')
+    @mock.patch(PATH + 'd.sync_with_downstream')
+    @mock.patch(PATH + 'u.get_upstream_issues')
+    @mock.patch(PATH + 'load_config')
+    @mock.patch(PATH + 'parse_args')
+    def test_main_replay(self,
+                         mock_parse_args,
+                         mock_load_config,
+                         mock_get_upstream_issues,
+                         mock_sync_with_downstream,
+                         mock_format_check,
+                         mock_create_html,
+                         mock_m_send,
+                         mock_cassette,
+                         mock_throttle):
+        """
+        Test 'main' function serving the run from cassettes
+        """
+        # Set up return values
+        mock_args = self._args(replay='mock_cassette_dir')
+        mock_parse_args.return_value = mock_args
+        mock_load_config.return_value = self.mock_config
+        mock_sync_with_downstream.return_value = ('mock_out_of_sync', 'mock_out_of_sync')
+        mock_create_html.return_value = 'mock_html'
+
+        # Call the function
+        m.main()
+
+        # Assert everything was called correctly
+        mock_cassette.replay.assert_called_with('mock_cassette_dir')
+        mock_cassette.record.assert_not_called()
+        mock_cassette.stop.assert_called_with()
+        # Replayed requests never reach a host
+        mock_throttle.enable.assert_not_called()
+        mock_m_send.assert_called_with(['mock_email'], 'Jibe Report for NAME_OF_GROUP', 'mock_html')
+
+    @mock.patch(PATH + 'snapshot')
+    @mock.patch(PATH + 'm.send')
+    @mock.patch(PATH + 'create_html')
+    @mock.patch(PATH + 'd.sync_with_downstream')
+    @mock.patch(PATH + 'u.get_upstream_issues')
+    @mock.patch(PATH + 'load_config')
+    @mock.patch(PATH + 'parse_args')
+    def test_main_fetch(self,
+                        mock_parse_args,
+                        mock_load_config,
+                        mock_get_upstream_issues,
+                        mock_sync_with_downstream,
+                        mock_create_html,
+                        mock_m_send,
+                        mock_snapshot):
+        """
+        Test 'main' function only writing snapshots
+        """
+        # Set up return values
+        mock_args = self._args(command='fetch', snapshot_dir='mock_snapshot_dir')
+        mock_parse_args.return_value = mock_args
+        mock_load_config.return_value = self.mock_config
+        mock_get_upstream_issues.return_value = 'mock_issues'
+        mock_snapshot.snapshot_path.return_value = 'mock_path'
+        mock_snapshot.fetch_downstream.return_value = 'mock_pairs'
+        mock_snapshot.write_snapshot.return_value = 1
+
+        # Call the function
+        m.main()
+
+        # Assert everything was called correctly
+        mock_snapshot.snapshot_path.assert_called_with('mock_snapshot_dir', 'NAME_OF_GROUP')
+        mock_snapshot.fetch_downstream.assert_called_with('mock_issues', self.mock_config)
+        mock_snapshot.write_snapshot.assert_called_with('mock_path', 'NAME_OF_GROUP', 'mock_pairs', '')
+        mock_sync_with_downstream.assert_not_called()
+        mock_create_html.assert_not_called()
+        mock_m_send.assert_not_called()
+
+    @mock.patch(PATH + 'snapshot')
+    @mock.patch(PATH + 'm.send')
+    @mock.patch(PATH + 'create_html')
+    @mock.patch(PATH + 'format_check')
+    @mock.patch(PATH + 'u.get_upstream_issues')
+    @mock.patch(PATH + 'load_config')
+    @mock.patch(PATH + 'parse_args')
+    def test_main_report(self,
+                         mock_parse_args,
+                         mock_load_config,
+                         mock_get_upstream_issues,
+                         mock_format_check,
+                         mock_create_html,
+                         mock_m_send,
+                         mock_snapshot):
+        """
+        Test 'main' function reporting from snapshots
+        """
+        # Set up return values
+        mock_args = self._args(command='report', snapshot_dir='mock_snapshot_dir')
+        mock_parse_args.return_value = mock_args
+        mock_load_config.return_value = self.mock_config
+        mock_snapshot.snapshot_path.return_value = 'mock_path'
+        mock_snapshot.read_snapshot.return_value = ({'created': 0, 'joke': 'mock_joke'}, 'mock_records')
+        mock_snapshot.check_snapshot.return_value = ('mock_out_of_sync', 'mock_missing')
+        mock_create_html.return_value = 'mock_html'
+
+        # Call the function
+        m.main()
+
+        # Assert everything was called correctly
+        mock_get_upstream_issues.assert_not_called()
+        mock_snapshot.read_snapshot.assert_called_with('mock_path')
+        mock_snapshot.check_snapshot.assert_called_with('mock_records', self.mock_config, 'NAME_OF_GROUP', None)
+        mock_format_check.assert_called_with('mock_out_of_sync')
+        mock_create_html.assert_called_with('mock_out_of_sync', 'mock_missing', 'mock_joke',
+                                            unchecked_issues=(), estimates=None, left_out=None,
+                                            compact=False)
+        mock_m_send.assert_called_with(['mock_email'], 'Jibe Report for NAME_OF_GROUP', 'mock_html')
+
+    @mock.patch(PATH + 'run_group')
+    @mock.patch(PATH + 'spool')
+    @mock.patch(PATH + 'daemon')
+    @mock.patch(PATH + 'cassette')
+    @mock.patch(PATH + 'load_config')
+    @mock.patch(PATH + 'parse_args')
+    def test_main_serve(self,
+                        mock_parse_args,
+                        mock_load_config,
+                        mock_cassette,
+                        mock_daemon,
+                        mock_spool,
+                        mock_run_group):
+        """
+        Test 'main' function serving the reports and mailing them through
+        the spool
+        """
+        # Set up return values
+        mock_args = self._args(command='serve', host='mock_host', port=1234, interval=60,
+                               snapshot_dir='mock_snapshot_dir')
+        mock_parse_args.return_value = mock_args
+        mock_load_config.return_value = self.mock_config
+        mock_server = MagicMock()
+        mock_server.server_address = ('mock_host', 1234)
+        mock_server.serve_forever.side_effect = KeyboardInterrupt
+        mock_daemon.make_server.return_value = mock_server
+        mock_spool.pending_reports.return_value = ['mock_key']
+        mock_sender = mock_spool.DeliveryWorker.return_value
+
+        # Call the function
+        m.main()
+
+        # Assert everything was called correctly
+        args, kwargs = mock_daemon.ReportDaemon.call_args
+        self.assertEqual(args[0], self.mock_config)
+        self.assertEqual(kwargs['interval'], 60)
+        self.assertTrue(kwargs['config_paths'][0].endswith('config.py'))
+        mock_daemon.make_server.assert_called_with(
+            mock_daemon.ReportDaemon.return_value, 'mock_host', 1234)
+        mock_daemon.ReportDaemon.return_value.start.assert_called_once_with()
+        mock_server.server_close.assert_called_once_with()
+        mock_cassette.stop.assert_called_once_with()
+        spool_dir = os.path.join('mock_snapshot_dir', 'spool')
+        self.assertEqual(mock_args.spool_dir, spool_dir)
+        self.assertTrue(mock_args.keep_reports)
+        mock_spool.DeliveryWorker.assert_called_with(spool_dir)
+        mock_sender.put.assert_called_once_with('mock_key')
+        mock_sender.start.assert_called_once_with()
+        mock_sender.close.assert_called_once_with(timeout=mock_spool.DRAIN_TIMEOUT)
+        self.assertEqual(args[1]('NAME_OF_GROUP', self.mock_config, True),
+                         mock_run_group.return_value)
+        mock_run_group.assert_called_with('NAME_OF_GROUP', self.mock_config, mock_args,
+                                          mock_sender, True)
+
+    @mock.patch(PATH + 'spool.spool_report')
+    @mock.patch(PATH + 'create_html')
+    def test_render_report_keep_reports(self,
+                                        mock_create_html,
+                                        mock_spool_report):
+        """
+        Test 'render_report' function keeping the spooled report for 'jibe serve'
+        """
+        # Set up return values
+        mock_args = self._args(spool_dir='mock_spool_dir')
+        mock_args.keep_reports = True
+        mock_create_html.return_value = 'mock_html'
+        mock_spool_report.return_value = ('mock_key', None)
+        mock_output = MagicMock()
+
+        # Call the function
+        response = m.render_report('NAME_OF_GROUP', [], [], '', ['mock_email'], 'mock_subject',
+                                   mock_args, worker=MagicMock())
+
+        # Assert everything was called correctly
+        self.assertEqual(response, ('mock_html', 'mock_key', None))
+        args, kwargs = mock_spool_report.call_args
+        self.assertEqual(args[:3], ('mock_spool_dir', ['mock_email'], 'mock_subject'))
+        args[3](mock_output)
+        mock_output.write.assert_called_with('mock_html')
+        mock_create_html.assert_called_once_with([], [], '', unchecked_issues=(), estimates=None,
+                                                 left_out=None, compact=False)
+
+    @mock.patch(PATH + 'm.send')
+    @mock.patch(PATH + 'create_html')
+    @mock.patch(PATH + 'format_check')
+    def test_report_group_no_send(self,
+                                  mock_format_check,
+                                  mock_create_html,
+                                  mock_m_send):
+        """
+        Test 'report_group' function only rendering the report
+        """
+        # Set up return values
+        mock_args = self._args()
+        mock_create_html.return_value = 'mock_html'
+
+        # Call the function
+        response = m.report_group('NAME_OF_GROUP', self.mock_config, mock_args,
+                                  [], [], '', send=False)
+
+        # Assert everything was called correctly
+        self.assertEqual(response, 'mock_html')
+        mock_m_send.assert_not_called()
+
+    @mock.patch(PATH + 'similarity')
+    @mock.patch(PATH + 'm.send')
+    @mock.patch(PATH + 'create_html')
+    @mock.patch(PATH + 'format_check')
+    def test_report_group_suggest_matches(self,
+                                          mock_format_check,
+                                          mock_create_html,
+                                          mock_m_send,
+                                          mock_similarity):
+        """
+        Test 'report_group' function proposing matches for missing issues
+        """
+        # Set up return values
+        mock_args = self._args(suggest_matches=True, suggestions_dir='mock_dir')
+        mock_create_html.return_value = 'mock_html'
+        mock_similarity.write_suggestions.return_value = 1
+        mock_matched = MagicMock()
+        mock_matched.downstream_id = 'FACTORY-1'
+
+        # Call the function
+        m.report_group('NAME_OF_GROUP', self.mock_config, mock_args,
+                       [mock_matched], ['mock_missing'], '', send=False)
+
+        # Assert everything was called correctly
+        mock_similarity.suggest.assert_called_with(
+            ['mock_missing'], self.mock_config, exclude={'FACTORY-1'})
+        mock_similarity.write_suggestions.assert_called_with(
+            os.path.join('mock_dir', 'NAME_OF_GROUP-links.csv'),
+            ['mock_missing'], self.mock_config)
+
+    @mock.patch(PATH + 'd.reset_jira_clients')
+    @mock.patch(PATH + 'reload')
+    @mock.patch(PATH + 'load_config')
+    def test_reload_config(self,
+                           mock_load_config,
+                           mock_reload,
+                           mock_reset_jira_clients):
+        """
+        Test 'reload_config' function only drops the clients when needed
+        """
+        # Set up return values
+        mock_args = self._args()
+        mock_load_config.return_value = self.mock_config
+
+        # Call the function
+        response = m.reload_config(mock_args, self.mock_config)
+
+        # Assert everything was called correctly
+        self.assertEqual(response, self.mock_config)
+        mock_reload.assert_called_with(m.config)
+        mock_reset_jira_clients.assert_not_called()
+        m.reload_config(mock_args, {'jibe': {'jira': {'other': {}}}})
+        mock_reset_jira_clients.assert_called_once_with()
+
+    @mock.patch(PATH + 'report_group')
+    @mock.patch(PATH + 'snapshot')
+    @mock.patch(PATH + 'u.get_upstream_issues')
+    def test_store_group(self,
+                         mock_get_upstream_issues,
+                         mock_snapshot,
+                         mock_report_group):
+        """
+        Test 'store_group' function only fetches stale groups in full
+        """
+        # Set up return values
+        mock_args = self._args(resync_interval=60, snapshot_dir='mock_snapshot_dir')
+        mock_store = MagicMock()
+        mock_store.fresh.return_value = False
+        mock_get_upstream_issues.return_value = 'mock_issues'
+        mock_snapshot.snapshot_path.return_value = 'mock_path'
+        mock_snapshot.check_snapshot.return_value = ('mock_out_of_sync', 'mock_missing')
+
+        # Call the function
+        m.store_group('NAME_OF_GROUP', self.mock_config, mock_args, mock_store, send=False)
+        mock_store.fresh.return_value = True
+        response = m.store_group('NAME_OF_GROUP', self.mock_config, mock_args, mock_store)
+
+        # Assert everything was called correctly
+        self.assertEqual(response, mock_report_group.return_value)
+        mock_store.fresh.assert_called_with('NAME_OF_GROUP', 60)
+        mock_get_upstream_issues.assert_called_once_with(self.mock_config, 'NAME_OF_GROUP')
+        mock_store.load.assert_called_once_with(
+            'NAME_OF_GROUP', mock_snapshot.fetch_downstream.return_value, '')
+        mock_snapshot.check_snapshot.assert_called_with(
+            mock_store.records.return_value, self.mock_config, 'NAME_OF_GROUP', mock_args.top)
+        mock_store.save.assert_called_with('mock_path', 'NAME_OF_GROUP')
+        mock_report_group.assert_called_with(
+            'NAME_OF_GROUP', self.mock_config, mock_args, 'mock_out_of_sync', 'mock_missing',
+            mock_store.joke.return_value, None, True)
+
+    @mock.patch(PATH + 'sharding')
+    @mock.patch(PATH + 'snapshot')
+    @mock.patch(PATH + 'u.get_upstream_issues')
+    def test_fetch_group_shard(self,
+                               mock_get_upstream_issues,
+                               mock_snapshot,
+                               mock_sharding):
+        """
+        Test 'fetch_group' function only fetching the repos of its shard
+        """
+        # Set up return values
+        mock_args = self._args(shard=(2, 3), snapshot_dir='mock_snapshot_dir')
+        mock_sharding.shard_repos.return_value = {('github', 'mock_repo')}
+        mock_sharding.shard_of.return_value = 1
+        mock_sharding.shard_path.return_value = 'mock_shard_path'
+        mock_snapshot.write_snapshot.return_value = 1
+
+        # Call the function
+        m.fetch_group('NAME_OF_GROUP', self.mock_config, mock_args)
+        mock_sharding.shard_repos.return_value = set()
+        m.fetch_group('NAME_OF_GROUP', self.mock_config, mock_args)
+
+        # Assert everything was called correctly
+        mock_sharding.shard_repos.assert_called_with(self.mock_config, 'NAME_OF_GROUP', 2, 3)
+        mock_sharding.shard_path.assert_called_once_with('mock_snapshot_dir', 'NAME_OF_GROUP', 2, 3)
+        mock_get_upstream_issues.assert_called_once_with(
+            self.mock_config, 'NAME_OF_GROUP', {('github', 'mock_repo')})
+        mock_snapshot.write_snapshot.assert_called_once_with(
+            'mock_shard_path', 'NAME_OF_GROUP',
+            mock_snapshot.fetch_downstream.return_value, '')
+
+    @mock.patch(PATH + 'report_snapshot_group')
+    @mock.patch(PATH + 'sharding')
+    def test_merge_group(self,
+                         mock_sharding,
+                         mock_report_snapshot_group):
+        """
+        Test 'merge_group' function merging the shards before reporting
+        """
+        # Set up return values
+        mock_args = self._args(snapshot_dir='mock_snapshot_dir')
+        mock_sharding.merge.return_value = 1
+
+        # Call the function
+        response = m.merge_group('NAME_OF_GROUP', self.mock_config, mock_args, 'mock_worker')
+
+        # Assert everything was called correctly
+        mock_sharding.merge.assert_called_with('mock_snapshot_dir', 'NAME_OF_GROUP', self.mock_config)
+        mock_report_snapshot_group.assert_called_with(
+            'NAME_OF_GROUP', self.mock_config, mock_args, 'mock_worker')
+        self.assertEqual(response, mock_report_snapshot_group.return_value)
+
+    @mock.patch(PATH + 'u.get_upstream_issues')
+    @mock.patch(PATH + 'snapshot')
+    @mock.patch(PATH + 'intermediary')
+    @mock.patch(PATH + 'checkpoint')
+    @mock.patch(PATH + 'sharding')
+    def test_fetch_records(self,
+                           mock_sharding,
+                           mock_checkpoint,
+                           mock_intermediary,
+                           mock_snapshot,
+                           mock_get_upstream_issues):
+        """
+        Test 'fetch_records' function only fetching what isn't checkpointed
+        """
+        # Set up return values
+        mock_sharding.units.return_value = [('github', 'done'), ('github', 'fetched'),
+                                            ('pagure', 'new')]
+        checkpoints = {
+            ('done', 'downstream'): ['mock_done'],
+            ('fetched', 'upstream'): [{'issue': {'id': 'mock_fetched'}}],
+        }
+        mock_checkpoint.load.side_effect = \
+            lambda group, source, repo, stage: checkpoints.get((repo, stage))
+        mock_get_upstream_issues.return_value = ['mock_new']
+        mock_intermediary.Issue.return_value = 'mock_fetched'
+        mock_snapshot.issue_record.side_effect = lambda issue, downstream: (issue, downstream)
+        mock_snapshot.fetch_downstream.side_effect = lambda issues, config: \
+            [(issue, 'mock_jira') for issue in issues]
+
+        # Call the function
+        response = m.fetch_records('NAME_OF_GROUP', self.mock_config)
+
+        # Assert everything was called correctly
+        self.assertEqual(response, ['mock_done', ('mock_fetched', 'mock_jira'),
+                                    ('mock_new', 'mock_jira')])
+        mock_get_upstream_issues.assert_called_once_with(
+            self.mock_config, 'NAME_OF_GROUP', {('pagure', 'new')})
+        mock_intermediary.Issue.assert_called_once_with(
+            config=self.mock_config, group='NAME_OF_GROUP', id='mock_fetched')
+        mock_checkpoint.save.assert_any_call(
+            'NAME_OF_GROUP', 'pagure', 'new', 'upstream', [('mock_new', None)])
+        mock_checkpoint.save.assert_any_call(
+            'NAME_OF_GROUP', 'github', 'fetched', 'downstream', [('mock_fetched', 'mock_jira')])
+        self.assertEqual(mock_checkpoint.save.call_count, 3)
+
+    @mock.patch(PATH + 'checkpoint')
+    @mock.patch(PATH + 'run_group')
+    @mock.patch(PATH + 'load_config')
+    @mock.patch(PATH + 'parse_args')
+    def test_main_resume(self,
+                         mock_parse_args,
+                         mock_load_config,
+                         mock_run_group,
+                         mock_checkpoint):
+        """
+        Test 'main' function not sending a report twice when resuming
+        """
+        # Set up return values
+        mock_args = self._args(state_dir='mock_state_dir', resume=True)
+        mock_parse_args.return_value = mock_args
+        mock_load_config.return_value = self.mock_config
+        mock_checkpoint.sent.return_value = True
+
+        # Call the function
+        m.main()
+
+        # Assert everything was called correctly
+        mock_checkpoint.enable.assert_called_with('mock_state_dir', resume=True)
+        mock_checkpoint.sent.assert_called_with('NAME_OF_GROUP')
+        mock_run_group.assert_not_called()
+
+    @mock.patch(PATH + 'spool')
+    @mock.patch(PATH + 'checkpoint')
+    @mock.patch(PATH + 'run_group')
+    @mock.patch(PATH + 'load_config')
+    @mock.patch(PATH + 'parse_args')
+    def test_main_resume_spooled(self,
+                                 mock_parse_args,
+                                 mock_load_config,
+                                 mock_run_group,
+                                 mock_checkpoint,
+                                 mock_spool):
+        """
+        Test 'main' function delivering a report that was spooled but not
+        delivered before the run stopped
+        """
+        # Set up return values
+        mock_args = self._args(state_dir='mock_state_dir', resume=True,
+                               spool_dir='mock_spool_dir')
+        mock_parse_args.return_value = mock_args
+        mock_load_config.return_value = self.mock_config
+        mock_checkpoint.sent.return_value = False
+        mock_checkpoint.spooled_key.return_value = 'mock_key'
+
+        # Call the function
+        m.main()
+
+        # Assert everything was called correctly
+        mock_checkpoint.spooled_key.assert_called_with('NAME_OF_GROUP')
+        mock_spool.DeliveryWorker().put.assert_called_with('mock_key')
+        mock_run_group.assert_not_called()
+
+    @mock.patch(PATH + 'report_group')
+    @mock.patch(PATH + 'snapshot')
+    @mock.patch(PATH + 'd.sync_until')
+    @mock.patch(PATH + 'u.get_upstream_issues')
+    def test_run_group_deadline(self,
+                                mock_get_upstream_issues,
+                                mock_sync_until,
+                                mock_snapshot,
+                                mock_report_group):
+        """
+        Test 'run_group' function reporting the issues not checked in time
+        """
+        # Set up return values
+        mock_args = self._args(deadline=60, deadline_at=1000, snapshot_dir='mock_snapshot_dir')
+        mock_get_upstream_issues.return_value = 'mock_issues'
+        mock_snapshot.priorities_path.return_value = 'mock_path'
+        mock_snapshot.read_priorities.return_value = {'mock_url': 'Blocker'}
+        mock_sync_until.return_value = ('mock_out_of_sync', 'mock_missing', 'mock_unchecked')
+
+        # Call the function
+        with mock.patch(PATH + 'checkpoint') as mock_checkpoint:
+            mock_checkpoint.enabled.return_value = False
+            m.run_group('NAME_OF_GROUP', self.mock_config, mock_args)
+
+        # Assert everything was called correctly
+        mock_snapshot.priorities_path.assert_called_with('mock_snapshot_dir', 'NAME_OF_GROUP')
+        mock_sync_until.assert_called_with('mock_issues', self.mock_config, 1000,
+                                           {'mock_url': 'Blocker'}, None)
+        mock_snapshot.write_priorities.assert_called_with('mock_path', {'mock_url': 'Blocker'})
+        mock_report_group.assert_called_with(
+            'NAME_OF_GROUP', self.mock_config, mock_args, 'mock_out_of_sync', 'mock_missing',
+            '', None, True, unchecked_issues='mock_unchecked', estimates=None)
+
+    @mock.patch(PATH + 'report_group')
+    @mock.patch(PATH + 'sampling')
+    @mock.patch(PATH + 'd.sync_with_downstream')
+    @mock.patch(PATH + 'u.get_upstream_issues')
+    def test_run_group_sample(self,
+                              mock_get_upstream_issues,
+                              mock_sync_with_downstream,
+                              mock_sampling,
+                              mock_report_group):
+        """
+        Test 'run_group' function only comparing a sample with --sample
+        """
+        # Set up return values
+        mock_args = self._args(sample=0.1)
+        mock_get_upstream_issues.return_value = 'mock_issues'
+        mock_sampling.stratify.return_value = (['mock_sampled'], {'mock_repo': 10})
+        mock_sync_with_downstream.return_value = ('mock_out_of_sync', 'mock_missing')
+        mock_sampling.estimate.return_value = 'mock_estimates'
+
+        # Call the function
+        with mock.patch(PATH + 'checkpoint') as mock_checkpoint:
+            mock_checkpoint.enabled.return_value = False
+            m.run_group('NAME_OF_GROUP', self.mock_config, mock_args)
+
+        # Assert everything was called correctly
+        mock_sampling.stratify.assert_called_with('mock_issues', 0.1)
+        mock_sync_with_downstream.assert_called_with(['mock_sampled'], self.mock_config, None)
+        mock_sampling.estimate.assert_called_with({'mock_repo': 10}, 'mock_out_of_sync',
+                                                  'mock_missing')
+        mock_report_group.assert_called_with(
+            'NAME_OF_GROUP', self.mock_config, mock_args, 'mock_out_of_sync', 'mock_missing',
+            '', None, True, unchecked_issues=(), estimates='mock_estimates')
+
+    @mock.patch(PATH + 'm.send')
+    @mock.patch(PATH + 'format_check')
+    def test_report_group_partial(self,
+                                  mock_format_check,
+                                  mock_m_send):
+        """
+        Test 'report_group' function marking partial reports
+        """
+        # Set up return values
+        mock_args = self._args()
+        unchecked = MagicMock()
+        unchecked.source = 'github'
+        unchecked.title = 'mock_unchecked_title'
+
+        # Call the function
+        response = m.report_group('NAME_OF_GROUP', self.mock_config, mock_args,
+                                  [], [], '', unchecked_issues=[unchecked])
+
+        # Assert everything was called correctly
+        self.assertIn('Partial report', response)
+        self.assertIn('mock_unchecked_title', response)
+        mock_m_send.assert_called_with(['mock_email'], 'Jibe Report for NAME_OF_GROUP (partial)',
+                                       response)
+
+    @mock.patch(PATH + 'm.send')
+    @mock.patch(PATH + 'create_html')
+    @mock.patch(PATH + 'format_check')
+    def test_report_group_top(self,
+                              mock_format_check,
+                              mock_create_html,
+                              mock_m_send):
+        """
+        Test 'report_group' function only listing the issues kept by --top
+        """
+        # Set up return values
+        mock_args = self._args()
+        worst = MagicMock(priority='Minor')
+        worst.failed_checks.return_value = ['tags', 'title']
+        other = MagicMock(priority='Blocker')
+        other.failed_checks.return_value = ['tags']
+        top = m.d.TopIssues(1)
+        top.append(other)
+        top.append(worst)
+        mock_create_html.return_value = 'mock_html'
+
+        # Call the function
+        m.report_group('NAME_OF_GROUP', self.mock_config, mock_args, top, [], '')
+
+        # Assert everything was called correctly
+        mock_format_check.assert_called_with([worst])
+        mock_create_html.assert_called_with(
+            [worst], [], '', unchecked_issues=(), estimates=None,
+            left_out={'issues': 1, 'in_sync': 0, 'checks': {'tags': 1}}, compact=False)
+        mock_m_send.assert_called_with(['mock_email'], 'Jibe Report for NAME_OF_GROUP',
+                                       'mock_html')
+
+    @mock.patch(PATH + 'm')
+    @mock.patch(PATH + 'format_check')
+    def test_report_group_report_dir(self,
+                                     mock_format_check,
+                                     mock_m):
+        """
+        Test 'report_group' function mailing the report streamed to --report-dir
+        from its file
+        """
+        # Set up return values
+        report_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, report_dir)
+        mock_args = self._args(report_dir=report_dir)
+        mock_m.send_file.return_value = 10
+
+        # Call the function
+        response = m.report_group('NAME_OF_GROUP', self.mock_config, mock_args, [], [], '')
+
+        # Assert everything was called correctly
+        path = os.path.join(report_dir, 'NAME_OF_GROUP.html')
+        self.assertIsNone(response)
+        mock_m.send.assert_not_called()
+        mock_m.send_file.assert_called_with(['mock_email'], 'Jibe Report for NAME_OF_GROUP', path)
+        with io.open(path, encoding='utf-8') as fp:
+            self.assertIn('All your issues are in Sync!', fp.read())
+
+    def test_minify(self):
+        """
+        Test 'minify' function collapsing whitespace across chunks
+        """
+        # Call the function
+        response = list(m.minify(['\n<p>\n  <b>a', '  b</b>  ', '\n<i>c</i> <i>d', '</i>\n',
+                                  '  <hr>  ']))
+
+        # Assert everything was called correctly
+        self.assertEqual(''.join(response), '<p><b>a b</b> <i>c</i> <i>d</i><hr>')
+        # Inline gaps survive line breaks, the gaps at block tags split
+        # over chunks are dropped
+        self.assertEqual(''.join(m.minify(['<li>\n  <b>Possible matches:</b>\n  <a>F-1</a>\n',
+                                           '  <span>(90%)</span>\n  </l', 'i>\n  <d', 'iv> x</div>'])),
+                         '<li><b>Possible matches:</b> <a>F-1</a> <span>(90%)</span></li><div>x</div>')
+
+    def test_create_html_compact(self):
+        """
+        Test 'create_html' function rendering the compact report
+        """
+        # Set up return values
+        issue = MagicMock(priority='Blocker', upstream_title='[org/repo] mock_title', done=1, total=2,
+                          percent_done=50, check=['tags'])
+        issue.out_of_sync = {'tags': {'difference': ['a'], 'downstream': ['a', 'b'],
+                                      'upstream': ['b']}}
+        missing = MagicMock(source='github', title='mock_missing', candidates=())
+
+        # Call the function
+        response = m.create_html([issue], [missing], '', compact=True)
+        output = io.StringIO()
+        size = m.create_html([issue], [missing], '', output=output, compact=True)
+
+        # Assert everything was called correctly
+        self.assertEqual(output.getvalue(), response)
+        self.assertEqual(size, len(response))
+        self.assertNotIn('\n', response)
+        self.assertIn('<img class="pi" src="cid:blocker_priority_image" alt=""> Blocker', response)
+        self.assertIn('<li><b>Downstream:</b> a, b</li>', response)
+        self.assertIn('[github] mock_missing', response)
+
+    def test_create_html_compact_text(self):
+        """
+        Test 'create_html' function renders the same text in the compact and
+        the full report
+        """
+        # Set up return values
+        issue = MagicMock(priority='Blocker', upstream_title='[org/repo] mock_title', url='mock_url',
+                          downstream_url='mock_downstream_url', downstream_id='FACTORY-9', done=1, total=6,
+                          percent_done=16, check=['comments', 'tags', 'fixVersion', 'assignee', 'title',
+                                                  'transition'])
+        issue.out_of_sync = {
+            'comments': ['mock_comment'],
+            'tags': {'difference': ['a'], 'downstream': ['a', 'b'], 'upstream': ['b']},
+            'fixVersion': {'difference': ['1'], 'downstream': ['1'], 'upstream': []},
+            'assignee': {'downstream': 'mock_downstream', 'upstream': 'mock_upstream'},
+            'title': 'in-sync',
+            'transition': {'upstream-close-downstream-open': {'downstream': 'Open', 'upstream': 'Closed'}}}
+        in_sync = MagicMock(priority='Major', upstream_title='[org/repo] mock_in_sync', url='mock_url',
+                            downstream_url='mock_downstream_url', downstream_id='FACTORY-8', done=1, total=1,
+                            percent_done=100, check=['title'])
+        missing = MagicMock(source='github', title='mock_missing', url='mock_url', candidates=[
+            MagicMock(url='mock_url', summary='mock_summary', key='FACTORY-1', score=0.9),
+            MagicMock(url='mock_url', summary='mock_summary', key='FACTORY-2', score=0.5)])
+        unchecked = MagicMock(source='pagure', title='mock_unchecked', url='mock_url')
+        estimates = {'sampled': 5, 'population': 50, 'rows': [
+            {'name': 'Out of sync', 'rate': 0.5, 'low': 0.2, 'high': 0.8, 'sampled': 5},
+            {'name': 'tags', 'rate': None, 'low': None, 'high': None, 'sampled': 0}]}
+        kwargs = {'unchecked_issues': [unchecked], 'estimates': estimates,
+                  'left_out': {'issues': 3, 'in_sync': 1, 'checks': {'tags': 2}}}
+
+        # Call the function
+        full = m.create_html([issue, in_sync], [missing], 'mock_joke', **kwargs)
+        compact = m.create_html([issue, in_sync], [missing], 'mock_joke', compact=True, **kwargs)
+
+        # Assert everything was called correctly
+        self.assertEqual(_TextContent(compact).lines, _TextContent(full).lines)
+        self.assertIn('Possible matches: FACTORY-1 (90%) FACTORY-2 (50%)', _TextContent(compact).lines)
+        self.assertIn('[org/repo] mock_in_sync / FACTORY-8 \u2714', _TextContent(compact).lines)
+
+    def test_create_html_escapes(self):
+        """
+        Test 'create_html' function escapes the text of the issues in both
+        reports
+        """
+        # Set up return values
+        script = '<script>alert(1)</script>'
+        issue = MagicMock(priority='Major', upstream_title='[org/repo] ' + script, url='mock_url',
+                          downstream_url='mock_downstream_url', downstream_id='FACTORY-9', done=0, total=2,
+                          percent_done=0, check=['tags', 'assignee', 'title', 'transition'])
+        issue.out_of_sync = {'tags': {'difference': [script], 'downstream': [], 'upstream': [script]},
+                             'assignee': {'downstream': script, 'upstream': 'mock_assignee'},
+                             'title': {'downstream': 'mock_title', 'upstream': script},
+                             'transition': {'upstream-close-downstream-open': {'downstream': script,
+                                                                               'upstream': 'Closed'}}}
+        missing = MagicMock(source='github', title=script, url='mock_url', candidates=[
+            MagicMock(url='mock_url', summary='"><img src=x onerror=alert(1)>', key='FACTORY-1', score=0.9)])
+        unchecked = MagicMock(source='pagure', title=script, url='mock_url')
+
+        for compact in (False, True):
+            # Call the function
+            response = m.create_html([issue], [missing], script, compact=compact,
+                                     unchecked_issues=[unchecked])
+
+            # Assert everything was called correctly
+            self.assertNotIn('<script>', response)
+            self.assertNotIn('<img src=x', response)
+            self.assertIn('&lt;script&gt;alert(1)&lt;/script&gt;', response)
+            self.assertIn('title="&quot;&gt;&lt;img src=x onerror=alert(1)&gt;"', response)
+            self.assertEqual(response.count('&lt;script&gt;'), 9)
+
+    def test_create_text(self):
+        """
+        Test 'create_text' function summing up a report
+        """
+        # Set up return values
+        in_sync = MagicMock()
+        in_sync.failed_checks.return_value = []
+        out_of_sync = MagicMock()
+        out_of_sync.failed_checks.return_value = ['tags', 'title']
+        left_out = {'issues': 3, 'in_sync': 1, 'checks': {'tags': 2}}
+
+        # Call the function
+        response = m.create_text('NAME_OF_GROUP', [in_sync, out_of_sync], ['mock_missing'],
+                                 left_out=left_out)
+
+        # Assert everything was called correctly
+        self.assertIn('3 issue(s) out of sync\n  tags: 3\n  title: 1\n'
+                      '1 issue(s) without JIRA issue\n', response)
+        self.assertIn('NAME_OF_GROUP.html.gz', response)
+
+    @mock.patch(PATH + 'create_text')
+    @mock.patch(PATH + 'm.send')
+    @mock.patch(PATH + 'format_check')
+    def test_report_group_compact(self,
+                                  mock_format_check,
+                                  mock_m_send,
+                                  mock_create_text):
+        """
+        Test 'report_group' function sending the compact report
+        """
+        # Set up return values
+        mock_args = self._args(compact=True)
+        mock_create_text.return_value = 'mock_text'
+        mock_m_send.return_value = 1234
+
+        # Call the function
+        response = m.report_group('NAME_OF_GROUP', self.mock_config, mock_args, [], [], '')
+
+        # Assert everything was called correctly
+        self.assertIn('<style>', response)
+        mock_m_send.assert_called_with(['mock_email'], 'Jibe Report for NAME_OF_GROUP', response,
+                                       plain='mock_text', attachment='NAME_OF_GROUP.html.gz')
+        self.assertEqual(m.metrics.to_dict()['emails'],
+                         {'NAME_OF_GROUP': {'messages': 1, 'bytes': 1234}})
+
+    def test_parse_duration(self):
+        """
+        Test 'parse_args' function parsing --deadline
+        """
+        # Call the function
+        response = [m.parse_args(['--deadline', value]).deadline
+                    for value in ('90', '90s', '45m', '1h30m', '2h')]
+
+        # Assert everything was called correctly
+        self.assertEqual(response, [90, 90, 2700, 5400, 7200])
+        for value in ('', 'soon', '5d'):
+            with self.assertRaises(SystemExit):
+                m.parse_args(['--deadline', value])
+
+    def test_parse_sample(self):
+        """
+        Test 'parse_args' function parsing --sample
+        """
+        # Call the function
+        response = [m.parse_args(['--sample', value]).sample for value in ('200', '0.1')]
+
+        # Assert everything was called correctly
+        self.assertEqual(response, [200, 0.1])
+        for value in ('0', '1.5', '-3', 'some'):
+            with self.assertRaises(SystemExit):
+                m.parse_args(['--sample', value])
+
+    def test_parse_top(self):
+        """
+        Test 'parse_args' function parsing --top
+        """
+        # Call the function
+        response = m.parse_args(['--top', '25']).top
+
+        # Assert everything was called correctly
+        self.assertEqual(response, 25)
+        for value in ('0', '-3', '2.5', 'some'):
+            with self.assertRaises(SystemExit):
+                m.parse_args(['--top', value])
+
+    def test_parse_shard(self):
+        """
+        Test 'parse_args' function parsing --shard
+        """
+        # Call the function
+        response = m.parse_args(['fetch', '--shard', '2/3'])
+
+        # Assert everything was called correctly
+        self.assertEqual(response.shard, (2, 3))
+        for value in ('0/3', '4/3', 'two'):
+            with self.assertRaises(SystemExit):
+                m.parse_args(['fetch', '--shard', value])
+
+    @mock.patch(PATH + 'linking')
+    @mock.patch(PATH + 'attach_link')
+    @mock.patch(PATH + 'load_config')
+    @mock.patch(PATH + 'parse_args')
+    def test_main_link_issues_from(self,
+                                   mock_parse_args,
+                                   mock_load_config,
+                                   mock_attach_link,
+                                   mock_linking):
+        """
+        Test 'main' function adding the links of a file
+        """
+        # Set up return values
+        mock_args = self._args(link_issues_from='mock_file.csv', jobs=8)
+        mock_parse_args.return_value = mock_args
+        mock_load_config.return_value = self.mock_config
+
+        # Call the function
+        m.main()
+
+        # Assert everything was called correctly
+        mock_linking.read_links.assert_called_with('mock_file.csv', self.mock_config)
+        mock_linking.link_all.assert_called_with(
+            mock_linking.read_links.return_value, self.mock_config, 8)
+        mock_attach_link.assert_not_called()
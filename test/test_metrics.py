@@ -0,0 +1,115 @@
+# Built In Modules
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+# Local Modules
+import jibe.metrics as metrics
+
+
+class TestMetrics(unittest.TestCase):
+    """
+    This class tests the metrics.py file under jibe
+    """
+    def setUp(self):
+        self.metrics = metrics.Metrics()
+
+    def test_timer(self):
+        """
+        Tests 'timer' function adds up the time per phase and group
+        """
+        # Call the function
+        with self.metrics.timer('upstream', 'mock_group'):
+            pass
+        with self.metrics.timer('upstream', 'mock_group'):
+            pass
+
+        # Assert everything was called correctly
+        response = self.metrics.to_dict()
+        self.assertEqual(list(response['phases']['upstream'].keys()), ['mock_group'])
+
+    def test_request(self):
+        """
+        Tests 'request' function counts requests, errors and latency
+        """
+        # Call the function
+        with self.metrics.request('jira.search'):
+            pass
+        with self.assertRaises(IOError):
+            with self.metrics.request('jira.search'):
+                raise IOError()
+
+        # Assert everything was called correctly
+        response = self.metrics.to_dict()
+        self.assertEqual(response['requests'], {'jira.search': 2})
+        self.assertEqual(response['errors'], {'jira.search': 1})
+        self.assertEqual(response['latency']['jira.search']['buckets']['0.05'], 2)
+
+    def test_cache(self):
+        """
+        Tests 'cache' function computes the hit ratio
+        """
+        # Call the function
+        self.metrics.cache('jira_client', False)
+        self.metrics.cache('jira_client', True)
+        self.metrics.cache('jira_client', True)
+        self.metrics.cache('jira_client', True)
+
+        # Assert everything was called correctly
+        self.assertEqual(self.metrics.to_dict()['caches']['jira_client'],
+                         {'hits': 3, 'misses': 1, 'hit_ratio': 0.75})
+
+    def test_email(self):
+        """
+        Tests 'email' function adds up the emails and bytes per group
+        """
+        # Call the function
+        self.metrics.email('mock_group', 100)
+        self.metrics.email('mock_group', 50)
+        self.metrics.email(None, 10)
+
+        # Assert everything was called correctly
+        self.assertEqual(self.metrics.to_dict()['emails'],
+                         {'mock_group': {'messages': 2, 'bytes': 150},
+                          'all': {'messages': 1, 'bytes': 10}})
+        self.assertIn('jibe_email_bytes_total{group="mock_group"} 150\n',
+                      self.metrics.to_prometheus())
+
+    def test_to_prometheus(self):
+        """
+        Tests 'to_prometheus' function
+        """
+        # Set up return values
+        self.metrics.observe('github.issues', 0.2)
+        self.metrics.observe('github.issues', 3.0)
+        self.metrics.retry('smtp')
+        self.metrics.coalesce('github.users')
+
+        # Call the function
+        response = self.metrics.to_prometheus()
+
+        # Assert everything was called correctly
+        self.assertIn('jibe_requests_total{family="github.issues"} 2\n', response)
+        self.assertIn('jibe_request_duration_seconds_bucket{family="github.issues",le="0.25"} 1\n', response)
+        self.assertIn('jibe_request_duration_seconds_bucket{family="github.issues",le="+Inf"} 2\n', response)
+        self.assertIn('jibe_request_duration_seconds_count{family="github.issues"} 2\n', response)
+        self.assertIn('jibe_retries_total{family="smtp"} 1\n', response)
+        self.assertIn('jibe_coalesced_requests_total{family="github.users"} 1\n', response)
+
+    def test_write(self):
+        """
+        Tests 'write' function writes both files
+        """
+        # Set up return values
+        metrics_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, metrics_dir)
+
+        # Call the function
+        metrics.write(metrics_dir)
+
+        # Assert everything was called correctly
+        with open(os.path.join(metrics_dir, 'jibe-metrics.json')) as fp:
+            self.assertIn('requests', json.load(fp))
+        self.assertTrue(os.path.exists(os.path.join(metrics_dir, 'jibe.prom')))
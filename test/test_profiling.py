@@ -0,0 +1,54 @@
+# Built In Modules
+import os
+import pstats
+import shutil
+import tempfile
+import unittest
+
+# Local Modules
+import jibe.profiling as p
+
+
+class TestProfiling(unittest.TestCase):
+    """
+    This class tests the profiling.py file under jibe
+    """
+    def setUp(self):
+        self.profile_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        p.disable()
+        shutil.rmtree(self.profile_dir)
+
+    def test_phase_disabled(self):
+        """
+        Tests 'phase' function does nothing when profiling is off
+        """
+        # Call the function
+        with p.phase('mock_phase'):
+            pass
+        p.write()
+
+        # Assert everything was called correctly
+        self.assertEqual(os.listdir(self.profile_dir), [])
+
+    def test_phase(self):
+        """
+        Tests 'phase' function writes a profile and an allocation summary per phase
+        """
+        # Set up return values
+        p.enable(self.profile_dir, cpu=True, memory=True)
+
+        # Call the function
+        with p.phase('mock_phase'):
+            data = [str(number) for number in range(10000)]
+        with p.phase('mock_phase'):
+            data += [str(number) for number in range(10000)]
+        p.write()
+
+        # Assert everything was called correctly
+        self.assertEqual(sorted(os.listdir(self.profile_dir)),
+                         ['mock_phase-memory.txt', 'mock_phase.pstats'])
+        pstats.Stats(os.path.join(self.profile_dir, 'mock_phase.pstats'))
+        with open(os.path.join(self.profile_dir, 'mock_phase-memory.txt')) as fp:
+            self.assertIn('test_profiling.py', fp.read())
@@ -0,0 +1,136 @@
+# Built In Modules
+import random
+import unittest
+from collections import OrderedDict
+
+# Local Modules
+import jibe.sampling as s
+from jibe.intermediary import IN_SYNC_STATE, OUT_OF_SYNC_STATE
+
+# Global Variables
+PATH = 'jibe.sampling.'
+
+
+class _Issue(object):
+    """ Just what the estimates look at """
+    def __init__(self, repo, downstream, out_of_sync=()):
+        self.source = 'github'
+        self.upstream = repo
+        self.downstream = downstream
+        self.failed = list(out_of_sync)
+
+    def sync_state(self, name):
+        return OUT_OF_SYNC_STATE if name in self.failed else IN_SYNC_STATE
+
+    def failed_checks(self):
+        return self.failed
+
+
+class TestSampling(unittest.TestCase):
+    """
+    This class tests the sampling.py file under jibe
+    """
+    def setUp(self):
+        self.mock_downstream = {'check': ['tags', 'title']}
+        self.mock_issues = [_Issue('org/big', self.mock_downstream) for _ in range(90)] + \
+                           [_Issue('org/small', self.mock_downstream) for _ in range(10)]
+
+    def test_stratify(self):
+        """
+        Tests 'stratify' samples every repo in proportion to its issues
+        """
+        # Call the function
+        sample, population = s.stratify(self.mock_issues, 20, random.Random(1))
+
+        # Assert everything was called correctly
+        self.assertEqual(population, OrderedDict([(('github', 'org/big'), 90),
+                                                  (('github', 'org/small'), 10)]))
+        self.assertEqual(len(sample), 20)
+        self.assertEqual(sum(1 for issue in sample if issue.upstream == 'org/small'), 2)
+        self.assertEqual(sample, [issue for issue in self.mock_issues if issue in sample])
+
+    def test_stratify_small_repo(self):
+        """
+        Tests 'stratify' keeps every repo in the sample
+        """
+        # Call the function
+        by_size, _ = s.stratify(self.mock_issues, 5, random.Random(1))
+        by_fraction, _ = s.stratify(self.mock_issues, 0.02, random.Random(1))
+        everything, _ = s.stratify(self.mock_issues, 1000, random.Random(1))
+
+        # Assert everything was called correctly
+        self.assertEqual(set(issue.upstream for issue in by_size), {'org/big', 'org/small'})
+        self.assertEqual(len(by_size), 5)
+        self.assertEqual(len(by_fraction), 2 + 1)
+        self.assertEqual(everything, self.mock_issues)
+
+    def test_estimate_census(self):
+        """
+        Tests 'estimate' is exact when every issue was compared
+        """
+        # Set up return values
+        for issue in self.mock_issues[:30]:
+            issue.failed = ['tags']
+        _, population = s.stratify(self.mock_issues, 1000)
+
+        # Call the function
+        response = s.estimate(population, self.mock_issues[:-10], self.mock_issues[-10:])
+
+        # Assert everything was called correctly
+        rows = dict((row['name'], row) for row in response['rows'])
+        self.assertEqual((response['sampled'], response['population']), (100, 100))
+        self.assertEqual(list(rows), ['Without JIRA issue', 'Out of sync', 'tags', 'title'])
+        self.assertEqual((rows['Without JIRA issue']['rate'], rows['Without JIRA issue']['low'],
+                          rows['Without JIRA issue']['high']), (0.1, 0.1, 0.1))
+        self.assertAlmostEqual(rows['tags']['rate'], 30 / 90.0)
+        self.assertEqual(rows['title']['rate'], 0.0)
+        self.assertEqual(rows['title']['high'], 0.0)
+
+    def test_estimate_sample(self):
+        """
+        Tests 'estimate' weighs repos by their size and bounds the rates
+        """
+        # Set up return values
+        other = {'check': ['title']}
+        big = [_Issue('org/big', self.mock_downstream, ['tags'] if index % 2 else [])
+               for index in range(10)]
+        small = [_Issue('org/small', other) for _ in range(5)]
+        population = OrderedDict([(('github', 'org/big'), 900), (('github', 'org/small'), 100)])
+
+        # Call the function
+        response = s.estimate(population, big + small, [])
+
+        # Assert everything was called correctly
+        rows = dict((row['name'], row) for row in response['rows'])
+        self.assertAlmostEqual(rows['Out of sync']['rate'], 0.9 * 0.5)
+        self.assertLess(rows['Out of sync']['low'], 0.45)
+        self.assertGreater(rows['Out of sync']['high'], 0.45)
+        # Only org/big checks tags
+        self.assertEqual((rows['tags']['rate'], rows['tags']['sampled']), (0.5, 10))
+        # Nothing out of sync in the sample is not proof of a rate of 0
+        self.assertEqual(rows['title']['rate'], 0.0)
+        self.assertGreater(rows['title']['high'], 0.0)
+        self.assertEqual(rows['Without JIRA issue']['rate'], 0.0)
+
+    def test_estimate_linked(self):
+        """
+        Tests 'estimate' weighs the checks of a repo by its issues with a
+        JIRA issue
+        """
+        # Set up return values
+        linked = [_Issue('org/linked', self.mock_downstream) for _ in range(10)]
+        unlinked = [_Issue('org/unlinked', self.mock_downstream, ['tags']) for _ in range(2)]
+        missing = [_Issue('org/unlinked', self.mock_downstream) for _ in range(8)]
+        population = OrderedDict([(('github', 'org/linked'), 10), (('github', 'org/unlinked'), 10)])
+
+        # Call the function
+        response = s.estimate(population, linked + unlinked, missing)
+
+        # Assert everything was called correctly
+        rows = dict((row['name'], row) for row in response['rows'])
+        # Every issue was compared, so the rates are exact
+        for name in ('Out of sync', 'tags'):
+            self.assertAlmostEqual(rows[name]['rate'], 2 / 12.0)
+            self.assertAlmostEqual(rows[name]['low'], 2 / 12.0)
+            self.assertAlmostEqual(rows[name]['high'], 2 / 12.0)
+        self.assertEqual(rows['Without JIRA issue']['rate'], 0.4)
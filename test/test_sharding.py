@@ -0,0 +1,117 @@
+# Built In Modules
+import os
+import shutil
+import tempfile
+import unittest
+
+# Local Modules
+import jibe.sharding as sh
+import jibe.snapshot as snapshot
+
+# Global Variables
+PATH = 'jibe.sharding.'
+
+
+def _record(source, repo, number):
+    return {'issue': {'source': source, 'upstream': repo, 'id': number},
+            'downstream': None}
+
+
+class TestSharding(unittest.TestCase):
+    """
+    This class tests the sharding.py file under jibe
+    """
+    def setUp(self):
+        self.mock_config = {
+            'jibe': {
+                'send-to': {
+                    'NAME_OF_GROUP': {
+                        'upstream': {
+                            'github': dict(('org/repo%i' % index, {}) for index in range(10)),
+                            'pagure': {'mock_repo': {}},
+                        }
+                    }
+                }
+            }
+        }
+        self.snapshot_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.snapshot_dir)
+
+    def _fetch(self, count, records_per_repo=2):
+        """ Writes the partial snapshots like 'jibe fetch --shard' """
+        for index in range(1, count + 1):
+            repos = sh.shard_repos(self.mock_config, 'NAME_OF_GROUP', index, count)
+            if not repos and sh.shard_of(count, 'NAME_OF_GROUP') != index:
+                continue
+            records = [_record(source, repo, number)
+                       for source, repo in sh.units(self.mock_config, 'NAME_OF_GROUP')
+                       if (source, repo) in repos
+                       for number in range(records_per_repo)]
+            snapshot.write_records(
+                sh.shard_path(self.snapshot_dir, 'NAME_OF_GROUP', index, count),
+                'NAME_OF_GROUP', records, 'joke %i' % index, created=index)
+
+    def test_shard_repos(self):
+        """
+        Tests 'shard_repos' puts every repo in exactly one shard
+        """
+        # Call the function
+        response = [sh.shard_repos(self.mock_config, 'NAME_OF_GROUP', index, 4)
+                    for index in range(1, 5)]
+
+        # Assert everything was called correctly
+        self.assertEqual(sum(len(repos) for repos in response), 11)
+        self.assertEqual(set().union(*response),
+                         set(sh.units(self.mock_config, 'NAME_OF_GROUP')))
+        self.assertEqual(sh.shard_of(4, 'NAME_OF_GROUP', 'github', 'org/repo1'),
+                         sh.shard_of(4, 'NAME_OF_GROUP', 'github', 'org/repo1'))
+
+    def test_merge(self):
+        """
+        Tests 'merge' puts the records in config order for any shard count
+        """
+        expected = [_record(source, repo, number)
+                    for source, repo in sh.units(self.mock_config, 'NAME_OF_GROUP')
+                    for number in range(2)]
+        for count in (1, 3, 5):
+            # Set up return values
+            self._fetch(count)
+
+            # Call the function
+            response = sh.merge(self.snapshot_dir, 'NAME_OF_GROUP', self.mock_config)
+
+            # Assert everything was called correctly
+            header, records = snapshot.read_snapshot(
+                snapshot.snapshot_path(self.snapshot_dir, 'NAME_OF_GROUP'))
+            self.assertEqual(response, 22)
+            self.assertEqual(list(records), expected)
+            self.assertEqual(header['joke'], 'joke %i' % sh.shard_of(count, 'NAME_OF_GROUP'))
+            self.assertEqual(os.listdir(self.snapshot_dir), ['NAME_OF_GROUP.msgpack'])
+
+    def test_merge_missing_shard(self):
+        """
+        Tests 'merge' refuses to merge without all shards
+        """
+        # Set up return values
+        self._fetch(3)
+        os.remove(sh.shard_path(self.snapshot_dir, 'NAME_OF_GROUP', 2, 3))
+
+        # Call the function
+        with self.assertRaises(IOError):
+            sh.merge(self.snapshot_dir, 'NAME_OF_GROUP', self.mock_config)
+
+    def test_shard_count_mixed(self):
+        """
+        Tests 'shard_count' refuses partial snapshots of different runs
+        """
+        # Set up return values
+        self._fetch(2)
+        self._fetch(3)
+
+        # Call the function
+        with self.assertRaises(ValueError):
+            sh.shard_count(self.snapshot_dir, 'NAME_OF_GROUP')
+        with self.assertRaises(IOError):
+            sh.shard_count(self.snapshot_dir, 'OTHER_GROUP')
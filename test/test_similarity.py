@@ -0,0 +1,196 @@
+# Built In Modules
+import mock
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+try:
+    # Python 3.3 >
+    from unittest.mock import MagicMock  # noqa: F401
+except ImportError:
+    from mock import MagicMock  # noqa: F401
+
+# Local Modules
+import jibe.linking as linking
+import jibe.similarity as similarity
+
+# Global Variables
+PATH = 'jibe.similarity.'
+SUMMARIES = [
+    ('FACTORY-1', '[org/repo] Crash when the config file is missing'),
+    ('FACTORY-2', 'Add a dark theme to the web UI'),
+    ('FACTORY-3', 'Document the release process'),
+    ('FACTORY-4', 'Crash on startup with an empty cache'),
+]
+
+
+class TestSimilarity(unittest.TestCase):
+    """
+    This class tests the similarity.py file under jibe
+    """
+    def setUp(self):
+        similarity._indexes.clear()
+        self.mock_config = {
+            'jibe': {
+                'default_jira_instance': 'mock_jira',
+                'jira': {'mock_jira': {'options': {'server': 'mock_server'}}},
+            }
+        }
+        self.mock_issue = MagicMock()
+        self.mock_issue.title = 'Crash if config file is missing'
+        self.mock_issue.url = 'mock_url'
+        self.mock_issue.downstream = {'project': 'FACTORY'}
+        self.suggestion_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.suggestion_dir)
+
+    def test_normalize(self):
+        """
+        Tests 'normalize' function drops the upstream prefix and punctuation
+        """
+        # Call the function
+        response = similarity.normalize('[org/repo] Fix: "jibe --help" is SLOW!')
+
+        # Assert everything was called correctly
+        self.assertEqual(response, ['fix', 'jibe', 'help', 'is', 'slow'])
+
+    def test_candidates(self):
+        """
+        Tests 'TitleIndex.candidates' ranks the closest summary first
+        """
+        # Set up return values
+        index = similarity.TitleIndex(SUMMARIES)
+
+        # Call the function
+        response = index.candidates('Crash if config file is missing')
+
+        # Assert everything was called correctly
+        self.assertEqual(response[0][0], 'FACTORY-1')
+        self.assertNotIn('FACTORY-2', [key for key, _, _ in response])
+        self.assertEqual(index.candidates('Unrelated words entirely'), [])
+        self.assertEqual(index.candidates(''), [])
+
+    def test_candidates_exclude(self):
+        """
+        Tests 'TitleIndex.candidates' leaves out excluded keys
+        """
+        # Set up return values
+        index = similarity.TitleIndex(SUMMARIES)
+
+        # Call the function
+        response = index.candidates('Crash if config file is missing',
+                                    exclude={'FACTORY-1'})
+
+        # Assert everything was called correctly
+        self.assertNotIn('FACTORY-1', [key for key, _, _ in response])
+
+    def test_sweep(self):
+        """
+        Tests 'sweep' function reads every page of the project
+        """
+        # Set up return values
+        pages = []
+        for start in (0, 2):
+            # Like jira.client.ResultList
+            page = type('ResultList', (list,), {'total': 4})()
+            for key, summary in SUMMARIES[start:start + 2]:
+                mock_issue = MagicMock()
+                mock_issue.key = key
+                mock_issue.fields.summary = summary
+                page.append(mock_issue)
+            pages.append(page)
+        mock_client = MagicMock()
+        mock_client.search_issues.side_effect = pages
+
+        # Call the function
+        response = list(similarity.sweep(mock_client, 'FACTORY'))
+
+        # Assert everything was called correctly
+        self.assertEqual(response, SUMMARIES)
+        self.assertEqual(mock_client.search_issues.call_count, 2)
+        mock_client.search_issues.assert_called_with(
+            'project = "FACTORY" ORDER BY key', startAt=2,
+            maxResults=similarity.PAGE_SIZE, fields='summary')
+
+    @mock.patch(PATH + 'sweep')
+    @mock.patch(PATH + 'd')
+    def test_suggest(self,
+                     mock_d,
+                     mock_sweep):
+        """
+        Tests 'suggest' function indexes each project once
+        """
+        # Set up return values
+        mock_sweep.return_value = iter(SUMMARIES)
+        mock_other = MagicMock()
+        mock_other.downstream = {}
+
+        # Call the function
+        similarity.suggest([self.mock_issue, mock_other], self.mock_config)
+        similarity.suggest([self.mock_issue], self.mock_config)
+
+        # Assert everything was called correctly
+        mock_sweep.assert_called_once_with(
+            mock_d.get_jira_instance_client.return_value, 'FACTORY')
+        mock_d.get_jira_instance_client.assert_called_once_with(
+            'mock_jira', self.mock_config)
+        self.assertEqual(self.mock_issue.candidates[0]['key'], 'FACTORY-1')
+        self.assertEqual(self.mock_issue.candidates[0]['url'],
+                         'mock_server/browse/FACTORY-1')
+
+    @mock.patch(PATH + 'sweep')
+    @mock.patch(PATH + 'd')
+    def test_get_index_concurrent(self,
+                                  mock_d,
+                                  mock_sweep):
+        """
+        Tests 'get_index' function does not hold the other projects while
+        it sweeps one
+        """
+        # Set up return values
+        sweeping = threading.Event()
+        release = threading.Event()
+
+        def sweep(client, project):
+            if project == 'SLOW':
+                sweeping.set()
+                release.wait(5)
+            return iter(SUMMARIES)
+        mock_sweep.side_effect = sweep
+        slow = threading.Thread(target=similarity.get_index,
+                                args=('mock_jira', 'SLOW', self.mock_config))
+        slow.start()
+        sweeping.wait(5)
+
+        # Call the function
+        response = similarity.get_index('mock_jira', 'FACTORY', self.mock_config)
+
+        # Assert everything was called correctly
+        self.assertEqual(len(response), len(SUMMARIES))
+        self.assertTrue(slow.is_alive())
+        release.set()
+        slow.join(5)
+        self.assertEqual(sorted(similarity._indexes),
+                         [('mock_jira', 'FACTORY'), ('mock_jira', 'SLOW')])
+
+    def test_write_suggestions(self):
+        """
+        Tests 'write_suggestions' writes a file --link-issues-from reads
+        """
+        # Set up return values
+        self.mock_issue.candidates = [{'key': 'FACTORY-1', 'url': 'mock_link',
+                                       'summary': 'mock_summary', 'score': 0.9}]
+        mock_other = MagicMock()
+        mock_other.candidates = []
+        path = os.path.join(self.suggestion_dir, 'links.csv')
+
+        # Call the function
+        response = similarity.write_suggestions(path, [self.mock_issue, mock_other],
+                                                self.mock_config)
+
+        # Assert everything was called correctly
+        self.assertEqual(response, 1)
+        self.assertEqual(list(linking.read_links(path, self.mock_config).items()),
+                         [(('mock_jira', 'FACTORY-1'), ['mock_url'])])
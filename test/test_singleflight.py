@@ -0,0 +1,97 @@
+# Built In Modules
+import threading
+import unittest
+
+# Local Modules
+from jibe import metrics
+from jibe.singleflight import Group
+
+
+class TestSingleflight(unittest.TestCase):
+    """
+    This class tests the singleflight.py file under jibe
+    """
+    def setUp(self):
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+        self.group = Group('mock.family')
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.calls = []
+
+    def _lookup(self, key, error=None):
+        self.calls.append(key)
+        self.started.set()
+        self.release.wait(5)
+        if error:
+            raise error
+        return 'result of %s' % key
+
+    def _run(self, count, key, error=None):
+        """ Starts count lookups of key, the first one is in flight before the others """
+        results = []
+
+        def lookup():
+            try:
+                results.append(self.group.do(key, self._lookup, key, error))
+            except Exception as exception:
+                results.append(exception)
+
+        threads = [threading.Thread(target=lookup) for _ in range(count)]
+        threads[0].start()
+        self.started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        # Wait until the others are waiting for the first lookup
+        while metrics.to_dict()['coalesced'].get('mock.family', 0) < count - 1:
+            threading.Event().wait(0.01)
+        self.release.set()
+        for thread in threads:
+            thread.join(5)
+        return results
+
+    def test_do(self):
+        """
+        Tests 'do' shares one lookup between concurrent callers of the same key
+        """
+        # Call the function
+        results = self._run(4, 'mock_key')
+
+        # Assert everything was called correctly
+        self.assertEqual(self.calls, ['mock_key'])
+        self.assertEqual(results, ['result of mock_key'] * 4)
+        self.assertEqual(metrics.to_dict()['coalesced'], {'mock.family': 3})
+        # Nothing is kept once it is done
+        self.assertEqual(self.group.do('mock_key', self._lookup, 'mock_key'), 'result of mock_key')
+        self.assertEqual(self.calls, ['mock_key'] * 2)
+
+    def test_do_error(self):
+        """
+        Tests 'do' raises the exception of the shared lookup in every caller
+        """
+        # Set up return values
+        error = IOError('mock_error')
+
+        # Call the function
+        results = self._run(3, 'mock_key', error)
+
+        # Assert everything was called correctly
+        self.assertEqual(self.calls, ['mock_key'])
+        self.assertEqual(results, [error] * 3)
+        self.assertEqual(self.group._calls, {})
+
+    def test_do_other_keys(self):
+        """
+        Tests 'do' does not hold lookups of other keys
+        """
+        # Set up return values
+        self.release.set()
+
+        # Call the function
+        first = self.group.do('first', self._lookup, 'first')
+        second = self.group.do('second', self._lookup, 'second')
+
+        # Assert everything was called correctly
+        self.assertEqual((first, second), ('result of first', 'result of second'))
+        self.assertEqual(self.calls, ['first', 'second'])
+        self.assertEqual(metrics.to_dict()['coalesced'], {})
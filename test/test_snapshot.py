@@ -0,0 +1,224 @@
+# Built In Modules
+import io
+import mock
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+try:
+    # Python 3.3 >
+    from unittest.mock import MagicMock  # noqa: F401
+except ImportError:
+    from mock import MagicMock  # noqa: F401
+
+# Local Modules
+import jibe.downstream as d
+import jibe.snapshot as s
+from jibe.intermediary import Issue
+
+# Global Variables
+PATH = 'jibe.snapshot.'
+
+
+class TestSnapshot(unittest.TestCase):
+    """
+    This class tests the snapshot.py file under jibe
+    """
+    def setUp(self):
+        self.snapshot_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.snapshot_dir, 'mock_group.msgpack')
+        self.mock_config = {
+            'jibe': {
+                'default_jira_instance': 'mock_jira',
+                'jira': {'mock_jira': {'options': {'server': 'mock_server'}}},
+                'send-to': {
+                    'mock_group': {
+                        'upstream': {
+                            'github': {
+                                'org/repo': {'check': ['comments', 'tags', 'assignee']},
+                            },
+                        },
+                    },
+                },
+            },
+        }
+        self.mock_issue = Issue(
+            source='github', title='mock_title', url='mock_url', upstream='org/repo',
+            comments=[{'author': 'mock_author', 'name': 'mock_name', 'body': 'mock_body',
+                       'id': 1, 'date_created': datetime(2019, 1, 1), 'changed': None}],
+            config=self.mock_config, tags=['tag1'], fixVersion=[None], priority=None,
+            priority_icon=None, content='mock_content', reporter={'fullname': 'mock_reporter'},
+            assignee=[{'fullname': 'mock_assignee'}], status='Open', id=1234, group='mock_group',
+            updated='2019-01-02T00:00:00Z')
+        self.mock_downstream = {
+            'key': 'FACTORY-1', 'summary': 'mock_title', 'description': 'mock_description',
+            'labels': ['tag1', 'tag2'], 'fixVersions': [], 'assignee': 'mock_assignee',
+            'status': 'Open', 'priority': 'Major', 'priority_icon': 'mock_icon',
+            'updated': '2019-01-01T00:00:00.000+0000',
+            'comments': [{'body': 'mock_user\n\nmock_body', 'author': 'mock_jibe'}],
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.snapshot_dir)
+
+    def test_snapshot_path(self):
+        """
+        Tests 'snapshot_path' function makes group names safe file names
+        """
+        # Call the function
+        response = s.snapshot_path('mock_dir', 'My Group/1')
+
+        # Assert everything was called correctly
+        self.assertEqual(response, os.path.join('mock_dir', 'My_Group_1.msgpack'))
+
+    def test_write_read_snapshot(self):
+        """
+        Tests a snapshot can be read back as it was written
+        """
+        # Call the function
+        count = s.write_snapshot(self.path, 'mock_group',
+                                 [(self.mock_issue, self.mock_downstream),
+                                  (self.mock_issue, None)], 'mock_joke')
+        header, records = s.read_snapshot(self.path)
+        records = list(records)
+
+        # Assert everything was called correctly
+        self.assertEqual(count, 2)
+        self.assertEqual(header['version'], s.VERSION)
+        self.assertEqual(header['group'], 'mock_group')
+        self.assertEqual(header['joke'], 'mock_joke')
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0]['issue']['title'], 'mock_title')
+        self.assertEqual(records[0]['issue']['comments'][0]['date_created'], '2019-01-01 00:00:00')
+        self.assertEqual(records[0]['downstream'], self.mock_downstream)
+        self.assertIsNone(records[1]['downstream'])
+        self.assertFalse(os.path.exists(self.path + '.tmp'))
+
+    def test_write_read_priorities(self):
+        """
+        Tests the JIRA priorities of a group can be read back
+        """
+        # Set up return values
+        path = s.priorities_path(self.snapshot_dir, 'mock_group')
+
+        # Call the function
+        before = s.read_priorities(path)
+        s.write_priorities(path, {'mock_url': 'Blocker'})
+
+        # Assert everything was called correctly
+        self.assertEqual(before, {})
+        self.assertEqual(s.read_priorities(path), {'mock_url': 'Blocker'})
+        self.assertEqual(os.listdir(self.snapshot_dir), ['mock_group.priorities.json'])
+
+    def test_read_snapshot_version(self):
+        """
+        Tests 'read_snapshot' function refuses other versions
+        """
+        # Set up return values
+        with mock.patch(PATH + 'VERSION', s.VERSION + 1):
+            s.write_snapshot(self.path, 'mock_group', [])
+
+        # Call the function
+        with self.assertRaises(ValueError):
+            s.read_snapshot(self.path)
+
+        # Empty files aren't snapshots either
+        io.open(self.path, 'wb').close()
+        with self.assertRaises(ValueError):
+            s.read_snapshot(self.path)
+
+    def test_check_snapshot(self):
+        """
+        Tests 'check_snapshot' function runs the check plan offline
+        """
+        # Set up return values
+        s.write_snapshot(self.path, 'mock_group',
+                         [(self.mock_issue, self.mock_downstream),
+                          (self.mock_issue, None)])
+        _, records = s.read_snapshot(self.path)
+
+        # Call the function
+        out_of_sync, missing = s.check_snapshot(records, self.mock_config, 'mock_group')
+
+        # Assert everything was called correctly
+        self.assertEqual(len(out_of_sync), 1)
+        self.assertEqual(len(missing), 1)
+        issue = out_of_sync[0]
+        self.assertEqual(issue.downstream_id, 'FACTORY-1')
+        self.assertEqual(issue.downstream_url, 'mock_server/browse/FACTORY-1')
+        self.assertEqual(issue.priority, 'Major')
+        self.assertEqual(issue.out_of_sync['comments'], 'in-sync')
+        self.assertEqual(issue.out_of_sync['assignee'], 'in-sync')
+        self.assertEqual(issue.out_of_sync['tags']['difference'], ['tag2'])
+        self.assertEqual((issue.done, issue.total), (2, 3))
+        # --deadline and --top order issues by their last update
+        self.assertEqual(issue.updated, self.mock_issue.updated)
+        self.assertTrue(issue.updated)
+        # The details the report doesn't need are dropped
+        self.assertIsNone(issue.content)
+
+    def test_existing_from_record(self):
+        """
+        Tests 'existing_from_record' function has the fields checks may read
+        """
+        # Call the function
+        response = s.existing_from_record(self.mock_downstream)
+
+        # Assert everything was called correctly
+        self.assertEqual(set(vars(response.fields)), set(d.SNAPSHOT_FIELDS))
+        self.assertEqual(response.fields.updated, '2019-01-01T00:00:00.000+0000')
+        with self.assertRaises(AttributeError) as error:
+            response.fields.customfield_1
+        self.assertIn('SNAPSHOT_FIELDS', str(error.exception))
+        with self.assertRaises(AttributeError):
+            s.SnapshotClient().remote_links(response)
+
+    def test_check_snapshot_unconfigured(self):
+        """
+        Tests 'check_snapshot' function skips repos removed from the config
+        """
+        # Set up return values
+        s.write_snapshot(self.path, 'mock_group', [(self.mock_issue, self.mock_downstream)])
+        _, records = s.read_snapshot(self.path)
+        self.mock_config['jibe']['send-to']['mock_group']['upstream']['github'] = {}
+
+        # Call the function
+        out_of_sync, missing = s.check_snapshot(records, self.mock_config, 'mock_group')
+
+        # Assert everything was called correctly
+        self.assertEqual((out_of_sync, missing), ([], []))
+
+    @mock.patch(PATH + 'd.get_existing_jira_issue')
+    @mock.patch(PATH + 'd.get_jira_client')
+    def test_fetch_downstream(self,
+                              mock_get_jira_client,
+                              mock_get_existing_jira_issue):
+        """
+        Tests 'fetch_downstream' function
+        """
+        # Set up return values
+        mock_client = MagicMock()
+        mock_comment = MagicMock()
+        mock_comment.body = 'mock_body'
+        mock_comment.author.name = 'mock_jibe'
+        mock_client.comments.return_value = [mock_comment]
+        mock_get_jira_client.return_value = mock_client
+        mock_existing = MagicMock()
+        mock_existing.key = 'FACTORY-1'
+        mock_existing.fields.labels = ['tag1']
+        mock_existing.fields.fixVersions = []
+        mock_existing.fields.assignee = None
+        mock_existing.fields.priority = None
+        mock_get_existing_jira_issue.side_effect = [mock_existing, None]
+
+        # Call the function
+        response = list(s.fetch_downstream([self.mock_issue, self.mock_issue],
+                                           self.mock_config))
+
+        # Assert everything was called correctly
+        self.assertEqual(response[0][1]['key'], 'FACTORY-1')
+        self.assertEqual(response[0][1]['comments'], [{'body': 'mock_body', 'author': 'mock_jibe'}])
+        self.assertIsNone(response[0][1]['assignee'])
+        self.assertEqual(response[1], (self.mock_issue, None))
+        mock_client.comments.assert_called_once_with(mock_existing)
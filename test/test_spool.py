@@ -0,0 +1,188 @@
+# Built In Modules
+import mock
+import os
+import shutil
+import tempfile
+import unittest
+try:
+    # Python 3.3 >
+    from unittest.mock import MagicMock  # noqa: F401
+except ImportError:
+    from mock import MagicMock  # noqa: F401
+
+# Local Modules
+import jibe.spool as s
+
+# Global Variables
+PATH = 'jibe.spool.'
+
+
+class TestSpool(unittest.TestCase):
+    """
+    This class tests the spool.py file under jibe
+    """
+    def setUp(self):
+        self.spool_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.spool_dir)
+
+    def _render(self, output):
+        output.write(u'mock_html')
+        return 9
+
+    def test_report_key(self):
+        """
+        Tests 'report_key' function is stable
+        """
+        # Call the function
+        response = s.report_key(['b', 'a'], 'mock_subject', '2019-01-01')
+
+        # Assert everything was called correctly
+        self.assertEqual(response, s.report_key(['a', 'b'], 'mock_subject', '2019-01-01'))
+        self.assertNotEqual(response, s.report_key(['a', 'b'], 'mock_subject', '2019-01-02'))
+
+    def test_spool_report(self):
+        """
+        Tests 'spool_report' function does not spool the same report twice
+        """
+        # Call the function
+        key, size = s.spool_report(self.spool_dir, ['mock_email'], 'mock_subject', self._render)
+        key2, size2 = s.spool_report(self.spool_dir, ['mock_email'], 'mock_subject', self._render)
+
+        # Assert everything was called correctly
+        self.assertEqual(size, 9)
+        self.assertEqual(key2, key)
+        self.assertIsNone(size2)
+        self.assertEqual(s.pending_reports(self.spool_dir), [key])
+
+    def test_spool_report_rerun(self):
+        """
+        Tests 'spool_report' function spools a rerun of the day under a new key
+        """
+        # Set up return values
+        key, _ = s.spool_report(self.spool_dir, ['mock_email'], 'mock_subject', self._render)
+
+        # Call the function
+        key2, size2 = s.spool_report(self.spool_dir, ['mock_email'], 'mock_subject', self._render,
+                                     rerun=True)
+
+        # Assert everything was called correctly
+        self.assertNotEqual(key2, key)
+        self.assertEqual(size2, 9)
+        self.assertEqual(s.pending_reports(self.spool_dir), [key, key2])
+
+    @mock.patch(PATH + 'm')
+    def test_deliver_one(self,
+                         mock_m):
+        """
+        Tests 'deliver_one' function sends a report exactly once
+        """
+        # Set up return values
+        key, _ = s.spool_report(self.spool_dir, ['mock_email'], 'mock_subject', self._render)
+
+        # Call the function
+        response = s.deliver_one(self.spool_dir, key)
+        s.spool_report(self.spool_dir, ['mock_email'], 'mock_subject', self._render)
+        s.deliver_one(self.spool_dir, key)
+
+        # Assert everything was called correctly
+        self.assertIsNone(response)
+        mock_m.send.assert_called_once_with(['mock_email'], 'mock_subject', 'mock_html')
+        self.assertEqual(s.pending_reports(self.spool_dir), [])
+
+    @mock.patch(PATH + 'metrics')
+    @mock.patch(PATH + 'm')
+    def test_deliver_one_mail(self,
+                              mock_m,
+                              mock_metrics):
+        """
+        Tests 'deliver_one' function sends the spooled mail options and
+        counts the bytes sent for the group
+        """
+        # Set up return values
+        mock_m.send.return_value = 1234
+        key, _ = s.spool_report(self.spool_dir, ['mock_email'], 'mock_subject', self._render,
+                                group='mock_group', mail={'plain': 'mock_plain'})
+
+        # Call the function
+        s.deliver_one(self.spool_dir, key)
+
+        # Assert everything was called correctly
+        mock_m.send.assert_called_once_with(['mock_email'], 'mock_subject', 'mock_html',
+                                            plain='mock_plain')
+        mock_metrics.email.assert_called_with('mock_group', 1234)
+
+    @mock.patch(PATH + 'm')
+    def test_deliver_one_interrupted(self,
+                                     mock_m):
+        """
+        Tests 'deliver_one' function marks a report before sending it and
+        does not send it again if a process died while sending it
+        """
+        # Set up return values
+        key, _ = s.spool_report(self.spool_dir, ['mock_email'], 'mock_subject', self._render)
+        sending = os.path.join(self.spool_dir, 'pending', key + '.sending')
+        marked = []
+        mock_m.send.side_effect = lambda *args, **kwargs: marked.append(os.path.exists(sending))
+        # The process sending it died
+        open(sending, 'w').close()
+
+        # Call the function
+        response = s.deliver_one(self.spool_dir, key)
+        pending = s.pending_reports(self.spool_dir)
+        os.remove(sending)
+        s.deliver_one(self.spool_dir, key)
+
+        # Assert everything was called correctly
+        self.assertIsNone(response)
+        self.assertEqual(pending, [key])
+        mock_m.send.assert_called_once_with(['mock_email'], 'mock_subject', 'mock_html')
+        self.assertEqual(marked, [True])
+        self.assertFalse(os.path.exists(sending))
+        self.assertTrue(s.delivered(self.spool_dir, key))
+
+    @mock.patch(PATH + 'MAX_ATTEMPTS', 2)
+    @mock.patch(PATH + 'm')
+    def test_deliver_one_retry(self,
+                               mock_m):
+        """
+        Tests 'deliver_one' function backs off and gives up on failures
+        """
+        # Set up return values
+        mock_m.send.side_effect = IOError()
+        key, _ = s.spool_report(self.spool_dir, ['mock_email'], 'mock_subject', self._render)
+
+        # Call the function
+        first = s.deliver_one(self.spool_dir, key)
+        second = s.deliver_one(self.spool_dir, key)
+
+        # Assert everything was called correctly
+        self.assertTrue(first)
+        self.assertIsNone(second)
+        self.assertFalse(os.path.exists(os.path.join(self.spool_dir, 'pending', key + '.sending')))
+        self.assertEqual(s.pending_reports(self.spool_dir), [])
+        self.assertTrue(os.path.exists(os.path.join(self.spool_dir, 'failed', key + '.html')))
+
+    @mock.patch(PATH + 'm')
+    def test_delivery_worker(self,
+                             mock_m):
+        """
+        Tests 'DeliveryWorker' class delivers queued reports
+        """
+        # Set up return values
+        key, _ = s.spool_report(self.spool_dir, ['mock_email'], 'mock_subject', self._render)
+        mock_on_delivered = MagicMock()
+        worker = s.DeliveryWorker(self.spool_dir, on_delivered=mock_on_delivered)
+        worker.start()
+
+        # Call the function
+        worker.put(key)
+        worker.close(timeout=0)
+
+        # Assert everything was called correctly
+        mock_m.send.assert_called_once_with(['mock_email'], 'mock_subject', 'mock_html')
+        mock_on_delivered.assert_called_once_with(key)
+        self.assertTrue(s.delivered(self.spool_dir, key))
+        mock_m.close.assert_called_with()
+        self.assertFalse(worker.is_alive())
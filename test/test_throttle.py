@@ -0,0 +1,176 @@
+# Built In Modules
+import mock
+import threading
+import unittest
+
+# 3rd Party Modules
+import requests
+
+# Local Modules
+import jibe.throttle as t
+from jibe import metrics
+
+# Global Variables
+PATH = 'jibe.throttle.'
+SEND = 'requests.adapters.HTTPAdapter.send'
+
+
+class TestThrottle(unittest.TestCase):
+    """
+    This class tests the throttle.py file under jibe
+    """
+    def setUp(self):
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+        self.addCleanup(t.disable)
+
+    def _response(self, request, status=200):
+        response = requests.Response()
+        response.status_code = status
+        response._content = b'{}'
+        response.url = request.url
+        response.request = request
+        return response
+
+    def test_limit(self):
+        """
+        Tests the limit grows while the host is healthy and halves when it is not
+        """
+        # Set up return values
+        limiter = t.HostLimiter('mock.jira', 8)
+        self.assertEqual(limiter.limit, 4)
+
+        # Call the function
+        for _ in range(8):
+            limiter.acquire()
+            limiter.release(0.1, 200)
+        healthy = limiter.limit
+        limiter.acquire()
+        limiter.release(0.1, 429)
+        limited = limiter.limit
+        limiter.acquire()
+        # Way slower than usual
+        limiter.release(5.0, 200)
+
+        # Assert everything was called correctly
+        self.assertGreater(healthy, 5)
+        self.assertEqual(limited, healthy / 2)
+        self.assertEqual(limiter.limit, healthy / 4)
+        self.assertEqual(limiter.in_flight, 0)
+        self.assertEqual(metrics.to_dict()['counters'], {'throttle_backoffs': 2})
+
+    def test_limit_bounds(self):
+        """
+        Tests the limit stays between 1 and the ceiling
+        """
+        # Set up return values
+        limiter = t.HostLimiter('mock.jira', 2)
+
+        # Call the function
+        for status in [429] * 5 + [200] * 20:
+            limiter.acquire()
+            limiter.release(0.1, status)
+
+        # Assert everything was called correctly
+        self.assertEqual(limiter.limit, 2)
+        for status in [429] * 5:
+            limiter.acquire()
+            limiter.release(0.1, status)
+        self.assertEqual(limiter.limit, 1)
+
+    def test_acquire_waits(self):
+        """
+        Tests 'acquire' holds requests over the limit until a slot frees up
+        """
+        # Set up return values
+        limiter = t.HostLimiter('mock.jira', 1)
+        limiter.acquire()
+        acquired = threading.Event()
+
+        def waiter():
+            limiter.acquire()
+            acquired.set()
+
+        # Call the function
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        waited = not acquired.wait(0.2)
+        limiter.release(0.1, 200)
+        thread.join(5)
+
+        # Assert everything was called correctly
+        self.assertTrue(waited)
+        self.assertTrue(acquired.is_set())
+        self.assertEqual(limiter.in_flight, 1)
+
+    @mock.patch(PATH + 'time')
+    def test_circuit(self, mock_time):
+        """
+        Tests the circuit opens after repeated failures, fails fast and closes
+        after a successful trial request
+        """
+        # Set up return values
+        mock_time.time.return_value = 1000
+        limiter = t.HostLimiter('mock.jira', 4, failures=3, cooldown=30)
+
+        # Call the function
+        for _ in range(3):
+            limiter.acquire()
+            limiter.release(0.1, 502)
+
+        # Assert everything was called correctly
+        with self.assertRaises(t.CircuitOpenError):
+            limiter.acquire()
+        # Not retried by the jira client
+        self.assertNotIsInstance(t.CircuitOpenError(), requests.exceptions.ConnectionError)
+
+        # A failed trial keeps it open
+        mock_time.time.return_value = 1031
+        limiter.acquire()
+        with self.assertRaises(t.CircuitOpenError):
+            limiter.acquire()
+        limiter.release(0.1, None)
+        with self.assertRaises(t.CircuitOpenError):
+            limiter.acquire()
+
+        # A successful one closes it
+        mock_time.time.return_value = 1062
+        limiter.acquire()
+        limiter.release(0.1, 200)
+        limiter.acquire()
+        limiter.release(0.1, 200)
+        counters = metrics.to_dict()['counters']
+        self.assertEqual(counters['circuit_opened'], 1)
+        self.assertEqual(counters['circuit_rejected'], 3)
+
+    def test_enable(self):
+        """
+        Tests 'enable' puts every request behind the limiter of its host
+        """
+        # Set up return values
+        original = requests.adapters.HTTPAdapter.send
+        statuses = {'mock.github': 200, 'mock.jira': 503}
+
+        def send(adapter, request, **kwargs):
+            host = request.url.split('/')[2]
+            return self._response(request, statuses[host])
+
+        # Call the function
+        with mock.patch(SEND, side_effect=send, autospec=True) as mock_send:
+            t.enable(4, failures=2)
+            session = requests.Session()
+            session.get('https://mock.github/issues')
+            session.get('https://mock.jira/rest/api/2/search')
+            session.get('https://mock.jira/rest/api/2/search')
+            with self.assertRaises(t.CircuitOpenError):
+                session.get('https://mock.jira/rest/api/2/search')
+            session.get('https://mock.github/issues')
+
+            # Assert everything was called correctly
+            self.assertEqual(mock_send.call_count, 4)
+            self.assertEqual(sorted(t._hosts), ['mock.github', 'mock.jira'])
+            self.assertAlmostEqual(t.limiter('mock.github').limit, 2.9)
+            self.assertEqual(t.limiter('mock.jira').limit, 1)
+            t.disable()
+        self.assertIs(requests.adapters.HTTPAdapter.send, original)
+        self.assertEqual(t._hosts, {})
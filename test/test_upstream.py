@@ -13,11 +13,15 @@ import jibe.upstream as u
 # Global Variables
 PATH = 'jibe.upstream.'
 
+
 class TestUpstream(unittest.TestCase):
     """
     This class test the upstream.py file under jibe
     """
     def setUp(self):
+        # Clear the cached HTTP session
+        u._sessions.__dict__.clear()
+
         # Mock config
         self.mock_config = {
             'jibe': {
@@ -113,6 +117,33 @@ class TestUpstream(unittest.TestCase):
         )
         self.assertEqual(response, ['1', '1'])
 
+    @mock.patch(PATH + 'pagure_issues')
+    @mock.patch(PATH + 'github_issues')
+    def test_get_upstream_issues_repos(self,
+                                       mock_github_issues,
+                                       mock_pagure_issues):
+        """
+        Test 'get_upstream_issues' function only getting some repos
+        """
+        # Set up variables and return values
+        mock_github_issues.return_value = '1'
+
+        # Call the function
+        response = u.get_upstream_issues(
+            config=self.mock_config,
+            group='NAME_OF_GROUP',
+            repos={('github', 'mock_repo0')}
+        )
+
+        # Assert everything was called correctly
+        mock_github_issues.assert_called_with(
+            'mock_repo0',
+            self.mock_config,
+            'NAME_OF_GROUP'
+        )
+        mock_pagure_issues.assert_not_called()
+        self.assertEqual(response, ['1'])
+
     @mock.patch('jibe.intermediary.Issue.from_github')
     @mock.patch(PATH + 'Github')
     @mock.patch(PATH + '_get_all_github_issues')
@@ -210,7 +241,68 @@ class TestUpstream(unittest.TestCase):
         self.assertEqual(response[0], 'Successful Call!')
         self.mock_github_client.get_repo.assert_not_called()
         self.mock_github_repo.get_issue.assert_not_called()
+
+    @mock.patch(PATH + '_user_names.do', wraps=u._user_names.do)
+    @mock.patch('jibe.intermediary.Issue.from_github')
+    @mock.patch(PATH + 'Github')
+    @mock.patch(PATH + '_get_all_github_issues')
+    def test_github_issues_github_url(self,
+                                      mock_get_all_github_issues,
+                                      mock_github,
+                                      mock_issue_from_github,
+                                      mock_user_names_do):
+        """
+        This function tests 'github_issues' function with a custom
+        github_url and github_options
+        """
+        # Set up return values
+        self.mock_config['jibe']['github_url'] = 'http://github.example.com/api/v3'
+        self.mock_config['jibe']['github_options'] = {'seconds_between_requests': None}
+        self.mock_github_issue_raw['comments'] = 0
+        mock_github.return_value = self.mock_github_client
+        mock_get_all_github_issues.return_value = [self.mock_github_issue_raw]
+
+        # Call the function
+        list(u.github_issues(
+            upstream='org/repo',
+            config=self.mock_config,
+            group='NAME_OF_GROUP'
+        ))
+
+        # Assert that calls were made correctly
+        url = mock_get_all_github_issues.call_args[0][0]
+        self.assertTrue(url.startswith('http://github.example.com/api/v3/repos/org/repo/issues?'))
+        mock_github.assert_called_with('mock_token', base_url='http://github.example.com/api/v3',
+                                       seconds_between_requests=None)
         self.mock_github_issue.get_comments.assert_not_called()
+        # Users of another GitHub are not shared
+        self.assertEqual([call[0][0] for call in mock_user_names_do.call_args_list],
+                         [('http://github.example.com/api/v3', 'mock_login'),
+                          ('http://github.example.com/api/v3', 'mock_assignee_login')])
+
+    @mock.patch(PATH + 'Github')
+    @mock.patch(PATH + '_fetch_github_data')
+    def test_get_github_issue(self,
+                              mock_fetch_github_data,
+                              mock_github):
+        """
+        This function tests 'get_github_issue' function
+        """
+        # Set up return values
+        self.mock_github_issue_raw['comments'] = 0
+        mock_fetch_github_data.return_value.json.return_value = self.mock_github_issue_raw
+        mock_github.return_value = self.mock_github_client
+
+        # Call the function
+        response = u.get_github_issue('org/repo', 12, self.mock_config)
+
+        # Assert that calls were made correctly
+        mock_fetch_github_data.assert_called_with(
+            'https://api.github.com/repos/org/repo/issues/12',
+            {'Authorization': 'token mock_token'})
+        self.assertEqual(response['comments'], [])
+        self.assertEqual(response['user']['fullname'], 'mock_name')
+        self.assertEqual(response['labels'], ['some_label'])
 
     @mock.patch('jibe.intermediary.Issue.from_pagure')
     @mock.patch(PATH + 'requests')
@@ -231,7 +323,7 @@ class TestUpstream(unittest.TestCase):
             ]
 
         }
-        mock_requests.get.return_value = get_return
+        mock_requests.Session().get.return_value = get_return
 
         # Call the function
         with self.assertRaises(IOError):
@@ -242,7 +334,7 @@ class TestUpstream(unittest.TestCase):
             ))
 
         # Assert everything was called correctly
-        mock_requests.get.assert_called_with(
+        mock_requests.Session().get.assert_called_with(
             'https://pagure.io/api/0/org/repo/issues',
             params={'filter1': 'filter1', 'tags': ['custom_tag']}
         )
@@ -265,7 +357,7 @@ class TestUpstream(unittest.TestCase):
 
         }
         get_return.request.url = 'mock_url'
-        mock_requests.get.return_value = get_return
+        mock_requests.Session().get.return_value = get_return
         mock_issue_from_pagure.return_value = 'Successful Call!'
 
         # Call the function
@@ -277,7 +369,7 @@ class TestUpstream(unittest.TestCase):
 
         # Assert everything was called correctly
         self.assertEqual(response[0], 'Successful Call!')
-        mock_requests.get.assert_called_with(
+        mock_requests.Session().get.assert_called_with(
             'https://pagure.io/api/0/org/repo/issues',
             params={'filter1': 'filter1', 'tags': ['custom_tag']}
         )
@@ -286,4 +378,4 @@ class TestUpstream(unittest.TestCase):
             {'assignee': ['mock_assignee']},
             self.mock_config,
             'NAME_OF_GROUP'
-        )
\ No newline at end of file
+        )
@@ -0,0 +1,234 @@
+# Built In Modules
+import hashlib
+import hmac
+import json
+import mock
+import os
+import shutil
+import tempfile
+import time
+import unittest
+try:
+    # Python 3.3 >
+    from unittest.mock import MagicMock  # noqa: F401
+except ImportError:
+    from mock import MagicMock  # noqa: F401
+
+# Local Modules
+import jibe.webhooks as w
+from jibe.intermediary import Issue
+
+# Global Variables
+PATH = 'jibe.webhooks.'
+
+
+def sign(secret, body):
+    return hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+
+
+class TestWebhooks(unittest.TestCase):
+    """
+    This class tests the webhooks.py file under jibe
+    """
+    def setUp(self):
+        self.mock_config = {
+            'jibe': {
+                'default_jira_instance': 'mock_jira',
+                'jira': {'mock_jira': {'options': {'server': 'mock_server'}}},
+                'pagure_url': 'https://mock_pagure',
+                'webhooks': {'github': 'mock_secret',
+                             'pagure': {'mock_pagure_repo': 'mock_key'},
+                             'jira': 'mock_jira_secret'},
+                'send-to': {
+                    'mock_group': {
+                        'upstream': {
+                            'github': {'org/repo': {'check': ['tags']}},
+                            'pagure': {'mock_pagure_repo': {'check': ['tags']}},
+                        },
+                    },
+                    'other_group': {'upstream': {'github': {}, 'pagure': {}}},
+                },
+            },
+        }
+        self.mock_issue = self._issue('mock_url')
+        self.mock_downstream = {'key': 'FACTORY-1'}
+        self.store = w.IssueStore()
+        self.store.load('mock_group', [(self.mock_issue, self.mock_downstream),
+                                       (self._issue('missing_url'), None)])
+
+    def _issue(self, url, title='mock_title'):
+        return Issue(
+            source='github', title=title, url=url, upstream='org/repo', comments=[],
+            config=self.mock_config, tags=['tag1'], fixVersion=[None], priority=None,
+            priority_icon=None, content='mock_content', reporter={'fullname': 'mock_reporter'},
+            assignee=[], status='Open', id=1234, group='mock_group')
+
+    def test_verify_signature(self):
+        """
+        Tests 'verify_signature' function
+        """
+        # Call the function
+        w.verify_signature('mock_secret', b'mock_body', sign('mock_secret', b'mock_body'))
+        w.verify_signature('mock_secret', b'mock_body', 'sha256=' + sign('mock_secret', b'mock_body'))
+
+        # Assert everything was called correctly
+        for secret, signature in (('mock_secret', sign('other', b'mock_body')),
+                                  ('mock_secret', None),
+                                  (None, sign('mock_secret', b'mock_body'))):
+            with self.assertRaises(w.SignatureError):
+                w.verify_signature(secret, b'mock_body', signature)
+
+    def test_parse_event_github(self):
+        """
+        Tests 'parse_event' function with GitHub webhooks
+        """
+        # Set up return values
+        body = json.dumps({'action': 'deleted', 'repository': {'full_name': 'org/repo'},
+                           'issue': {'number': 1, 'html_url': 'mock_url'}}).encode('utf-8')
+        headers = {'X-GitHub-Event': 'issues',
+                   'X-Hub-Signature-256': 'sha256=' + sign('mock_secret', body)}
+
+        # Call the function
+        response = w.parse_event('github', headers, body, self.mock_config)
+        ping = w.parse_event('github', dict(headers, **{'X-GitHub-Event': 'ping'}),
+                             body, self.mock_config)
+
+        # Assert everything was called correctly
+        self.assertEqual(response, {'source': 'github', 'repo': 'org/repo', 'number': 1,
+                                    'url': 'mock_url', 'removed': True})
+        self.assertIsNone(ping)
+        with self.assertRaises(w.SignatureError):
+            w.parse_event('github', headers, body + b' ', self.mock_config)
+
+    def test_parse_event_pagure(self):
+        """
+        Tests 'parse_event' function with Pagure webhooks keyed per repo
+        """
+        # Set up return values
+        body = json.dumps({'topic': 'issue.edit',
+                           'msg': {'project': {'fullname': 'mock_pagure_repo'},
+                                   'issue': {'id': 5}}}).encode('utf-8')
+
+        # Call the function
+        response = w.parse_event('pagure', {'X-Pagure-Signature-256': sign('mock_key', body)},
+                                 body, self.mock_config)
+
+        # Assert everything was called correctly
+        self.assertEqual(response['url'], 'https://mock_pagure/mock_pagure_repo/issue/5')
+        self.assertFalse(response['removed'])
+        with self.assertRaises(w.SignatureError):
+            w.parse_event('pagure', {'X-Pagure-Signature-256': sign('mock_secret', body)},
+                          body, self.mock_config)
+
+    def test_parse_event_jira(self):
+        """
+        Tests 'parse_event' function with JIRA webhooks
+        """
+        # Set up return values
+        body = json.dumps({'webhookEvent': 'jira:issue_updated',
+                           'issue': {'key': 'FACTORY-1'}}).encode('utf-8')
+
+        # Call the function
+        response = w.parse_event('jira', {'X-Hub-Signature': 'sha256=' + sign('mock_jira_secret', body)},
+                                 body, self.mock_config)
+
+        # Assert everything was called correctly
+        self.assertEqual(response, {'source': 'jira', 'jira_instance': 'mock_jira',
+                                    'key': 'FACTORY-1', 'urls': [], 'remote_link': False})
+
+    @mock.patch(PATH + 'snapshot.fetch_downstream')
+    @mock.patch(PATH + 'u.get_github_issue')
+    def test_apply_event_github(self,
+                                mock_get_github_issue,
+                                mock_fetch_downstream):
+        """
+        Tests 'apply_event' function only refetches the changed pair
+        """
+        # Set up return values
+        mock_get_github_issue.return_value = {
+            'title': 'new_title', 'html_url': 'mock_url', 'comments': [], 'labels': ['tag2'],
+            'milestone': None, 'body': 'mock_body', 'user': {'fullname': 'mock_reporter'},
+            'assignees': [], 'state': 'open', 'id': 1234}
+        mock_fetch_downstream.side_effect = lambda issues, config: [(issues[0], {'key': 'FACTORY-2'})]
+        event = {'source': 'github', 'repo': 'org/repo', 'number': 1, 'url': 'mock_url',
+                 'removed': False}
+
+        # Call the function
+        response = w.apply_event(self.store, event, self.mock_config)
+
+        # Assert everything was called correctly
+        self.assertEqual(response, ['mock_group'])
+        mock_get_github_issue.assert_called_once_with('org/repo', 1, self.mock_config)
+        records = self.store.records('mock_group')
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0]['issue']['title'], 'new_title')
+        self.assertEqual(records[0]['downstream'], {'key': 'FACTORY-2'})
+
+        # Closed issues are dropped like a full fetch would
+        mock_get_github_issue.return_value['state'] = 'closed'
+        w.apply_event(self.store, event, self.mock_config)
+        self.assertEqual([record['issue']['url'] for record in self.store.records('mock_group')],
+                         ['missing_url'])
+
+    @mock.patch(PATH + 'snapshot.fetch_downstream')
+    @mock.patch(PATH + 'd.get_jira_instance_client')
+    def test_apply_event_jira_remote_link(self,
+                                          mock_get_jira_instance_client,
+                                          mock_fetch_downstream):
+        """
+        Tests 'apply_event' function pairs a missing issue with a new link
+        """
+        # Set up return values
+        mock_link = MagicMock()
+        mock_link.object.url = 'missing_url'
+        mock_get_jira_instance_client.return_value.remote_links.return_value = [mock_link]
+        mock_fetch_downstream.side_effect = lambda issues, config: [(issues[0], {'key': 'FACTORY-3'})]
+        event = {'source': 'jira', 'jira_instance': 'mock_jira', 'key': 'FACTORY-3',
+                 'urls': [], 'remote_link': True}
+
+        # Call the function
+        response = w.apply_event(self.store, event, self.mock_config)
+
+        # Assert everything was called correctly
+        self.assertEqual(response, ['mock_group'])
+        mock_get_jira_instance_client.assert_called_with('mock_jira', self.mock_config)
+        self.assertEqual(mock_fetch_downstream.call_count, 1)
+        self.assertEqual(mock_fetch_downstream.call_args[0][0][0].url, 'missing_url')
+        self.assertEqual(self.store.records('mock_group')[1]['downstream'], {'key': 'FACTORY-3'})
+
+    def test_apply_event_unfetched_group(self):
+        """
+        Tests 'apply_event' function leaves groups that were never fetched
+        """
+        # Set up return values
+        self.store.groups.clear()
+        event = {'source': 'github', 'repo': 'org/repo', 'number': 1, 'url': 'mock_url',
+                 'removed': False}
+
+        # Call the function
+        response = w.apply_event(self.store, event, self.mock_config)
+
+        # Assert everything was called correctly
+        self.assertEqual(response, [])
+
+    def test_store_save_load(self):
+        """
+        Tests the state of a group survives a restart as a snapshot
+        """
+        # Set up return values
+        snapshot_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, snapshot_dir)
+        path = os.path.join(snapshot_dir, 'mock_group.msgpack')
+        self.store.groups['mock_group']['created'] = time.time() - 100
+
+        # Call the function
+        self.store.save(path, 'mock_group')
+        store = w.IssueStore()
+        w.load_snapshots(store, snapshot_dir, self.mock_config)
+
+        # Assert everything was called correctly
+        self.assertEqual(list(store.groups), ['mock_group'])
+        self.assertEqual(store.records('mock_group')[0]['downstream'], self.mock_downstream)
+        self.assertTrue(store.fresh('mock_group', 1000))
+        self.assertFalse(store.fresh('mock_group', 10))
+        self.assertFalse(store.groups['mock_group']['dirty'])